@@ -2,6 +2,9 @@ from enum import Enum
 
 from typing import Union
 
+from ..transport.base import as_transport
+from ..transport.scpi import ScpiBatch
+
 class SenseMethod(Enum):
     voltage_dc = 'VOLT:DC'
     voltage_ac = 'VOLT:AC'
@@ -15,10 +18,20 @@ class MinMaxValue(Enum):
     MAX = 'MAX'
 
 class Multimeter34401A(object):
+    # bytes per program message sent by a batch
+    input_buffer_size = 256
+
     def __init__(self, device):
-        self.dev = device
-        self.dev.write('*CLS')
-        self.dev.write('*RST')
+        self.dev = as_transport(device)
+        with self.batch() as batch:
+            batch.write('*CLS')
+            batch.write('*RST')
+
+    def batch(self) -> ScpiBatch:
+        """ Context in which the writes of all driver calls are sent as one
+            message, a query inside sends them along
+        """
+        return ScpiBatch(self.dev, self.input_buffer_size)
 
     def set_sense(self, method: SenseMethod,
             range: Union[float, MinMaxValue] = MinMaxValue.MAX,
@@ -39,18 +52,26 @@ class Multimeter34401A(object):
         integration_time = min([time for time in [0.02, 0.2, 1, 10, 100]
                                 if time >= integration_time_nplc])
 
-        self.dev.write('SENS:FUNC "{:s}"'.format(method_string))
-        self.dev.write('SENS:{:s}:RANG {:s}'.format(method_string, range_parameter))
-        self.dev.write('SENS:{:s}:RANG:AUTO {:s}'.format(method_string, auto_range_parameter))
-        self.dev.write('SENS:{:s}:RES {:s}'.format(method_string, resolution_parameter))
-        self.dev.write('SENS:{:s}:NPLC {:f}'.format(method_string, integration_time))
+        with self.batch() as batch:
+            batch.write('SENS:FUNC "{:s}"'.format(method_string))
+            batch.write('SENS:{:s}:RANG {:s}'.format(method_string, range_parameter))
+            batch.write('SENS:{:s}:RANG:AUTO {:s}'.format(method_string, auto_range_parameter))
+            batch.write('SENS:{:s}:RES {:s}'.format(method_string, resolution_parameter))
+            batch.write('SENS:{:s}:NPLC {:f}'.format(method_string, integration_time))
 
     def get_errors(self):
-        return self.dev.query('SYST:ERR?')
+        with self.batch() as batch:
+            errors, = batch.query('SYST:ERR?')
+        return errors
 
 
     def read(self):
-        return self.dev.query('READ?')
+        with self.batch() as batch:
+            value, = batch.query('READ?')
+        return value
+
+    async def read_async(self):
+        return await self.dev.query_async('READ?')
 
     @property
     def resistance(self) -> float:
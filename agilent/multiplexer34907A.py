@@ -1,10 +1,12 @@
+from ..transport.base import as_transport
+
 class Multiplexer34970A(object):
     """With add-in card Agilent 34901A on channel 1."""
     
     def __init__(self, device):
-        self.dev = device
-        self.dev.write_termination = "\n"
-        self.dev.read_termination = "\n"
+        device.write_termination = "\n"
+        device.read_termination = "\n"
+        self.dev = as_transport(device)
         self.dev.write('*RST')
 
     def open(self, route: int):
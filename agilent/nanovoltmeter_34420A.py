@@ -1,14 +1,18 @@
+from ..transport.base import as_transport
 
 
 class NanovoltMeter34420A(object):
     def __init__(self, device):
-        self.dev = device
+        self.dev = as_transport(device)
         self.dev.write('*RST')
         #self.dev.write('SENS:VOLT:RANG:AUTO')
 
     def get_voltage(self):
         return float(self.dev.ask(':read?'))
 
+    async def get_voltage_async(self):
+        return await self.dev.run_async(self.get_voltage)
+
 
 if __name__=='__main__':
     from visa import ResourceManager
@@ -1,6 +1,12 @@
 import io
 import serial
 
+from ..transport.aioserial import AsyncSerialTransport
+from ..transport.base import TransportTimeout
+
+# the Alicat ends commands and answer frames with a carriage return
+TERMINATION = '\r'
+
 class FlowControllerResult(object):
     def __init__(self, message):
         self.__empty()
@@ -38,6 +44,9 @@ class FlowController(object):
         self.connection = connection
         self.unit_id = unit_id
         self.__init()
+        self._transport = AsyncSerialTransport(connection,
+                                               write_termination=TERMINATION,
+                                               read_termination=TERMINATION)
 
     def __init(self):
         self.connection.baudrate = 19200
@@ -46,36 +55,48 @@ class FlowController(object):
         self.connection.bytesize = 8
         self.connection.timeout = 0.5
 
-    def poll(self):
-        self.connection.write('{0}\r'.format(self.unit_id).encode())
-        raw_message = self.connection.readline()
+    async def _query_async(self, message, timeout):
+        try:
+            return await self._transport.query_raw_async(message, timeout)
+        except TransportTimeout:
+            return b''
+
+    async def poll_async(self, timeout=None):
+        raw_message = await self._query_async(self.unit_id, timeout)
 
         return FlowControllerResult(raw_message)
 
-    def set(self, value):
+    async def set_async(self, value, timeout=None):
         parameter = self.__calculate_parameter(value)
 
-        message = '{0}{1}\r'.format(self.unit_id, parameter).encode()
-        self.connection.write(message)
-        raw_message = self.connection.readline()
+        message = '{0}{1}'.format(self.unit_id, parameter)
+        raw_message = await self._query_async(message, timeout)
 
         return FlowControllerResult(raw_message)
 
-    def read_register(self, number):
-        message = '{0}$$R{1}\r'.format(self.unit_id, number).encode()
-        self.connection.write(message)
-        raw_message = self.connection.readline()
+    async def read_register_async(self, number, timeout=None):
+        message = '{0}$$R{1}'.format(self.unit_id, number)
 
-        return raw_message
+        return await self._query_async(message, timeout)
 
-    def write_register(self, number, value):
+    async def write_register_async(self, number, value, timeout=None):
         assert 21 <= number <= 22, 'value not allowed'
 
-        message = '{0}$$W{1}={2}\r'.format(self.unit_id, number, value).encode()
-        self.connection.write(message)
-        raw_message = self.connection.readline()
+        message = '{0}$$W{1}={2}'.format(self.unit_id, number, value)
 
-        return raw_message
+        return await self._query_async(message, timeout)
+
+    def poll(self):
+        return self._transport.run(self.poll_async())
+
+    def set(self, value):
+        return self._transport.run(self.set_async(value))
+
+    def read_register(self, number):
+        return self._transport.run(self.read_register_async(number))
+
+    def write_register(self, number, value):
+        return self._transport.run(self.write_register_async(number, value))
 
     def off(self):
         return self.set(0.0)
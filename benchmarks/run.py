@@ -0,0 +1,103 @@
+""" Runs the benchmark workflows, saves the results as JSON and compares
+    them against the stored baseline.
+
+    python -m gpibdevices.benchmarks [--only NAME ...] [--output FILE]
+                                     [--baseline FILE] [--update-baseline]
+
+    More transactions than in the baseline fail the run, wall times are
+    only reported since they depend on the host. Commits which change the
+    number of transactions on purpose update baseline.json as well.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+
+from .workflows import WORKFLOWS, Run
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# wall time growth reported as slower
+WALL_TIME_TOLERANCE = 0.25
+
+
+def run_workflows(names=None, scale: float = 1.0) -> dict:
+    """ Runs the named workflows, all by default, and returns the results """
+    results = {}
+    for name in names or WORKFLOWS:
+        run = Run(scale)
+        try:
+            WORKFLOWS[name](run)
+        finally:
+            run.close()
+        results[name] = {'wall_time': round(run.wall_time, 4),
+                         'transactions': run.transactions,
+                         'by_kind': run.by_kind()}
+    return {'python': platform.python_version(),
+            'scale': scale,
+            'workflows': results}
+
+
+def compare(results: dict, baseline: dict) -> list:
+    """ Returns the regressions of results against baseline and prints a
+        line per workflow
+    """
+    regressions = []
+    for name, result in results['workflows'].items():
+        reference = baseline.get('workflows', {}).get(name)
+        line = '{:<26} {:>4d} transactions {:>8.3f} s'.format(name, result['transactions'],
+                                                               result['wall_time'])
+        if reference is None:
+            print(line + '   (no baseline)')
+            continue
+
+        notes = []
+        if result['transactions'] > reference['transactions']:
+            regressions.append('{}: {} transactions instead of {}'.format(
+                name, result['transactions'], reference['transactions']))
+            notes.append('REGRESSION, baseline {}'.format(reference['transactions']))
+        elif result['transactions'] < reference['transactions']:
+            notes.append('improved from {}, update the baseline'.format(reference['transactions']))
+        if result['wall_time'] > reference['wall_time'] * (1 + WALL_TIME_TOLERANCE):
+            notes.append('slower than {:.3f} s'.format(reference['wall_time']))
+        print(line + ('   ' + ', '.join(notes) if notes else ''))
+    return regressions
+
+
+def main(arguments=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--only', nargs='+', choices=list(WORKFLOWS), help='workflows to run')
+    parser.add_argument('--output', help='file the results are written to')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline to compare against')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='store the results as the new baseline')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='scales the latency of the simulated instruments')
+    options = parser.parse_args(arguments)
+
+    results = run_workflows(options.only, options.scale)
+
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+    baseline = {}
+    if os.path.exists(options.baseline):
+        with open(options.baseline) as stored:
+            baseline = json.load(stored)
+    regressions = compare(results, baseline)
+
+    if options.update_baseline:
+        # keep the workflows which did not run this time
+        baseline.setdefault('workflows', {}).update(results['workflows'])
+        baseline.update(python=results['python'], scale=results['scale'])
+        with open(options.baseline, 'w') as stored:
+            json.dump(baseline, stored, indent=2, sort_keys=True)
+            stored.write('\n')
+        return 0
+
+    for regression in regressions:
+        print('transaction count regression:', regression, file=sys.stderr)
+    return 1 if regressions else 0
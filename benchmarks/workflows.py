@@ -0,0 +1,375 @@
+""" The canonical measurement workflows, each run by the real driver
+    classes against simulated instruments.
+
+    A workflow takes a Run, builds its simulated instruments and drivers
+    through it and measures the part to benchmark inside run.measure().
+    Drivers are imported after run.visa(), several of them import visa
+    on module level and get the simulated one if pyvisa is missing.
+"""
+
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from functools import partial
+
+import numpy as np
+
+from ..simulation import visa as simulated_visa
+from ..simulation.pseudo_terminal import PtyStandIn
+from ..transport.instrumentation import hooked_objects
+from ..transport.visa_session import close_sessions, open_session
+
+class TransactionCounter(object):
+    """ Transport hook counting the transactions by kind, sleeps are no
+        bus transactions
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def __call__(self, transaction):
+        if transaction.kind != 'sleep':
+            self.counts[transaction.kind] += 1
+
+
+class Run(object):
+    """ State of one workflow run: the simulated instruments, the watched
+        transports and the measurement.
+    """
+
+    def __init__(self, scale: float = 1.0):
+        """ Arguments:
+            scale -- (float) scales the latency of the simulated instruments
+        """
+        self.scale = scale
+        self.counter = TransactionCounter()
+        self.wall_time = None
+        self._hooked = []
+        self._stand_ins = []
+
+    def simulate(self, instrument):
+        instrument.latency.scale = self.scale
+        return instrument
+
+    def visa(self, instruments: dict):
+        """ Serves instruments (resource name -> SimulatedInstrument)
+            through the session pool
+        """
+        close_sessions()
+        for instrument in instruments.values():
+            self.simulate(instrument)
+        return simulated_visa.install(instruments)
+
+    def pty(self, instrument) -> str:
+        """ Serves instrument on a pty and returns the port """
+        stand_in = PtyStandIn(self.simulate(instrument))
+        self._stand_ins.append(stand_in)
+        return stand_in.port
+
+    def watch(self, driver):
+        """ Counts the transactions on every transport of driver """
+        for hooked in hooked_objects(driver):
+            if hooked not in self._hooked:
+                hooked.hooks.append(self.counter)
+                self._hooked.append(hooked)
+        return driver
+
+    @property
+    def transactions(self) -> int:
+        return sum(self.counter.counts.values())
+
+    def by_kind(self) -> dict:
+        return dict(self.counter.counts)
+
+    @contextmanager
+    def measure(self):
+        self.counter.counts.clear()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.wall_time = time.perf_counter() - start
+
+    def close(self):
+        for hooked in self._hooked:
+            hooked.hooks.remove(self.counter)
+        for stand_in in self._stand_ins:
+            stand_in.close()
+        close_sessions()
+
+
+def iv_sweep(run: Run, points: int = 21):
+    """ Voltage sweep from -1V to 1V on a Sourcemeter2400 """
+    from ..simulation.keithley import Sourcemeter2400Simulation
+
+    run.visa({'GPIB0::24::INSTR': Sourcemeter2400Simulation(resistance=1e6)})
+    from ..keithley.sourcemeter2400 import Sourcemeter2400
+    smu = run.watch(Sourcemeter2400(open_session('GPIB0::24::INSTR')))
+
+    with run.measure():
+        with smu.batch():
+            smu.voltage_driven(-1.0, current_limit=1e-5, nplc=1)
+            smu.arm()
+        for voltage in np.linspace(-1.0, 1.0, points):
+            with smu.batch():
+                smu.set_voltage(voltage)
+                smu.read()
+        smu.disarm()
+
+
+def mode_switching(run: Run, segments: int = 10):
+    """ Gate sweep segments alternating between voltage and current
+        driven mode on a Sourcemeter2602A, one reading each
+    """
+    from ..simulation.keithley import Sourcemeter2602ASimulation
+
+    run.visa({'GPIB0::26::INSTR': Sourcemeter2602ASimulation(resistance=1e6)})
+    from ..keithley.sourcemeter2602A import Sourcemeter2602A
+    smu = run.watch(Sourcemeter2602A(open_session('GPIB0::26::INSTR')))
+
+    with run.measure():
+        for segment in range(segments):
+            if segment % 2:
+                smu.current_driven(1e-7, voltage_limit=1, nplc=1)
+            else:
+                smu.voltage_driven(0.1, current_limit=1e-5, nplc=1)
+            smu.arm()
+            smu.read()
+        smu.disarm()
+
+
+def lcr_frequency_sweep(run: Run, points: int = 50, fast: bool = False):
+    """ Impedance at 50 allowed frequencies of the HP4284A """
+    from ..simulation.hp import LCRMeter4284ASimulation
+
+    manager = run.visa({'GPIB0::4::INSTR': LCRMeter4284ASimulation()})
+    from ..hp.hp4284a_lcrmeter import LCR, allowed_frequencies
+    lcr = run.watch(LCR(manager.open_resource('GPIB0::4::INSTR'), fast=fast))
+    table = allowed_frequencies()
+    frequencies = table[np.linspace(0, len(table) - 1, points).astype(int)]
+
+    with run.measure():
+        lcr.measurement_type = 'CPD'
+        for frequency in frequencies:
+            lcr.frequency = frequency
+            lcr.read_data()
+
+
+def lcr_list_sweep(run: Run, points: int = 50):
+    """ The frequencies of lcr_frequency_sweep as one list sweep """
+    from ..simulation.hp import LCRMeter4284ASimulation
+
+    manager = run.visa({'GPIB0::4::INSTR': LCRMeter4284ASimulation()})
+    from ..hp.hp4284a_lcrmeter import LCR, ListParameter, allowed_frequencies
+    lcr = run.watch(LCR(manager.open_resource('GPIB0::4::INSTR'), fast=True))
+    table = allowed_frequencies()
+    frequencies = table[np.linspace(0, len(table) - 1, points).astype(int)]
+
+    with run.measure():
+        lcr.measurement_type = 'CPD'
+        lcr.list_sweep(ListParameter.frequency, frequencies)
+
+
+def lcr_setup(run: Run, positions: int = 5, configuration: bool = False):
+    """ Measurement set-up and one reading of the HP4284A at five sample
+        positions, optionally as one configuration object
+    """
+    from ..simulation.hp import LCRMeter4284ASimulation
+
+    manager = run.visa({'GPIB0::4::INSTR': LCRMeter4284ASimulation()})
+    from ..hp.hp4284a_lcrmeter import LCR, MeasurementConfiguration
+    lcr = run.watch(LCR(manager.open_resource('GPIB0::4::INSTR')))
+    setup = MeasurementConfiguration('CPD', frequency=10e3, integration_time='LONG', num_averages=4,
+                                     source_voltage=0.5)
+
+    with run.measure():
+        for _ in range(positions):
+            if configuration:
+                lcr.configure(setup)
+            else:
+                lcr.measurement_type = setup.measurement_type
+                lcr.frequency = setup.frequency
+                lcr.integration_time = setup.integration_time
+                lcr.num_averages = setup.num_averages
+                lcr.source_voltage = setup.source_voltage
+                lcr.dc_bias_status = setup.dc_bias
+            lcr.read_data()
+
+
+def itc_device_status(run: Run, fast: bool = False):
+    """ Full status read of the ITC503 """
+    from ..simulation.oxford import ITC503Simulation
+
+    manager = run.visa({'GPIB0::24::INSTR': ITC503Simulation()})
+    from ..oxford.itc503 import ITC
+    itc = run.watch(ITC(manager.open_resource('GPIB0::24::INSTR'), fast=fast))
+
+    with run.measure():
+        itc.device_status
+
+
+def itc_setup(run: Run, session: bool = False):
+    """ PID parameters, set point, heater output and gas flow of the
+        ITC503, optionally inside one remote session
+    """
+    from ..simulation.oxford import ITC503Simulation
+
+    manager = run.visa({'GPIB0::24::INSTR': ITC503Simulation()})
+    from ..oxford.itc503 import ITC
+    itc = run.watch(ITC(manager.open_resource('GPIB0::24::INSTR')))
+
+    with run.measure():
+        with itc.remote() if session else nullcontext():
+            itc.pid_parameters = [5.0, 2.7, 0.0]
+            itc.temperature_set_point = 4.2
+            itc.heater_output = 10.0
+            itc.gas_flow = 20.0
+
+
+def mini8_poll(run: Run):
+    """ Process value, set points and output of all eight Mini8 loops """
+    from ..eurotherm.mini8 import EurothermMini8
+    from ..simulation.eurotherm import Mini8Simulation
+
+    mini8 = run.watch(EurothermMini8(run.pty(Mini8Simulation())))
+    for loop in mini8.loops:
+        # outdate the readings cached by the constructor
+        loop.last_time = 0
+
+    with run.measure():
+        for loop in mini8.loops:
+            loop.temperature
+            loop.target_set_point
+            loop.working_set_point
+            loop.power
+
+
+def scanned_resistance(run: Run, channels: int = 10):
+    """ Four wire resistance of ten channels behind a 34970A """
+    from ..simulation.agilent import Multimeter34401ASimulation, Multiplexer34970ASimulation
+
+    multiplexer_simulation = Multiplexer34970ASimulation(
+        {channel: 100.0 + channel for channel in range(1, channels + 1)})
+    manager = run.visa({'GPIB0::9::INSTR': Multimeter34401ASimulation(source=multiplexer_simulation.resistance),
+                        'GPIB0::3::INSTR': multiplexer_simulation})
+    from ..agilent.multimeter34401A import Multimeter34401A, SenseMethod
+    from ..agilent.multiplexer34907A import Multiplexer34970A
+
+    dmm = run.watch(Multimeter34401A(open_session('GPIB0::9::INSTR')))
+    multiplexer = run.watch(Multiplexer34970A(manager.open_resource('GPIB0::3::INSTR')))
+
+    with run.measure():
+        dmm.set_sense(SenseMethod.four_probe_resistance, integration_time_nplc=1)
+        for channel in range(1, channels + 1):
+            multiplexer.close(channel)
+            dmm.resistance
+            multiplexer.open(channel)
+
+
+def sr830_poll(run: Run, polls: int = 20, snap: bool = False):
+    """ X, Y, R and theta of the SR830, twenty times, as one SNAP? each
+        time if snap
+    """
+    from ..simulation.stanford_research_systems import SR830Simulation
+
+    run.visa({'GPIB0::6::INSTR': SR830Simulation()})
+    from ..stanford_research_systems.sr830m import SR830m
+    lock_in = run.watch(SR830m('GPIB0::6::INSTR'))
+
+    with run.measure():
+        for _ in range(polls):
+            if snap:
+                lock_in.snap('x', 'y', 'r', 'theta')
+                continue
+            lock_in.outpX
+            lock_in.outpY
+            lock_in.outpR
+            lock_in.outpT
+
+
+def sr830_scaled_poll(run: Run, polls: int = 20):
+    """ X and Y of the SR830 with the sensitivity and time constant they
+        are scaled with, twenty times after one read of all settings
+    """
+    from ..simulation.stanford_research_systems import SR830Simulation
+
+    run.visa({'GPIB0::6::INSTR': SR830Simulation()})
+    from ..stanford_research_systems.sr830m import SR830m
+    lock_in = run.watch(SR830m('GPIB0::6::INSTR'))
+
+    with run.measure():
+        lock_in.refresh()
+        for _ in range(polls):
+            lock_in.snap('x', 'y')
+            lock_in.sens
+            lock_in.oflt
+
+
+def sr830_storage(run: Run, chunks: int = 4, seconds: float = 0.25):
+    """ One second of X and Y stored at 512 Hz by the SR830, drained in
+        four chunks while storing
+    """
+    from ..simulation.stanford_research_systems import SR830Simulation
+
+    run.visa({'GPIB0::6::INSTR': SR830Simulation()})
+    from ..stanford_research_systems.sr830m import SR830m
+    lock_in = run.watch(SR830m('GPIB0::6::INSTR'))
+
+    with run.measure():
+        lock_in.startStorage(512)
+        for _ in range(chunks):
+            lock_in.inst.sleep(seconds, 'acquisition')
+            lock_in.readStorage()
+        lock_in.paus()
+
+
+def sr830_stream(run: Run, points: int = 512):
+    """ One second of X and Y streamed at 512 Hz in FAST mode """
+    from ..simulation.stanford_research_systems import SR830Simulation
+
+    run.visa({'GPIB0::6::INSTR': SR830Simulation()})
+    from ..stanford_research_systems.sr830m import SR830m
+    lock_in = run.watch(SR830m('GPIB0::6::INSTR'))
+
+    with run.measure():
+        for _ in lock_in.stream(512, blockSize=64, points=points):
+            pass
+
+
+def sr844_frequency_sweep(run: Run, points: int = 20):
+    """ X and Y of the SR844 at twenty frequencies, each read when the
+        output settled with a time constant of 3 ms
+    """
+    from ..simulation.stanford_research_systems import SR844Simulation
+
+    run.visa({'GPIB0::8::INSTR': SR844Simulation()})
+    from ..stanford_research_systems.sr844m import SR844m
+    lock_in = run.watch(SR844m(open_session('GPIB0::8::INSTR')))
+    lock_in.set_integration_time(3E-3)
+
+    with run.measure():
+        for frequency in np.geomspace(1e5, 1e7, points):
+            lock_in.set_frequency(float(frequency))
+            lock_in.wait_settled()
+            lock_in.snap('x', 'y')
+
+
+WORKFLOWS = {'iv_sweep': iv_sweep,
+             'mode_switching': mode_switching,
+             'lcr_frequency_sweep': lcr_frequency_sweep,
+             'lcr_frequency_sweep_fast': partial(lcr_frequency_sweep, fast=True),
+             'lcr_list_sweep': lcr_list_sweep,
+             'lcr_setup': lcr_setup,
+             'lcr_setup_configuration': partial(lcr_setup, configuration=True),
+             'itc_device_status': itc_device_status,
+             'itc_device_status_fast': partial(itc_device_status, fast=True),
+             'itc_setup': itc_setup,
+             'itc_setup_session': partial(itc_setup, session=True),
+             'mini8_poll': mini8_poll,
+             'scanned_resistance': scanned_resistance,
+             'sr830_poll': sr830_poll,
+             'sr830_poll_snap': partial(sr830_poll, snap=True),
+             'sr830_scaled_poll': sr830_scaled_poll,
+             'sr830_storage': sr830_storage,
+             'sr830_stream': sr830_stream,
+             'sr844_frequency_sweep': sr844_frequency_sweep}
@@ -25,6 +25,8 @@ import sys
 from datetime import datetime
 import time
 
+from ..transport.base import Transaction
+
 class AutoTune(object):
     def __init__(self, loop, data = [0,0,0,0,0,0,0,0,0]):
         self.__autotune_type = data[0]
@@ -303,10 +305,45 @@ class EurothermMini8(ModbusInstrument):
         self.lock = Lock()
         self.loops = []
 
+        # timing hooks like those of the transports, see transport.instrumentation
+        self.hooks = []
+        self.resource_name = port
+        self.bus = port
+
         for i in range(0, 8):
             self.loops.append(Loop(self, i * 256, self.lock))
 
 
+    def _instrumented(self, kind, function, args, kwargs, nbytes):
+        if not self.hooks:
+            return function(self, *args, **kwargs)
+
+        command = '{}({})'.format(function.__name__, ','.join(str(arg) for arg in args))
+        start = time.perf_counter()
+        try:
+            result = function(self, *args, **kwargs)
+        except Exception as error:
+            self._notify(kind, command, 0, start, error)
+            raise
+        self._notify(kind, command, nbytes, start, None)
+        return result
+
+    def _notify(self, kind, command, nbytes, start, outcome):
+        event = Transaction(self, kind, command, nbytes, start, time.perf_counter(), outcome)
+        for hook in self.hooks:
+            hook(event)
+
+    def read_register(self, *args, **kwargs):
+        return self._instrumented('query', ModbusInstrument.read_register, args, kwargs, 2)
+
+    def read_registers(self, *args, **kwargs):
+        count = args[1] if len(args) > 1 else kwargs.get('number_of_registers',
+                                                         kwargs.get('numberOfRegisters', 1))
+        return self._instrumented('query', ModbusInstrument.read_registers, args, kwargs, 2 * count)
+
+    def write_register(self, *args, **kwargs):
+        return self._instrumented('write', ModbusInstrument.write_register, args, kwargs, 2)
+
     def reconnect(self):
         ModbusInstrument.__init__(self, port, 1)
         print('reconnected')
@@ -10,83 +10,272 @@ __email__ = 'hanefeld@physik.uni-frankfurt.de'
 __status__ = 'alpha'
 __license__ = 'MIT'
 
+from bisect import bisect_left
+from collections import namedtuple
+from enum import Enum
+from functools import lru_cache
+from importlib import resources
+
 import visa
-import gpib
-import time
 import numpy as np
 
+from ..transport.arbiter import bus_transaction
+from ..transport.base import as_transport
+from ..transport.recovery import Desynchronised, recovering
+from ..transport.scpi import ScpiBatch
+from ..transport.shadow import ShadowState, setting_of
+
+# points of the list sweep table and readings of the data buffer memory
+LIST_POINTS = 10
+BUFFER_POINTS = 128
+
+# values of every list sweep point: primary and secondary parameter, status
+# and comparator result
+LIST_POINT_VALUES = 4
+
+# measurement functions, primary and secondary parameter
+MEASUREMENT_TYPES = ('CPD', 'CPQ', 'CPG', 'CPRP', 'CSD', 'CSQ', 'CSRS', 'LPQ', 'LPD', 'LPG',
+                     'LPRP', 'LSD', 'LSQ', 'LSRS', 'RX', 'ZTD', 'ZTR', 'GB', 'YTD', 'YTR')
+
+INTEGRATION_TIMES = ('SHOR', 'MED', 'LONG')
+
+# allowed frequencies of the device, shipped next to this module
+FREQUENCY_TABLE = 'hp4284a_lcrmeter_frequency_table.par'
+
+# binary data format of the device, 64 bit reals in big endian byte order
+REAL64 = np.dtype('>f8')
+
+# result of a list sweep, numpy arrays with one entry per point
+# status -- 0 for a valid measurement, 1 for an overload, 3 and 4 if the
+#           auto level control failed, -1 for a point without data
+ListSweep = namedtuple('ListSweep', ['values', 'primary', 'secondary', 'status'])
+
+
+@lru_cache(maxsize=None)
+def allowed_frequencies():
+    """ Returns the sorted allowed frequencies in Hz as read-only array, the
+        table is read once per process
+    """
+    text = resources.files(__package__).joinpath(FREQUENCY_TABLE).read_text()
+    frequencies = np.unique(np.array(text.split(), dtype=float))
+    frequencies.flags.writeable = False
+    return frequencies
+
+
+@lru_cache(maxsize=None)
+def _frequency_index():
+    # the table as python floats for bisect
+    return tuple(allowed_frequencies().tolist())
+
+
+def snap_frequency(frequency):
+    """ Returns the allowed frequency nearest to frequency in Hz """
+    index = _frequency_index()
+    position = bisect_left(index, frequency)
+    if position == 0:
+        return index[0]
+    if position == len(index):
+        return index[-1]
+    below, above = index[position - 1], index[position]
+    return below if frequency - below <= above - frequency else above
+
+
+def snap_frequencies(frequencies):
+    """ Returns the allowed frequencies nearest to frequencies as array of
+        the same shape, e.g. the frequencies a sweep is really measured at
+
+        Arguments:
+        frequencies -- (array_like) frequencies in Hz
+    """
+    table = allowed_frequencies()
+    frequencies = np.asarray(frequencies, dtype=float)
+    above = np.clip(np.searchsorted(table, frequencies), 1, len(table) - 1)
+    below = above - 1
+    nearer_below = frequencies - table[below] <= table[above] - frequencies
+    return table[np.where(nearer_below, below, above)]
+
+
+def _setting_of(command):
+    # voltage and current share the oscillator level and the DC bias
+    setting = setting_of(command)
+    return {'CURR': 'VOLT', 'BIAS:CURR': 'BIAS:VOLT'}.get(setting, setting)
+
+
+def _switch(value):
+    return 'ON' if value else 'OFF'
+
+
+class MeasurementConfiguration(namedtuple('MeasurementConfiguration', [
+        'measurement_type', 'frequency', 'integration_time', 'num_averages', 'source_voltage',
+        'source_current', 'dc_bias_voltage', 'dc_bias_current', 'auto_range', 'auto_level_control',
+        'high_power_mode'])):
+    """ Immutable settings of one measurement, validated on construction
+        and applied by LCR.configure, e.g.
+
+            setup = MeasurementConfiguration('CPD', frequency=10e3, num_averages=4)
+            lcr.configure(setup)
+
+        The oscillator level is either source_voltage in V or
+        source_current in mA, 1V if both are None. A dc_bias_voltage in V
+        or a dc_bias_current in mA switches the DC bias on. The frequency
+        is snapped to the nearest allowed frequency.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, measurement_type='CPD', frequency=1000.0, integration_time='MED', num_averages=1,
+                source_voltage=None, source_current=None, dc_bias_voltage=None, dc_bias_current=None,
+                auto_range=True, auto_level_control=False, high_power_mode=False):
+        if measurement_type not in MEASUREMENT_TYPES:
+            raise ValueError('{!r} is no measurement type, choose from {}'.format(measurement_type, MEASUREMENT_TYPES))
+        if integration_time not in INTEGRATION_TIMES:
+            raise ValueError('{!r} is no integration time, choose from {}'.format(integration_time, INTEGRATION_TIMES))
+        if int(num_averages) != num_averages or not 1 <= num_averages <= 128:
+            raise ValueError('The number of averages is 1 to 128, got {}'.format(num_averages))
+        if source_voltage is not None and source_current is not None:
+            raise ValueError('The oscillator level is either a voltage or a current')
+        if dc_bias_voltage is not None and dc_bias_current is not None:
+            raise ValueError('The DC bias is either a voltage or a current')
+        if source_voltage is None and source_current is None:
+            source_voltage = 1.0
+
+        high_power_mode = bool(high_power_mode)
+        _check_range('Source voltage', source_voltage, 0.005, 20.0 if high_power_mode else 2.0, 'V')
+        _check_range('Source current', source_current, 0.05, 200.0 if high_power_mode else 20.0, 'mA')
+        _check_range('Bias voltage', dc_bias_voltage, 0.0, 40.0 if high_power_mode else 2.0, 'V')
+        if dc_bias_current is not None and not high_power_mode:
+            raise ValueError('A bias current needs the high power mode')
+        _check_range('Bias current', dc_bias_current, 0.0, 100.0, 'mA')
+
+        return super().__new__(cls, measurement_type, snap_frequency(float(frequency)), integration_time,
+                               int(num_averages), _optional_float(source_voltage), _optional_float(source_current),
+                               _optional_float(dc_bias_voltage), _optional_float(dc_bias_current),
+                               bool(auto_range), bool(auto_level_control), high_power_mode)
+
+    @property
+    def dc_bias(self):
+        return self.dc_bias_voltage is not None or self.dc_bias_current is not None
+
+    def commands(self):
+        """ Returns the commands setting the configuration, in the order
+            the device accepts them: the high power mode before the levels
+            it allows
+        """
+        commands = ['FUNC:IMP ' + self.measurement_type,
+                    'FREQ ' + str(self.frequency),
+                    'APER ' + self.integration_time + ',' + str(self.num_averages),
+                    'OUTP:HPOW ' + _switch(self.high_power_mode)]
+        if self.source_current is not None:
+            commands.append('CURR ' + str(self.source_current) + 'MA')
+        else:
+            commands.append('VOLT ' + str(self.source_voltage) + 'V')
+        commands += ['AMPL:ALC ' + _switch(self.auto_level_control),
+                     'FUNC:IMP:RANG:AUTO ' + _switch(self.auto_range)]
+        if self.dc_bias_current is not None:
+            commands.append('BIAS:CURR ' + str(self.dc_bias_current) + 'MA')
+        elif self.dc_bias_voltage is not None:
+            commands.append('BIAS:VOLT ' + str(self.dc_bias_voltage) + 'V')
+        commands.append('BIAS:STAT ' + _switch(self.dc_bias))
+        return commands
+
+
+def _optional_float(value):
+    return None if value is None else float(value)
+
+
+def _check_range(name, value, low, high, unit):
+    if value is not None and not low <= float(value) <= high:
+        raise ValueError('{} is {} to {}{}, got {}'.format(name, low, high, unit, value))
+
+
+class ListParameter(Enum):
+    """ Parameters a list sweep steps through, values in Hz, V and A """
+    frequency = 'FREQ'
+    voltage = 'VOLT'
+    current = 'CURR'
+    bias_voltage = 'BIAS:VOLT'
+    bias_current = 'BIAS:CURR'
+
 
 class LCR(object):
     """ This class  offers an easy access to the different functionalities
     of the LCR Meter
     """
-    def __init__(self, device):
+
+    # bytes per program message the driver sends at most
+    input_buffer_size = 256
+
+    def __init__(self, device, fast=False, binary=True):
         """ Initializes the ITC class. It depends on an visa device
 
             Arguments:
             device -- (visa.instrument) a GPIB instrument is required
+            fast -- (bool) skip the bus clear before every command, every
+                    answer is checked instead and the bus only cleared
+                    when the communication got out of step
+            binary -- (bool) measurement data are transferred as 64 bit
+                      reals, False selects ASCII data for debugging
         """
-        self.__lcr = device
-        self.__lcr.term_chars = '\r'
-        # needed for error free communication
-        gpib.config(self.__lcr.device, gpib.IbcEOSchar, ord('\r'))
-        # use REOS und XEOS
-        gpib.config(self.__lcr.device, gpib.IbcEOSrd, 0x800 | 0x400)
+        self.__lcr = as_transport(device)
+        self.fast = fast
+        self.binary = binary
+        # settings sent to the device, see configure
+        self.__shadow = ShadowState(_setting_of)
+        # needed for error free communication, uses REOS und XEOS
+        self.__lcr.configure_eos('\r')
 
 
         # Setup the device to work as needed for the following functions
         self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.__lcr.write("FORM ASCII") # Set data output format to ASCii
+        self.__lcr.write("FORM REAL,64" if binary else "FORM ASCII") # Set data output format
         self.__lcr.write("TRIG:SOUR BUS") # Set trigger to listen only on gpib-bus
         self.__lcr.write("INIT:CONT ON") # Set the system to continuously wait for the next trigger
 
-
-        # Load a list of allowed frequency vaules for the device
-        self.__frequency_list = np.loadtxt('HP4284A_LCRMeter_frequency_table.par')
-
         # Set a list of all possible meaurement settings
-        self.__measurement_ident_list = ['CPD', 'CPQ', 'CPG', 'CPRP', 'CSD', 'CSQ', 'CSRS','LPQ', 'LPD', 'LPG',
-                                        'LPRP', 'LSD','LSQ', 'LSRS', 'RX', 'ZTD', 'ZTR', 'GB', 'YTD', 'YTR']
+        self.__measurement_ident_list = list(MEASUREMENT_TYPES)
 
         # Set variables important for the state of the instrument
         self.high_power_mode = False
-        self.__num_averages = 1 # Has to be preset, because the number averages and the integration time use one LCR-command
-        self.__integration_time = 'MED'
+        # the number of averages and the integration time share one LCR-command,
+        # both are read from the device once one of them is set
+        self.__integration_time = None
+        self.__num_averages = None
 
 
     @property
+    @bus_transaction('_LCR__lcr')
     def frequency(self):
         ''' Method to get the frequency set for the device '''
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        frequency = self.__lcr.ask("FREQ?")
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        frequency = self._query("FREQ?", float)
         return float(frequency)
 
     @frequency.setter
+    @bus_transaction('_LCR__lcr')
     def frequency(self, frequency):
-        ''' Set (Query) the measurement frequency of the device. Non-allowed frequencies are blocked. '''
-        
-        if frequency in self.__frequency_list:
-            value_verified = True
-        else:
-            print "Desired frequency is not an allowed frequency for the device"
-            value_verified = False
+        ''' Set (Query) the measurement frequency of the device. Non-allowed frequencies are snapped to the nearest allowed one. '''
+
+        allowed = snap_frequency(float(frequency))
+        if allowed != frequency:
+            print("Desired frequency is not an allowed frequency for the device, set to " + str(allowed) + "Hz.")
 
         # Communication with the instrument
-        if value_verified:
-            signal_str = 'FREQ ' + str(frequency)
-            self.clear() # Clears the GPIB Bus to prevent problems in communication.
-            self.__lcr.write(signal_str)
+        signal_str = 'FREQ ' + str(allowed)
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        self._set(signal_str)
 
     
 
     @property
+    @bus_transaction('_LCR__lcr')
     def measurement_type(self):
         ''' Method to get the measurement type set for the device '''
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        measurement_type = self.__lcr.ask("FUNC:IMP?")
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        measurement_type = self._query("FUNC:IMP?", self.__measurement_identifier)
         return measurement_type
 
     @measurement_type.setter
+    @bus_transaction('_LCR__lcr')
     def measurement_type(self, identifier):
         ''' Set (Query) the type of measurement by one identifier.
 
@@ -117,26 +306,28 @@ class LCR(object):
         if identifier in self.__measurement_ident_list:
             value_verified = True
         else:
-            print "Measurement identifier is not a valid identifier. Please chose from the following list."
-            print self.__measurement_ident_list
+            print("Measurement identifier is not a valid identifier. Please chose from the following list.")
+            print(self.__measurement_ident_list)
             value_verified = False
 
         # Communication with the instrument
         if value_verified:
             signal_str = 'FUNC:IMP ' + str(identifier)
-            self.clear() # Clears the GPIB Bus to prevent problems in communication.
-            self.__lcr.write(signal_str)
+            self._sync() # Clears the GPIB Bus to prevent problems in communication.
+            self._set(signal_str)
 
 
 
     @property
+    @bus_transaction('_LCR__lcr')
     def auto_range(self):
         ''' Method to get the auto-range setting for the device '''
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        auto_range = self.__lcr.ask("FUNC:IMP:RANG:AUTO?")
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        auto_range = self._query("FUNC:IMP:RANG:AUTO?", int)
         return bool(int(auto_range))
 
     @auto_range.setter  
+    @bus_transaction('_LCR__lcr')
     def auto_range(self, value):
         """
             Enables or disables the Auto-Range function of the device.
@@ -154,22 +345,24 @@ class LCR(object):
 
 
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
         if value:
-            self.__lcr.write("FUNC:IMP:RANG:AUTO ON")
+            self._set("FUNC:IMP:RANG:AUTO ON")
         else:
-            self.__lcr.write("FUNC:IMP:RANG:AUTO OFF")
+            self._set("FUNC:IMP:RANG:AUTO OFF")
 
 
 
     @property
+    @bus_transaction('_LCR__lcr')
     def auto_level_control(self):
         ''' Method to get the auto level control setting for the device '''
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        auto_level_control = self.__lcr.ask("AMPL:ALC?")
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        auto_level_control = self._query("AMPL:ALC?", int)
         return bool(int(auto_level_control))
     
     @auto_level_control.setter
+    @bus_transaction('_LCR__lcr')
     def auto_level_control(self, value):
         """
             Enables or disables the Auto-Level-Control of the device.
@@ -187,24 +380,26 @@ class LCR(object):
 
 
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
         if value:
-            self.__lcr.write("AMPL:ALC ON")
+            self._set("AMPL:ALC ON")
         else:
-            self.__lcr.write("AMPL:ALC OFF")
+            self._set("AMPL:ALC OFF")
 
 
 
     @property
+    @bus_transaction('_LCR__lcr')
     def high_power_mode(self):
         ''' Method to get the high power mode setting for the device '''
 
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        high_power_mode = self.__lcr.ask("OUTP:HPOW?")
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        high_power_mode = self._query("OUTP:HPOW?", int)
         self.__high_power_mode = bool(int(high_power_mode))
         return self.__high_power_mode
 
     @high_power_mode.setter
+    @bus_transaction('_LCR__lcr')
     def high_power_mode(self, value):
         """
             Enables or disables the High Power Mode of the device.
@@ -222,24 +417,26 @@ class LCR(object):
 
 
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
         if value:
-            self.__lcr.write("OUTP:HPOW ON")
+            self._set("OUTP:HPOW ON")
             self.__high_power_mode = True
         else:
-            self.__lcr.write("OUTP:HPOW OFF")
+            self._set("OUTP:HPOW OFF")
             self.__high_power_mode = False
 
 
 
     @property
+    @bus_transaction('_LCR__lcr')
     def dc_bias_status(self):
         ''' Method to get the status of a dc bias set for the device '''
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        dc_bias_status = self.__lcr.ask("BIAS:STAT?")
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        dc_bias_status = self._query("BIAS:STAT?", int)
         return bool(int(dc_bias_status))
 
     @dc_bias_status.setter
+    @bus_transaction('_LCR__lcr')
     def dc_bias_status(self, value):
         """
             Enables or disables the usage of a bias current or voltage of the device.
@@ -257,22 +454,24 @@ class LCR(object):
 
 
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
         if value:
-            self.__lcr.write("BIAS:STAT ON")
+            self._set("BIAS:STAT ON")
         else:
-            self.__lcr.write("BIAS:STAT OFF")
+            self._set("BIAS:STAT OFF")
 
 
 
     @property
+    @bus_transaction('_LCR__lcr')
     def source_voltage(self):
         ''' Method to get the source oszillator voltage level set for the device '''
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        source_voltage = self.__lcr.ask("VOLT?")
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        source_voltage = self._query("VOLT?", float)
         return float(source_voltage)
 
     @source_voltage.setter
+    @bus_transaction('_LCR__lcr')
     def source_voltage(self, voltage):
         """
             Adjusts the source oszillator voltage level set for the device
@@ -289,30 +488,32 @@ class LCR(object):
             raise ScriptSyntaxError("The voltage must be a float!")
         if voltage < 0.005:
             voltage = 0.005
-            print "Source voltage too low, set to 5mV."
+            print("Source voltage too low, set to 5mV.")
         if self.high_power_mode:
             if voltage > 20.0:
                 voltage = 20.0
-                print "Source voltage too high for HP-Mode, set to 20.0V."
+                print("Source voltage too high for HP-Mode, set to 20.0V.")
         else:
             if voltage > 2.0:
                 voltage = 2.0
-                print "Source voltage too high, set to 2.0V. Switch to high power mode for voltages up to 20.0V."
+                print("Source voltage too high, set to 2.0V. Switch to high power mode for voltages up to 20.0V.")
 
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.__lcr.write("VOLT " + str(voltage) + "V") 
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        self._set("VOLT " + str(voltage) + "V") 
 
 
 
     @property
+    @bus_transaction('_LCR__lcr')
     def source_current(self):
         ''' Method to get the source oszillator current level set for the device '''
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        source_current = self.__lcr.ask("CURR?")
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        source_current = self._query("CURR?", float)
         return float(source_current)
 
     @source_current.setter
+    @bus_transaction('_LCR__lcr')
     def source_current(self, current):
         """
             Adjusts the source oszillator current level set for the device
@@ -329,30 +530,32 @@ class LCR(object):
             raise ScriptSyntaxError("The current must be a float!")
         if current < 0.05:
             current = 0.05
-            print "Source current too low, set to 0.05mA."
+            print("Source current too low, set to 0.05mA.")
         if self.high_power_mode:
             if current > 200.0:
                 current = 200.0
-                print "Source current too high for HP-Mode, set to 200.0mA."
+                print("Source current too high for HP-Mode, set to 200.0mA.")
         else:
             if current > 20.0:
                 current = 20.0
-                print "Source current too high, set to 20.0mA. Switch to high power mode for currents up to 200.0mA."
+                print("Source current too high, set to 20.0mA. Switch to high power mode for currents up to 200.0mA.")
 
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.__lcr.write("CURR " + str(current) + "MA") 
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        self._set("CURR " + str(current) + "MA") 
 
 
 
     @property
+    @bus_transaction('_LCR__lcr')
     def dc_bias_voltage(self):
         ''' Method to get the voltage of a dc bias set for the device '''
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        dc_bias_voltage = self.__lcr.ask("BIAS:VOLT?")
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        dc_bias_voltage = self._query("BIAS:VOLT?", float)
         return float(dc_bias_voltage)
 
     @dc_bias_voltage.setter
+    @bus_transaction('_LCR__lcr')
     def bias_voltage(self, voltage):
         """
             Adjusts the bias voltage set for the device
@@ -369,30 +572,32 @@ class LCR(object):
             raise ScriptSyntaxError("The voltage must be a float!")
         if voltage < 0.0:
             voltage = 0.0
-            print "Bias voltage too low, set to 0V."
+            print("Bias voltage too low, set to 0V.")
         if self.high_power_mode:
             if voltage > 40.0:
                 voltage = 40.0
-                print "Bias voltage too high for HP-Mode, set to 40.0V."
+                print("Bias voltage too high for HP-Mode, set to 40.0V.")
         else:
             if voltage > 2.0:
                 voltage = 2.0
-                print "Bias voltage too high, set to 2.0V. Switch to high power mode for voltages up to 40.0V."
+                print("Bias voltage too high, set to 2.0V. Switch to high power mode for voltages up to 40.0V.")
 
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.__lcr.write("BIAS:VOLT " + str(voltage) + "V")  
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        self._set("BIAS:VOLT " + str(voltage) + "V")  
 
 
 
     @property
+    @bus_transaction('_LCR__lcr')
     def dc_bias_current(self):
         ''' Method to get the current of a dc bias set for the device '''
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        dc_bias_current = self.__lcr.ask("BIAS:CURR?")
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        dc_bias_current = self._query("BIAS:CURR?", float)
         return float(dc_bias_current)
 
     @dc_bias_current.setter
+    @bus_transaction('_LCR__lcr')
     def bias_current(self, current):
         """
             Adjusts the bias current set for the device
@@ -409,29 +614,30 @@ class LCR(object):
             raise ScriptSyntaxError("The current must be a float!")
         if current < 0.0:
             current = 0.0
-            print "Bias current too low, set to 0mA."
+            print("Bias current too low, set to 0mA.")
         if self.high_power_mode:
             if current > 100.0:
                 current = 100.0
-                print "Bias current too high for HP-Mode, set to 100.0mA."
+                print("Bias current too high for HP-Mode, set to 100.0mA.")
         else:
-            print "Bias current not available for normal mode, use high-power mode instead."
+            print("Bias current not available for normal mode, use high-power mode instead.")
 
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.__lcr.write("BIAS:CURR " + str(current) + "MA")
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        self._set("BIAS:CURR " + str(current) + "MA")
 
 
 
     @property
+    @bus_transaction('_LCR__lcr')
     def integration_time(self):
         ''' Method to get integration time set for the device '''
 
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        integration_time = self.__lcr.ask("APER?")
-        return integration_time.split(',')[0]
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        return self.__read_aperture()[0]
 
     @integration_time.setter
+    @bus_transaction('_LCR__lcr')
     def integration_time(self, identifier):
         ''' Set (Query) the integration time to a value or use an identifier.
 
@@ -445,26 +651,28 @@ class LCR(object):
         if identifier in ['SHOR', 'MED', 'LONG']:
             value_verified = True
         else:
-            print "Identifier is not a valid identifier. Please chose from 'SHOR', 'MED' and 'LONG'."
+            print("Identifier is not a valid identifier. Please chose from 'SHOR', 'MED' and 'LONG'.")
             value_verified = False
 
         # Communication with the instrument
         if value_verified:
-            signal_str = 'APER ' + str(identifier) + ',' + str(self.__num_averages)
-            self.clear() # Clears the GPIB Bus to prevent problems in communication.
-            self.__lcr.write(signal_str)
+            self._sync() # Clears the GPIB Bus to prevent problems in communication.
+            signal_str = 'APER ' + str(identifier) + ',' + str(self.__aperture_setting()[1])
+            self._set(signal_str)
+            self.__integration_time = identifier
 
 
 
     @property
+    @bus_transaction('_LCR__lcr')
     def num_averages(self):
         ''' Method to get the number measurements that should be averaged for one data point set for the device '''
 
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        num_averages = self.__lcr.ask("APER?")
-        return float(num_averages.split(',')[1])
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        return float(self.__read_aperture()[1])
 
     @num_averages.setter
+    @bus_transaction('_LCR__lcr')
     def num_averages(self, value):
         ''' Set (Query) the integration time to a value or use an identifier.
 
@@ -478,36 +686,177 @@ class LCR(object):
             raise ScriptSyntaxError("The valuee must be an integer!")
         if value < 1:
             value = 1
-            print "Number of averages to low, set to 1."
+            print("Number of averages to low, set to 1.")
         if value > 128:
             value = 128
-            print "Number of averages to high, set to 128."
+            print("Number of averages to high, set to 128.")
 
-        # Communication with the instrument
-        signal_str = 'APER ' + str(self.integration_time) + ',' + str(value)
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.__lcr.write(signal_str)
+        # Communication with the instrument, the integration time is kept
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        signal_str = 'APER ' + str(self.__aperture_setting()[0]) + ',' + str(value)
+        self._set(signal_str)
+        self.__num_averages = value
 
+    @bus_transaction('_LCR__lcr')
     def read_data(self):
         ''' 
         Method to get the measuement data from the device. The *TRG command (trigger command) performs the same function as the Group Execute Trigger. This command moves the primary and secondary parameter measurement data into the HP 4284A's output buffer. '''
 
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        data = self.__lcr.ask("*TRG")
-        value1 = float(data.split(',')[0])
-        value2 = float(data.split(',')[1])
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        # primary, secondary parameter and measurement status
+        value1, value2, status = recovering(lambda: self.__values(self.__trigger(), 3), self.clear)
         return float(value1), float(value2)
 
+    @bus_transaction('_LCR__lcr')
+    def list_sweep(self, parameter, values):
+        """
+            Measures a list sweep, one trigger per 10 points of the list
+            table. The points are collected in the data buffer memory of
+            the device and read back in one transfer, the timeout of the
+            device has to cover the measurement of all points.
+
+            Arguments:
+            parameter -- (ListParameter) the parameter to sweep
+            values -- (array_like) up to 128 points in Hz, V or A,
+                      frequencies are snapped to allowed frequencies
+
+            Return:
+            (ListSweep) values, primary and secondary parameter and status
+        """
+        parameter = ListParameter(parameter)
+        values = np.asarray(values, dtype=float).ravel()
+        if not 1 <= len(values) <= BUFFER_POINTS:
+            raise ValueError('A list sweep has 1 to {} points, got {}'.format(BUFFER_POINTS, len(values)))
+        if parameter is ListParameter.frequency:
+            values = snap_frequencies(values)
+
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        with ScpiBatch(self.__lcr, self.input_buffer_size) as batch:
+            # the device sweeps the list only while the list page is displayed
+            batch.write('DISP:PAGE LIST')
+            batch.write('LIST:MODE SEQ')
+            batch.write('MEM:DIM DBUF,{}'.format(len(values)))
+            batch.write('MEM:FILL DBUF')
+            for start in range(0, len(values), LIST_POINTS):
+                points = ','.join('{:.6G}'.format(value) for value in values[start:start + LIST_POINTS])
+                batch.write('LIST:{} {}'.format(parameter.value, points))
+                batch.write('TRIG')
+                # the buffer is read or the list replaced only after the sweep
+                batch.write('*WAI')
+            if self.binary:
+                answer = batch.query_block('MEM:READ? DBUF')
+            else:
+                answer, = batch.query('MEM:READ? DBUF')
+            data = self.__values(answer, len(values) * LIST_POINT_VALUES).reshape(-1, LIST_POINT_VALUES)
+            batch.write('MEM:CLE DBUF')
+            batch.write('DISP:PAGE MEAS')
+        return ListSweep(values, data[:, 0], data[:, 1], data[:, 2].astype(int))
+
+    @bus_transaction('_LCR__lcr')
+    def configure(self, configuration):
+        """
+            Applies a whole measurement configuration as one compound
+            command. Only the settings which differ from the ones sent
+            before are sent, applying the configuration in place costs
+            no bus transaction at all.
+
+            Arguments:
+            configuration -- (MeasurementConfiguration) the settings
+        """
+        changed = self.__shadow.changed(configuration.commands())
+        if not changed:
+            return
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        try:
+            with ScpiBatch(self.__lcr, self.input_buffer_size) as batch:
+                self.__shadow.apply(changed, batch.write)
+        except Exception:
+            # the batch may have been sent in parts
+            self.__shadow.forget()
+            self.__integration_time = self.__num_averages = None
+            raise
+        self.__high_power_mode = configuration.high_power_mode
+        self.__integration_time = configuration.integration_time
+        self.__num_averages = configuration.num_averages
+
+    def _set(self, command):
+        self.__lcr.write(command)
+        self.__shadow.record(command)
+
+    def __measurement_identifier(self, answer):
+        if answer not in self.__measurement_ident_list:
+            raise Desynchronised('{!r} is no measurement type'.format(answer))
+        return answer
+
+    @staticmethod
+    def __aperture(answer):
+        integration_time, num_averages = answer.split(',')
+        if integration_time not in ('SHOR', 'MED', 'LONG'):
+            raise Desynchronised('{!r} is no aperture'.format(answer))
+        return integration_time, int(float(num_averages))
+
+    def __read_aperture(self):
+        self.__integration_time, self.__num_averages = self._query("APER?", self.__aperture)
+        return self.__integration_time, self.__num_averages
+
+    def __aperture_setting(self):
+        """ Integration time and number of averages, read from the device
+            unless both are known
+        """
+        if self.__integration_time is None or self.__num_averages is None:
+            return self.__read_aperture()
+        return self.__integration_time, self.__num_averages
+
+    def __trigger(self):
+        if self.binary:
+            return self.__lcr.query_block("*TRG")
+        return self.__lcr.ask("*TRG")
+
+    @staticmethod
+    def __values(answer, count):
+        """ Numbers of a binary block (memoryview) or an ASCII (str) answer,
+            decoded without copying the block into a string
+        """
+        if isinstance(answer, str):
+            values = np.array(answer.strip().split(','), dtype=float)
+        else:
+            values = np.frombuffer(answer, REAL64).astype(float)
+        if values.size != count:
+            raise Desynchronised('expected {} values, got {}'.format(count, values.size))
+        return values
+
+    def _sync(self):
+        """
+            Clears the GPIB Bus before a command, the fast mode relies on
+            the recovery of _query instead.
+        """
+        if not self.fast:
+            self.clear()
+
+    def _query(self, command, parse):
+        """
+            Sends command and returns the parsed answer. A missing or
+            malformed answer clears the bus and the command is sent once
+            more.
+
+            Arguments:
+            command -- (str) e.g. 'FREQ?'
+            parse -- (callable) converts the answer, raises ValueError or
+                     Desynchronised if it does not fit the command
+        """
+        return recovering(lambda: parse(self.__lcr.ask(command).strip()), self.clear)
+
     def clear(self):
         """
             Clears the GPIB Bus to prevent problems in communication.
         """
-        time.sleep(0.1)
+        self.__lcr.sleep(0.1, 'settle before clear')
         self.__lcr.clear()
-        time.sleep(0.1)
+        self.__lcr.sleep(0.1, 'settle after clear')
             
+    @bus_transaction('_LCR__lcr')
     def save(self):
-        self.clear()
+        self._sync()
         self.frequency = 1000
         self.high_power_mode = False
         self.dc_bias_status = False
@@ -519,11 +868,11 @@ if __name__ == '__main__':
     DEVICE = visa.instrument('GPIB::4', timeout = None)
     lcr = LCR(DEVICE)
 
-    print lcr.frequency
+    print(lcr.frequency)
     lcr.frequency = 1000
-    print lcr.frequency
+    print(lcr.frequency)
     lcr.measurement_type = 'ZTD'
     lcr.num_averages = 5
-    print lcr.read_data()
+    print(lcr.read_data())
     lcr.save()
     
@@ -1,8 +1,9 @@
+from ..transport.base import as_transport
 
 
 class Multimeter2000(object):
     def __init__(self, device):
-        self.dev = device
+        self.dev = as_transport(device)
 
         self.dev.write('*RST')
 
@@ -19,6 +20,9 @@ class Multimeter2000(object):
     def read(self):
         return float(self.dev.query(':read?'))
 
+    async def read_async(self):
+        return await self.dev.run_async(self.read)
+
 
 if __name__=='__main__':
     from visa import ResourceManager
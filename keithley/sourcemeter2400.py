@@ -1,59 +1,151 @@
+import numpy as np
+
+from ..transport.base import as_transport
+from ..transport.scpi import ScpiBatch, active_batch
+from ..transport.shadow import ShadowState, setting_of
+
+# binary readings: 32 bit reals, little endian after :format:border swapped
+SREAL = np.dtype('<f4')
+
+
+def _setting_of(command):
+    # the integration time is one setting for all measure functions
+    setting = setting_of(command)
+    if setting.endswith(':nplcycles'):
+        return ':sense:nplcycles'
+    return setting
+
 
 class Sourcemeter2400(object):
-    def __init__(self, device):
-        self._dev = device
-
-    def voltage_driven(self, voltage, current_limit=1e-6, nplc=1):
-        self._dev.write('*RST')
-        self._dev.write(':sense:function "current"')
-        self._dev.write(':source:function voltage')
-        self._dev.write(':source:voltage:range:auto on')
-        self._dev.write(':sense:current:range:auto on')
-        self._dev.write(':sense:current:protection {0}'.format(current_limit))
-        self._dev.write(':sense:current:nplcycles {}'.format(nplc))
-        self._dev.write(':sense:average off')
-        self._dev.write(':output:state 0')
-        self._dev.write(':source:voltage:level {0}'.format(voltage))
-        self._dev.write(":format:elements voltage, current")
-
-    def current_driven(self, current, voltage_limit=1, nplc=1):
-        self._dev.write('*RST')
-        self._dev.write(':sense:function "voltage"')
-        self._dev.write(':source:function current')
-        self._dev.write(':source:current:range:auto on')
-        self._dev.write(':sense:voltage:range:auto on')
-        self._dev.write(':sense:voltage:protection {0}'.format(voltage_limit))
-        self._dev.write(':sense:voltage:nplcycles {}'.format(nplc))
-        self._dev.write(':sense:average off')
-        self._dev.write(':output:state 0')
-        self._dev.write(':source:current:level {0}'.format(current))
-        self._dev.write(":format:elements voltage, current")
+    # bytes per program message sent by a batch
+    input_buffer_size = 512
+
+    def __init__(self, device, binary=True):
+        """ Arguments:
+            device -- (visa.instrument or Transport) the instrument
+            binary -- (bool) readings are transferred as 32 bit reals,
+                      False selects ASCII readings for debugging
+        """
+        self._dev = as_transport(device)
+        self.binary = binary
+        # settings sent since the last *RST, a fresh instrument is in an
+        # unknown state and starts cold
+        self._shadow = ShadowState(_setting_of)
+        self._cold = True
+
+    def batch(self) -> ScpiBatch:
+        """ Context in which the writes of all driver calls are sent as one
+            message, e.g. reconfiguring between sweep segments and the
+            first read cost one bus transaction.
+        """
+        return ScpiBatch(self._dev, self.input_buffer_size)
+
+    def _write(self, message, sent=None):
+        """ Writes message, calls sent() once it went out """
+        batch = active_batch(self._dev)
+        if batch is None:
+            self._dev.write(message)
+            if sent is not None:
+                sent()
+            return
+        batch.write(message)
+        if sent is not None:
+            batch.when_sent(sent)
+
+    def _set(self, command):
+        # unknown until sent, a discarded batch leaves it unknown
+        self._shadow.forget(command)
+        self._write(command, lambda: self._shadow.record(command))
+
+    def voltage_driven(self, voltage, current_limit=1e-6, nplc=1, reset=False):
+        """ Sources voltage and measures current. Only the settings which
+            differ from the last configuration are sent, reset -- (bool)
+            cold starts with *RST and sends all of them.
+        """
+        self._configure([':sense:function "current"',
+                         ':source:function voltage',
+                         ':source:voltage:range:auto on',
+                         ':sense:current:range:auto on',
+                         ':sense:current:protection {0}'.format(current_limit),
+                         ':sense:current:nplcycles {}'.format(nplc),
+                         ':sense:average off',
+                         ':output:state 0',
+                         ':source:voltage:level {0}'.format(voltage),
+                         ":format:elements voltage, current"] + self._format_commands(), reset)
+
+    def current_driven(self, current, voltage_limit=1, nplc=1, reset=False):
+        """ Sources current and measures voltage, see voltage_driven """
+        self._configure([':sense:function "voltage"',
+                         ':source:function current',
+                         ':source:current:range:auto on',
+                         ':sense:voltage:range:auto on',
+                         ':sense:voltage:protection {0}'.format(voltage_limit),
+                         ':sense:voltage:nplcycles {}'.format(nplc),
+                         ':sense:average off',
+                         ':output:state 0',
+                         ':source:current:level {0}'.format(current),
+                         ":format:elements voltage, current"] + self._format_commands(), reset)
+
+    def _format_commands(self):
+        if self.binary:
+            return [':format:data sreal', ':format:border swapped']
+        return [':format:data ascii']
+
+    def _configure(self, commands, reset):
+        try:
+            with self.batch():
+                if reset or self._cold:
+                    self.reset()
+                for command in self._shadow.changed(commands):
+                    self._set(command)
+        except Exception:
+            self._shadow.forget()
+            self._cold = True
+            raise
+
+    def reset(self):
+        """ Cold start with *RST, the next configuration sends all
+            settings
+        """
+        self._shadow.forget()
+        self._write('*RST', self._warm)
+
+    def _warm(self):
+        self._cold = False
 
     def init_beeper(self):
-        self._dev.write(":system:beeper:stat 1")
+        self._write(":system:beeper:stat 1")
 
     def beep(self, frequency:float, duration:float):
-        frequency = min([2e6, max([65, frequency]))
+        frequency = min([2e6, max([65, frequency])])
         duration = min([7.9, max([0, duration])])
         
-        self._dev.write(f":system:beeper:immediate {frequency},{duration}")
+        self._write(f":system:beeper:immediate {frequency},{duration}")
 
     def arm(self):
-        self._dev.write(':output:state 1')
+        self._set(':output:state 1')
 
     def disarm(self):
-        self._dev.write(':output:state 0')
+        self._set(':output:state 0')
 
     def set_voltage(self, voltage):
-        self._dev.write(':source:voltage:level {0}'.format(voltage))
+        self._set(':source:voltage:level {0}'.format(voltage))
 
     def set_current(self, current):
-        self._dev.write(':source:current:level {0}'.format(current))
+        self._set(':source:current:level {0}'.format(current))
 
     def read(self):
-        voltage, current = self._dev.query_ascii_values(':read?')
+        with self.batch() as batch:
+            if self.binary:
+                voltage, current = np.frombuffer(batch.query_block(':read?'), SREAL)
+            else:
+                answer, = batch.query(':read?')
+                voltage, current = answer.split(',')
         return float(voltage), float(current)
 
+    async def read_async(self):
+        return await self._dev.run_async(self.read)
+
     def __str__(self):
         return  'Sourcemeter2400 {}'.format(self._dev.resource_name)
 
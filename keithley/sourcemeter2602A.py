@@ -1,5 +1,9 @@
 from enum import Enum
 
+from ..transport.arbiter import bus_transaction
+from ..transport.base import as_transport
+from ..transport.shadow import ShadowState
+
 
 class SMUChannel(Enum):
     channelA = 'a'
@@ -8,50 +12,75 @@ class SMUChannel(Enum):
 
 class Sourcemeter2602A(object):
     def __init__(self, device, sub_device: SMUChannel = SMUChannel.channelA):
-        self._dev = device
+        self._dev = as_transport(device)
         self._channel_string = 'smu{}'.format(sub_device.value)
         self._channel_token = sub_device.value
         self._channel = sub_device
+        # assignments sent since the last reset of the channel
+        self._shadow = ShadowState()
+        self.reset()
+
+    def voltage_driven(self, voltage, current_limit=1e-6, nplc = 3, range=1e-8, reset=False):
+        """ Sources voltage and measures current. Only the assignments which
+            differ from the last configuration are sent, reset -- (bool)
+            cold starts the channel and sends all of them.
+        """
+        self._configure(['{0}.source.offmode = {0}.OUTPUT_HIGH_Z'.format(self._channel_string),
+                         "{0}.source.func = {0}.OUTPUT_DCVOLTS".format(self._channel_string),
+                         "{}.source.levelv = 0.0".format(self._channel_string),
+                         "{0}.source.autorangev = {0}.AUTORANGE_ON".format(self._channel_string),
+                         "{}.source.limiti = {}".format(self._channel_string, current_limit),
+                         "{0}.measure.autorangei = {0}.AUTORANGE_ON".format(self._channel_string),
+                         "{}.measure.nplc = {}".format(self._channel_string, nplc),
+                         "{}.measure.lowrangei = {}".format(self._channel_string, range)], reset)
+
+    def current_driven(self, current, voltage_limit=1, nplc = 3, range=1e-8, reset=False):
+        """ Sources current and measures voltage, see voltage_driven """
+        self._configure(['{0}.source.offmode = {0}.OUTPUT_HIGH_Z'.format(self._channel_string),
+                         "{0}.source.func = {0}.OUTPUT_DCAMPS".format(self._channel_string),
+                         "{}.source.leveli = {}".format(self._channel_string, current),
+                         "{0}.source.autorangei = {0}.AUTORANGE_ON".format(self._channel_string),
+                         "{}.source.limitv = {}".format(self._channel_string, voltage_limit),
+                         "{0}.measure.autorangev = {0}.AUTORANGE_ON".format(self._channel_string),
+                         "{}.measure.nplc = {}".format(self._channel_string, nplc)], reset)
+
+    def _configure(self, assignments, reset):
+        if reset:
+            self.reset()
+        with self._dev.transaction():
+            self._shadow.apply(assignments, self._dev.write)
+
+    def reset(self):
+        """ Cold start of the channel, the next configuration sends all
+            assignments
+        """
+        self._shadow.forget()
         self._dev.write('{0}.reset()'.format(self._channel_string))
 
-    def voltage_driven(self, voltage, current_limit=1e-6, nplc = 3, range=1e-8):
-        #self._dev.write('{}.reset()'.format(self._channel_string))
-        self._dev.write('{0}.source.offmode = {0}.OUTPUT_HIGH_Z'.format(self._channel_string))
-        self._dev.write("{0}.source.func = {0}.OUTPUT_DCVOLTS".format(self._channel_string))
-        self._dev.write("{}.source.levelv = 0.0".format(self._channel_string))
-        self._dev.write("{0}.source.autorangev = {0}.AUTORANGE_ON".format(self._channel_string))
-        self._dev.write("{}.source.limiti = {}".format(self._channel_string, current_limit))
-        self._dev.write("{0}.measure.autorangei = {0}.AUTORANGE_ON".format(self._channel_string))
-        self._dev.write("{}.measure.nplc = {}".format(self._channel_string, nplc))
-        self._dev.write("{}.measure.lowrangei = {}".format(self._channel_string, range))
-
-    def current_driven(self, current, voltage_limit=1, nplc = 3, range=1e-8):
-        #self._dev.write('{}.reset()'.format(self._channel_string))
-        self._dev.write('{0}.source.offmode = {0}.OUTPUT_HIGH_Z'.format(self._channel_string))
-        self._dev.write("{0}.source.func = {0}.OUTPUT_DCAMPS".format(self._channel_string))
-        self._dev.write("{}.source.leveli = {}".format(self._channel_string, current))
-        self._dev.write("{0}.source.autorangei = {0}.AUTORANGE_ON".format(self._channel_string))
-        self._dev.write("{}.source.limitv = {}".format(self._channel_string, voltage_limit))
-        self._dev.write("{0}.measure.autorangev = {0}.AUTORANGE_ON".format(self._channel_string))
-        self._dev.write("{}.measure.nplc = {}".format(self._channel_string, nplc))
-        #self._dev.write("{}.measure.lowrangev = {}".format(self._channel_string, range))
+    def _set(self, assignment):
+        self._dev.write(assignment)
+        self._shadow.record(assignment)
 
     def arm(self):
-        self._dev.write("{0}.source.output = {0}.OUTPUT_ON".format(self._channel_string))
+        self._set("{0}.source.output = {0}.OUTPUT_ON".format(self._channel_string))
 
     def disarm(self):
-        self._dev.write("{0}.source.output = {0}.OUTPUT_OFF".format(self._channel_string))
+        self._set("{0}.source.output = {0}.OUTPUT_OFF".format(self._channel_string))
 
     def set_voltage(self, voltage):
-        self._dev.write("{}.source.levelv = {}".format(self._channel_string, voltage))
+        self._set("{}.source.levelv = {}".format(self._channel_string, voltage))
 
     def set_current(self, current):
-        self._dev.write("{}.source.leveli = {}".format(self._channel_string, current))
+        self._set("{}.source.leveli = {}".format(self._channel_string, current))
 
+    @bus_transaction('_dev')
     def read(self):
         self._dev.write("ireading{0}, vreading{0} = {1}.measure.iv()".format(self._channel_token, self._channel_string))
         return self._dev.query_ascii_values("printnumber(vreading{0},ireading{0})".format(self._channel_token))
 
+    async def read_async(self):
+        return await self._dev.run_async(self.read)
+
     def __str__(self):
         return 'Sourcemeter 2602A {} {}'.format(self._channel, self._dev.resource_name)
 
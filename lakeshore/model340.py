@@ -1,7 +1,8 @@
 
-import gpib
 from enum import Enum
 
+from ..transport.linuxgpib import GpibTransport
+
 class Sensor(Enum):
     A = 'a'
     B = 'b'
@@ -20,18 +21,19 @@ class Model340:
     TERM_CHARS = '\r\n'
     
     def __init__(self, address, board=0):
-        self._dev = gpib.dev(board, address)
+        self._dev = GpibTransport(address, board,
+                                  write_termination=self.TERM_CHARS,
+                                  read_termination=self.TERM_CHARS)
         
     def _read(self):
-        return gpib.read(self._dev, 512)
+        return self._dev.read_raw()
 
     def _write(self, message):
-        number_of_bytes = gpib.write(self._dev, message + self.TERM_CHARS)
+        number_of_bytes = self._dev.write(message)
         return number_of_bytes
         
     def _query(self, message):
-        self._write(message)
-        return self._read().strip().decode()
+        return self._dev.query_raw(message).strip().decode()
         
     def get_set_point(self, loop:Loop=Loop.ONE):
         return float(self._query('SETP? {}'.format(loop.value)))
@@ -42,6 +44,9 @@ class Model340:
         
     def get_temperature(self, sensor:Sensor=Sensor.A):
         return float(self._query('KRDG? {}'.format(sensor.value)))
+
+    async def get_temperature_async(self, sensor:Sensor=Sensor.A):
+        return await self._dev.run_async(self.get_temperature, sensor)
         
     def get_ramp(self, loop:Loop=Loop.ONE):
         answer = self._query('RAMP? {}'.format(loop.value))
@@ -56,6 +61,12 @@ class Model340:
                                                             rate=rate))
     def get_rampstatus(self, loop:Loop=Loop.ONE):
         return RampStatus(self._query('RAMPST? {}'.format(loop.value)))
+
+    async def get_set_point_async(self, loop:Loop=Loop.ONE):
+        return await self._dev.run_async(self.get_set_point, loop)
+
+    async def get_rampstatus_async(self, loop:Loop=Loop.ONE):
+        return await self._dev.run_async(self.get_rampstatus, loop)
         
         
     @property
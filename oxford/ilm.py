@@ -10,7 +10,8 @@ __status__ = 'alpha'
 __license__ = 'MIT'
 
 import visa
-import gpib
+
+from ..transport.base import as_transport
 
 class ILM(object):
     """ This class offers an easy access to the ILM """
@@ -18,13 +19,12 @@ class ILM(object):
         """ Initializes the ILM class. It depends on an visa device
 
             Arguments:
-            device -- (visa.instrument) a GPIB instrument is required
+            device -- (visa.instrument) a GPIB instrument is required, or
+                      the port of an Isobus shared with other Oxford instruments
         """
-        self.ilm = device
-        self.ilm.term_chars = '\r'
-        gpib.config(self.ilm.device, gpib.IbcEOSchar, ord('\r'))
+        self.ilm = as_transport(device)
         # use REOS und XEOS
-        gpib.config(self.ilm.device, gpib.IbcEOSrd, 0x800 | 0x400)
+        self.ilm.configure_eos('\r')
 
     @property
     def level(self):
@@ -40,6 +40,12 @@ class ILM(object):
 
         return float(level_string) / 10.0
 
+    async def get_level_async(self):
+        """
+            Returns the He4 level like level without blocking the event loop
+        """
+        return await self.ilm.run_async(lambda: self.level)
+
     def clear(self):
         """
             Clears the GPIB Bus to prevent problems in communication.
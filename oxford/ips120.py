@@ -2,6 +2,10 @@
 import gpib
 from enum import Enum
 
+from ..transport.arbiter import Priority, bus_transaction
+from ..transport.base import as_transport
+from ..transport.linuxgpib import GpibTransport
+
 
 class SweepMode(Enum):
     HOLD = 'A0'
@@ -26,25 +30,35 @@ class SwitchHeaterMode(Enum):
     ON = 'H1'
 
 class IPS120_10:
-    def __init__(self, address: int = 25):
+    def __init__(self, address: int = 25, device=None):
+        """ Arguments:
+            address -- (int) GPIB address of a magnet power supply on its own
+            device -- (Transport) connection shared with other instruments
+                      instead, e.g. the port of an Isobus
+        """
+        if device is not None:
+            self._device_handler = as_transport(device)
+            return
+
         assert (1 <= address <= 32), 'address out of range'
 
-        self._device_handler = gpib.dev(0, address)
-        gpib.config(self._device_handler, gpib.IbaEOSrd, 1)
-        gpib.config(self._device_handler, gpib.IbaEOSchar, 13)
+        self._device_handler = GpibTransport(address, 0,
+                                             write_termination='\r',
+                                             read_termination='\r')
+        self._device_handler.configure(gpib.IbaEOSrd, 1)
+        self._device_handler.configure(gpib.IbaEOSchar, 13)
 
     def clear(self):
-        gpib.clear(self._device_handler)
+        self._device_handler.clear()
 
     def _query(self, message: str):
-        self._write(message)
-        return self._read()
+        return self._device_handler.query_raw(message).rstrip()
 
     def _write(self, message: str):
-        gpib.write(self._device_handler, message + '\r')
+        self._device_handler.write(message)
         
     def _read(self) -> str:
-        return gpib.read(self._device_handler, 512).rstrip()
+        return self._device_handler.read_raw().rstrip()
 
     def set_control_mode(self, mode: ControlMode):
         self._query(mode.value)
@@ -85,6 +99,7 @@ class IPS120_10:
         return self._query('R7')
 
     @property
+    @bus_transaction('_device_handler', Priority.CRITICAL)
     def field(self):
         field_bytes = self.get_field()
 
@@ -0,0 +1,135 @@
+#!/usr/bin/python
+""" This module offers the ISOBUS, the daisy chain of Oxford instruments
+    behind one GPIB or serial gateway. The Isobus owns the gateway
+    connection, configures its EOS once and hands out one transport per
+    ISOBUS address to the drivers:
+
+        isobus = Isobus(rm.open_resource('GPIB0::24::INSTR'))
+        itc = ITC(isobus.port(0))
+        ilm = ILM(isobus.port(6))
+        magnet = IPS120_10(device=isobus.port(2))
+"""
+
+__license__ = 'MIT'
+
+import re
+
+from ..transport.base import Transport, as_transport
+
+ISOBUS_PREFIX = re.compile(r'^@\d+')
+
+
+def addressed(address: int, command: str) -> str:
+    """ Returns command with the ISOBUS prefix of address, a prefix the
+        driver wrote itself is replaced: '@0R1' -> '@6R1', 'R7' -> '@6R7'
+    """
+    return '@{}{}'.format(address, ISOBUS_PREFIX.sub('', command, count=1))
+
+
+class IsobusPort(Transport):
+    """ Transport of one instrument on the ISOBUS. Commands are sent
+        through the gateway with the address of the port, the port shares
+        bus and arbiter with the gateway.
+    """
+
+    def __init__(self, isobus, address: int):
+        """ Arguments:
+            isobus -- (Isobus) the bus the instrument is connected to
+            address -- (int) ISOBUS address of the instrument
+        """
+        gateway = isobus.gateway
+        super().__init__(write_termination=gateway.write_termination,
+                         read_termination=gateway.read_termination,
+                         encoding=gateway.encoding, bus=gateway.bus,
+                         name='{}@{}'.format(gateway.resource_name, address),
+                         priority=gateway.priority)
+        self.isobus = isobus
+        self.address = address
+        self.supports_pipelining = gateway.supports_pipelining
+
+    def configure_eos(self, character: str):
+        """ The EOS of the gateway is configured once by the Isobus, the
+            drivers calling this on their port leave it untouched
+        """
+
+    def _send(self, message: str) -> int:
+        return self.isobus.gateway._send(addressed(self.address, message))
+
+    def _write_raw(self, data: bytes) -> int:
+        # raw data carries its own termination, only the address is added
+        message = addressed(self.address, bytes(data).decode(self.encoding))
+        return self.isobus.gateway._write_raw(message.encode(self.encoding))
+
+    def _binary_reads(self):
+        # the EOS detection is the one of the gateway
+        return self.isobus.gateway._binary_reads()
+
+    def _ended(self) -> bool:
+        return self.isobus.gateway._ended()
+
+    def _read_raw(self, view: memoryview) -> int:
+        # the gateway reads straight into the receive buffer of the port
+        return self.isobus.gateway._read_raw(view)
+
+    def _copy(self, nbytes: int) -> int:
+        # the answer arrived in the receive buffer of the gateway
+        while len(self._buffer) < nbytes:
+            self._grow()
+        self._view[:nbytes] = self.isobus.gateway._view[:nbytes]
+        return nbytes
+
+    def _receive(self) -> int:
+        return self._copy(self.isobus.gateway._receive())
+
+    def _exchange(self, message: str) -> int:
+        return self._copy(self.isobus.gateway._exchange(addressed(self.address, message)))
+
+    def _exchange_binary(self, message: str) -> int:
+        return self._copy(self.isobus.gateway._exchange_binary(addressed(self.address, message)))
+
+    def _clear(self):
+        # a device clear of the gateway, it concerns all instruments behind it
+        self.isobus.gateway._clear()
+
+
+class Isobus(object):
+    """ Owner of the gateway connection of an ISOBUS """
+
+    def __init__(self, device, eos: str = '\r'):
+        """ Arguments:
+            device -- (visa.instrument or Transport) the gateway connection
+            eos -- (str) the Oxford instruments end every answer with '\r'
+        """
+        self.gateway = as_transport(device)
+        self.gateway.configure_eos(eos)
+        self._ports = {}
+
+    def port(self, address: int) -> IsobusPort:
+        """ Returns the transport of the instrument at address, one per
+            address
+        """
+        if not 0 <= address <= 9:
+            raise ValueError('ISOBUS addresses are 0 to 9, got {}'.format(address))
+        port = self._ports.get(address)
+        if port is None:
+            port = self._ports[address] = IsobusPort(self, address)
+        return port
+
+    def pipeline(self, requests) -> list:
+        """ Sends queries to several instruments as one pipeline on the
+            gateway, backends without pipelining ask one after the other
+            while holding the bus.
+
+            Arguments:
+            requests -- (list) (address, command) pairs
+
+            Return:
+            (list) the answers in the order of requests
+        """
+        return self.gateway.pipeline([addressed(address, command) for address, command in requests])
+
+    def clear(self):
+        self.gateway.clear()
+
+    def close(self):
+        self.gateway.close()
@@ -10,26 +10,178 @@ __email__ = 'gruszka@physik.uni-frankfurt.de'
 __status__ = 'alpha'
 __license__ = 'MIT'
 
-import visa
-import gpib
+import re
+import threading
 import time
+from contextlib import contextmanager
+
+import visa
+
+from ..transport.arbiter import bus_transaction
+from ..transport.base import as_transport
+from ..transport.recovery import Desynchronised, expect, recovering
+
+# steps of the sweep table and the parameters of a step selected by @0y
+SWEEP_STEPS = 16
+STEP_TEMPERATURE, SWEEP_TIME, HOLD_TIME = SWEEP_PARAMETERS = (1, 2, 3)
+# largest difference between written and read back values, one digit
+SWEEP_TOLERANCE = 0.1
+
+# status word after the leading 'X':   nAnCnSnnHnLn
+STATUS_WORD = re.compile(r'^(\d)A(\d)C(\d)S(\d\d)H(\d)L(\d)')
+
+
+def _status_word(answer):
+    """
+        Returns the digits of the status word as integers, raises
+        Desynchronised if the answer is no status word
+    """
+    match = STATUS_WORD.match(answer)
+    if match is None:
+        raise Desynchronised('{!r} is no status word'.format(answer))
+    return tuple(int(group) for group in match.groups())
+
+
+class ITCStatus(object):
+    """ Snapshot of the ITC status word. The flags are decoded from the
+        status word, the analogue values are read from the ITC on first
+        access and kept with the snapshot.
+    """
+
+    __slots__ = ('time', 'system', 'auto', 'control', 'sweep_status', 'heater_sensor', 'auto_pid',
+                 '_itc', '_set_point', '_heater_output', '_gas_flow', '_pid')
+
+    def __init__(self, itc, system, auto, control, sweep_status, heater_sensor, auto_pid):
+        """
+            Arguments:
+            itc -- (ITC) reads the analogue values on demand
+            auto, control, ... -- (int) the digits of the status word
+        """
+        self.time = time.monotonic()
+        self.system = system
+        self.auto = auto
+        self.control = control
+        self.sweep_status = sweep_status
+        self.heater_sensor = heater_sensor
+        self.auto_pid = auto_pid
+        self._itc = itc
+        self._set_point = None
+        self._heater_output = None
+        self._gas_flow = None
+        self._pid = None
+
+    def __repr__(self):
+        return '<ITCStatus A{} C{} S{:02d} H{} L{}>'.format(self.auto, self.control, self.sweep_status,
+                                                           self.heater_sensor, self.auto_pid)
+
+    # flags of the status word
+
+    @property
+    def heater_auto(self) -> bool:
+        return bool(self.auto & 1)
+
+    @property
+    def gas_flow_auto(self) -> bool:
+        return bool(self.auto & 2)
+
+    @property
+    def system_remote(self) -> bool:
+        return bool(self.control & 1)
+
+    @property
+    def system_locked(self) -> bool:
+        return not self.control & 2
+
+    @property
+    def sweep_running(self) -> bool:
+        """ Sweeping to a step of the sweep table """
+        return self.sweep_status % 2 == 1
+
+    @property
+    def sweep_holding(self) -> bool:
+        """ Holding the temperature of a step of the sweep table """
+        return self.sweep_status > 0 and self.sweep_status % 2 == 0
+
+    @property
+    def sweep_step(self) -> int:
+        """ Step of the sweep table in progress, 0 without sweep """
+        return (self.sweep_status + 1) // 2
+
+    @property
+    def heater_sensor_used(self) -> int:
+        return self.heater_sensor if self.heater_sensor in (1, 2, 3) else 0
+
+    # analogue values, read once per snapshot
+
+    @property
+    def temperature_set_point(self) -> float:
+        if self._set_point is None:
+            self._set_point = self._itc.temperature_set_point
+        return self._set_point
+
+    @property
+    def heater_output(self) -> tuple:
+        if self._heater_output is None:
+            self._heater_output = self._itc.heater_output
+        return self._heater_output
+
+    @property
+    def heater_output_percentage(self) -> float:
+        return self.heater_output[0]
+
+    @property
+    def heater_output_volts(self) -> float:
+        return self.heater_output[1]
+
+    @property
+    def gas_flow(self) -> float:
+        if self._gas_flow is None:
+            self._gas_flow = self._itc.gas_flow
+        return self._gas_flow
+
+    @property
+    def pid_parameters(self) -> tuple:
+        if self._pid is None:
+            self._pid = self._itc.pid_parameters
+        return self._pid
+
+    @property
+    def pid_proportional(self) -> float:
+        return self.pid_parameters[0]
+
+    @property
+    def pid_integral(self) -> float:
+        return self.pid_parameters[1]
+
+    @property
+    def pid_derivative(self) -> float:
+        return self.pid_parameters[2]
 
 class ITC(object):
     """ This class  offers an easy access to the temperature sensors of
         the ITC
     """
-    def __init__(self, device):
+    def __init__(self, device, fast=False):
         """ Initializes the ITC class. It depends on an visa device
 
             Arguments:
-            device -- (visa.instrument) a GPIB instrument is required
-        """
-        self.itc = device
-        self.itc.term_chars = '\r'
-        # needed for error free communication
-        gpib.config(self.itc.device, gpib.IbcEOSchar, ord('\r'))
-        # use REOS und XEOS
-        gpib.config(self.itc.device, gpib.IbcEOSrd, 0x800 | 0x400)
+            device -- (visa.instrument) a GPIB instrument is required, or
+                      the port of an Isobus shared with other Oxford instruments
+            fast -- (bool) skip the bus clear before every command, every
+                    answer is checked instead and the bus only cleared
+                    when the communication got out of step
+        """
+        self.itc = as_transport(device)
+        self.fast = fast
+        # last status snapshot, dropped by every set command
+        self.__status = None
+        # remote sessions open in all threads, the front panel state they
+        # restore and the session depth of each thread
+        self.__sessions = 0
+        self.__control = None
+        self.__local = threading.local()
+        # needed for error free communication, uses REOS und XEOS
+        self.itc.configure_eos('\r')
 
     @property
     def T1(self):
@@ -56,7 +208,19 @@ class ITC(object):
         return self.__get_temperature(3)
 
 
+    async def get_temperature_async(self, identifier):
+        """
+            Returns the temperature of sensor identifier like T1, T2 and T3
+            without blocking the event loop. Clear and query run as one
+            bus transaction.
+
+            Arguments:
+            identifier -- (int) the identifier of a sensor [1,2,3]
+        """
+        return await self.itc.run_async(self.__get_temperature, identifier)
+
     @property
+    @bus_transaction('itc')
     def temperature_set_point(self):
         """
             Return current temperature_set_point
@@ -66,12 +230,13 @@ class ITC(object):
         """
 
         # Communication witht the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        temperature_set_point = float(self.itc.ask('@0R0')[1:])
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        temperature_set_point = self._query('@0R0')
 
         return temperature_set_point
 
     @temperature_set_point.setter
+    @bus_transaction('itc')
     def temperature_set_point(self, temperature):
         """
             Adjusts the temperature set point of the device
@@ -95,14 +260,15 @@ class ITC(object):
             print("Temperature too high, set to 299K.")
 
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.itc.write("@0C3")  # remote & unlocked     
-        self.itc.write("@0S0")  # stop possibly existing sweep
-        self.itc.write("@0T" + str(temperature)[:5])    # set Temperature-set-point with a maximum of 5 digits
-        self.itc.write("@0C0")          # local & locked
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        self._unlock()  # remote & unlocked     
+        self._command("@0S0")  # stop possibly existing sweep
+        self._command("@0T" + str(temperature)[:5])    # set Temperature-set-point with a maximum of 5 digits
+        self._lock()          # local & locked
 
 
     @property
+    @bus_transaction('itc')
     def pid_parameters(self):
         """
             Return current PID_parameters of the System
@@ -114,14 +280,15 @@ class ITC(object):
         """
 
         # Communication witht the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        proportional = float(self.itc.ask('@0R8')[1:])
-        integral = float(self.itc.ask('@0R9')[1:])
-        derivative = float(self.itc.ask('@0R10')[1:])
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        proportional = self._query('@0R8')
+        integral = self._query('@0R9')
+        derivative = self._query('@0R10')
 
         return proportional, integral, derivative
 
     @pid_parameters.setter
+    @bus_transaction('itc')
     def pid_parameters(self, pid_list):
         """
             Adjusts the settings of the PID-Parameters of the device.
@@ -168,16 +335,17 @@ class ITC(object):
 
 
         # Communication with the instrument 
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
         self.toggle_pid_auto(False) # Stop automatic PID Control
-        self.itc.write("@0C3")  # remote & unlocked     
-        self.itc.write("@0P" + str(proportional)[:5])   # Set proportional value
-        self.itc.write("@0I" + str(integral)[:5])   # Set proportional value
-        self.itc.write("@0D" + str(derivative)[:5]) # Set proportional value
-        self.itc.write("@0C0")  # local & locked
+        self._unlock()  # remote & unlocked     
+        self._command("@0P" + str(proportional)[:5])   # Set proportional value
+        self._command("@0I" + str(integral)[:5])   # Set proportional value
+        self._command("@0D" + str(derivative)[:5]) # Set proportional value
+        self._lock()  # local & locked
 
 
     @property
+    @bus_transaction('itc')
     def heater_output(self):
         """
             Return current heater output setting of the System
@@ -188,13 +356,14 @@ class ITC(object):
         """
 
         # Communication witht the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        heater_output_percentage = float(self.itc.ask('@0R5')[2:])
-        heater_output_volts = float(self.itc.ask('@0R6')[2:])
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        heater_output_percentage = self._query('@0R5')
+        heater_output_volts = self._query('@0R6')
 
         return heater_output_percentage, heater_output_volts
 
     @heater_output.setter
+    @bus_transaction('itc')
     def heater_output(self, value):
         """
             Sets the heater output valve setting of the device
@@ -218,13 +387,14 @@ class ITC(object):
 
 
         # Communication with the instrument
-        self.itc.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.itc.write("@0C3")  # remote & unlocked 
-        self.itc.write("@0O" + str(heater_output * 10)[0:4]) # Set the heater_output to desired value, requirements: 3 digit with 0.1% resolution
-        self.itc.write("@0C0")  # local & locked
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        self._unlock()  # remote & unlocked 
+        self._command("@0O" + str(heater_output * 10)[0:4]) # Set the heater_output to desired value, requirements: 3 digit with 0.1% resolution
+        self._lock()  # local & locked
 
 
     @property
+    @bus_transaction('itc')
     def gas_flow(self):
         """
             Return current gas flow setting of the System
@@ -233,12 +403,13 @@ class ITC(object):
         """
         
         # Communication witht the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        gas_flow = float(self.itc.ask('@0R7')[2:])
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        gas_flow = self._query('@0R7')
 
         return gas_flow
 
     @gas_flow.setter
+    @bus_transaction('itc')
     def gas_flow(self, value):
         """
             Sets the gas flow/needle valve setting of the device
@@ -262,13 +433,14 @@ class ITC(object):
 
 
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.itc.write("@0C3")  # remote & unlocked 
-        self.itc.write("@0G" + str(gas_flow)[0:4]) # Set the gasflow to desired value, requirements: 3 digit with 0.1% resolution
-        self.itc.write("@0C0")  # local & locked     
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        self._unlock()  # remote & unlocked 
+        self._command("@0G" + str(gas_flow * 10)[0:4]) # Set the gasflow to desired value, requirements: 3 digit with 0.1% resolution
+        self._lock()  # local & locked     
 
 
     @property
+    @bus_transaction('itc')
     def device_status(self):
         """
             Returns the current settings and status of the ITC
@@ -286,95 +458,52 @@ class ITC(object):
         """
 
         # Communication with the instrument
-        heater_output_percentage, heater_output_volts = self.heater_output
-        gas_flow = self.gas_flow 
-        temperature_set_point = self.temperature_set_point
-        pid_proportional, pid_integral, pid_derivative = self.pid_parameters
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.pyth
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.pyth
-        status = str(self.itc.ask("@0X")).replace('b', '').replace("'", "")
-        #print(status)
-
-        # Device output Sequence:   XnAnCnSnnHn L n
-        #                           0123456789101112
-
-        # Examine Heater and Gas-Flow settings
-        if int(status[3]) == 0:
-            heater_auto = 0
-            gas_flow_auto = 0
-        elif int(status[3]) == 1:
-            heater_auto = 1
-            gas_flow_auto = 0
-        elif int(status[3]) == 2:
-            heater_auto = 0
-            gas_flow_auto = 1
-        elif int(status[3]) == 3:
-            heater_auto = 1
-            gas_flow_auto = 1
-
-        # Examine System LOC/REM/LOCK-Status
-        if int(status[5]) == 0:
-            system_remote = 0
-            system_locked = 1
-        elif int(status[5]) == 1:
-            system_remote = 1
-            system_locked = 1
-        elif int(status[5]) == 2:
-            system_remote = 0
-            system_locked = 0
-        elif int(status[5]) == 3:
-            system_remote = 1
-            system_locked = 0
-
-        # Examine System Sweep-Stautus for Sweep Table 1
-        if int(status[7:9]) == 0:
-            sweep_running = 0 # No sweep running
-            sweep_holding = 0
-        elif int(status[7:9]) == 1:
-            sweep_running = 1 # Sweeping to Sweep Point 1
-            sweep_holding = 0
-        elif int(status[7:9]) == 2:
-            sweep_running = 0 # Sweep finished holding temperature
-            sweep_holding = 1
-
-        # Examine which Heat Sensor is used for Heater Control
-        if int(status[10]) == 1:
-            heater_sensor_used = 1
-        elif int(status[10]) == 2:
-            heater_sensor_used = 2
-        elif int(status[10]) == 3:
-            heater_sensor_used = 3
-        else:
-            heater_sensor_used = 0
-
-        # Examine Auto-PID Status
-        if int(status[12]) == 0:
-            auto_pid = 0
-        elif int(status[12]) == 1:
-            auto_pid = 1
-
+        status = self.status()
 
         status_dic = {
-                    "temperature_set_point": temperature_set_point,
-                    "sweep_running": sweep_running,
-                    "sweep_holding": sweep_holding,
-                    "heater_sensor_used": heater_sensor_used,
-                    "heater_auto": heater_auto,
-                    "heater_output_percentage": heater_output_percentage,
-                    "heater_output_volts": heater_output_volts,
-                    "gas_flow_auto": gas_flow_auto,
-                    "gas_flow" : gas_flow,
-                    "system_remote": system_remote,
-                    "system_locked": system_locked,
-                    "pid_proportional": pid_proportional,
-                    "pid_integral": pid_integral,
-                    "pid_derivative": pid_derivative,
-                    "auto_pid": auto_pid
+                    "temperature_set_point": status.temperature_set_point,
+                    "sweep_running": int(status.sweep_running),
+                    "sweep_holding": int(status.sweep_holding),
+                    "heater_sensor_used": status.heater_sensor_used,
+                    "heater_auto": int(status.heater_auto),
+                    "heater_output_percentage": status.heater_output_percentage,
+                    "heater_output_volts": status.heater_output_volts,
+                    "gas_flow_auto": int(status.gas_flow_auto),
+                    "gas_flow" : status.gas_flow,
+                    "system_remote": int(status.system_remote),
+                    "system_locked": int(status.system_locked),
+                    "pid_proportional": status.pid_proportional,
+                    "pid_integral": status.pid_integral,
+                    "pid_derivative": status.pid_derivative,
+                    "auto_pid": int(status.auto_pid)
                     }
 
         return status_dic
 
+    @bus_transaction('itc')
+    def status(self, max_age=0.0):
+        """
+            Returns a snapshot of the status word, a single query. The
+            analogue values of the snapshot are only read when accessed.
+
+            Arguments:
+            max_age -- (float) seconds a snapshot is reused, the default
+                       always reads a fresh one
+
+            Return:
+            (ITCStatus) the status snapshot
+        """
+        snapshot = self.__status
+        if snapshot is not None and time.monotonic() - snapshot.time <= max_age:
+            return snapshot
+
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        snapshot = ITCStatus(self, *self._query("@0X", parse=_status_word))
+        self.__status = snapshot
+        return snapshot
 
+
+    @bus_transaction('itc')
     def __get_temperature(self, identifier):
         """
             Returns the temperature of a certain temperature sensor in the ITC
@@ -387,18 +516,16 @@ class ITC(object):
             (float) Temperature in Kelvin from sensor with given identifier
             if identifier is not allowed this function returns 0.0
         """
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
 
         #if identifier is not allowed return just 0
         if identifier != 1 and identifier != 2 and identifier != 3:
             return 0.0
 
         #get answer from itc for sensor with given identifier
-        #discard first character since it is just the character 'R'
-        answer = self.itc.ask('@0R' + str(identifier))[1:]
-
-        return float(answer)
+        return self._query('@0R' + str(identifier))
 
+    @bus_transaction('itc')
     def set_temperature_sweep(self, temperature, sweep_time = 0, hold_time = 1399):
         """
             Adjusts the settings of a temperature sweep of the device.
@@ -443,50 +570,156 @@ class ITC(object):
             print("The hold time entered is too high, set to 1399 min.")
 
         # Communication with the insrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.itc.write("@0C3")  # device set to state "remote & unlocked"   
-        self.itc.write("@0S0")  # stop possibly existing sweep
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        self._unlock()  # device set to state "remote & unlocked"   
+        self._command("@0S0")  # stop possibly existing sweep
 
         if sweep_time == 0:
-            self.itc.write("@0T" + str(temperature)[:5])    # set Temperature-set-point with a maximum of 5 digits
+            self._command("@0T" + str(temperature)[:5])    # set Temperature-set-point with a maximum of 5 digits
         else:
-            self.itc.write("@0x001")        # Adjust sweep-step no. 1 of the sweep table
-            self.itc.write("@0y001")        # Choose to adjust step temperature
-            self.itc.write("@0s" + str(temperature)[:5])    # Set step temperature
-            self.itc.write("@0y002")        # Choose to adjust sweep time
-            self.itc.write("@0s" + str(sweep_time)[:5]) # Set sweep time
-            self.itc.write("@0y003")        # Choose to adjust hold time
-            self.itc.write("@0s" + str(hold_time)[:5])  # Set hold time
-            self.itc.write("@0x000")        # Good practice according to manual
-            self.itc.write("@0y000")        # Good practice according to manual
+            self._command("@0x001")        # Adjust sweep-step no. 1 of the sweep table
+            self._command("@0y001")        # Choose to adjust step temperature
+            self._command("@0s" + str(temperature)[:5])    # Set step temperature
+            self._command("@0y002")        # Choose to adjust sweep time
+            self._command("@0s" + str(sweep_time)[:5]) # Set sweep time
+            self._command("@0y003")        # Choose to adjust hold time
+            self._command("@0s" + str(hold_time)[:5])  # Set hold time
+            self._command("@0x000")        # Good practice according to manual
+            self._command("@0y000")        # Good practice according to manual
         
-        self.itc.write("@0C0")          # device set to state "local & locked"
+        self._lock()          # device set to state "local & locked"
  
+    @bus_transaction('itc')
     def start_temperature_sweep(self):
         """
             Starts a temperature sweep.
 
         """
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.itc.write("@0C3")  # remote & unlocked     
-        self.itc.write("@0S0")  # stop possibly existing sweep
-        self.itc.write("@0S1")  # start sweep       
-        self.itc.write("@0C0")  # local & locked
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        self._unlock()  # remote & unlocked     
+        self._command("@0S0")  # stop possibly existing sweep
+        self._command("@0S1")  # start sweep       
+        self._lock()  # local & locked
      
+    @bus_transaction('itc')
     def stop_temperature_sweep(self):
         """
             Stops an existing temperature sweep.
 
         """
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.itc.write("@0C3")  # remote & unlocked     
-        self.itc.write("@0S0")  # stop existing sweep
-        self.itc.write("@0C0")  # local & locked
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        self._unlock()  # remote & unlocked     
+        self._command("@0S0")  # stop existing sweep
+        self._lock()  # local & locked
+
+    @bus_transaction('itc')
+    def upload_sweep_profile(self, profile, verify=True):
+        """
+            Writes a temperature profile to the sweep table of the ITC, all
+            steps in one remote session and command pipeline. Steps behind
+            the profile repeat its last temperature without sweep and hold
+            time, so the sweep ends there. A running sweep is stopped.
+
+            Arguments:
+            profile -- (list) up to 16 steps (temperature, sweep_time, hold_time)
+                       in K and min
+            verify -- (bool) reads the whole table back once and raises
+                      IOError if a step differs
+
+            Return:
+            (list) the steps written, after clamping to the ranges of the ITC
+        """
+        profile = [tuple(step) for step in profile]
+        if not 0 < len(profile) <= SWEEP_STEPS:
+            raise ValueError("A sweep profile has 1 to {} steps".format(SWEEP_STEPS))
+
+        table = []
+        for number, (temperature, sweep_time, hold_time) in enumerate(profile, 1):
+            step = (float(str(min(max(float(temperature), 0), 299))[:5]),
+                    float(str(min(max(float(sweep_time), 0), 1399))[:5]),
+                    float(str(min(max(float(hold_time), 0), 1399))[:5]))
+            if step != (float(temperature), float(sweep_time), float(hold_time)):
+                print("Sweep step {} out of range or precision, set to {}.".format(number, step))
+            table.append(step)
+        table += [(table[-1][0], 0.0, 0.0)] * (SWEEP_STEPS - len(table))
+
+        commands = ["@0S0"]     # stop possibly existing sweep
+        for parameter in SWEEP_PARAMETERS:
+            commands.append("@0y{:03d}".format(parameter))     # Choose the parameter to adjust
+            for number, step in enumerate(table, 1):
+                commands.append("@0x{:03d}".format(number))    # Adjust sweep-step number
+                commands.append("@0s" + str(step[parameter - 1])[:5])
+        commands += ["@0x000", "@0y000"]    # Good practice according to manual
+
+        with self.remote():
+            self._commands(commands)
+            if verify:
+                self.__verify_sweep_table(table)
+        return table[:len(profile)]
+
+    def __verify_sweep_table(self, table):
+        """
+            Reads the sweep table back in one command pipeline and raises
+            IOError if it differs from table
+
+            Arguments:
+            table -- (list) 16 steps (temperature, sweep_time, hold_time)
+        """
+        commands = []
+        for parameter in SWEEP_PARAMETERS:
+            commands.append("@0y{:03d}".format(parameter))
+            for number in range(1, SWEEP_STEPS + 1):
+                commands += ["@0x{:03d}".format(number), "@0r"]
+        commands += ["@0x000", "@0y000"]
+        answers = self._commands(commands)
+
+        values = iter(float(answer) for command, answer in zip(commands, answers) if command == "@0r")
+        readback = list(zip(*[[next(values) for _ in range(SWEEP_STEPS)] for _ in SWEEP_PARAMETERS]))
+        differing = [number for number, (step, read) in enumerate(zip(table, readback), 1)
+                     if any(abs(written - value) > SWEEP_TOLERANCE for written, value in zip(step, read))]
+        if differing:
+            raise IOError("Sweep table steps {} differ from the upload: {}".format(
+                differing, [readback[number - 1] for number in differing]))
+
+    def run_sweep_profile(self, profile, verify=True):
+        """
+            Uploads a temperature profile and starts it, the sweep runs on
+            the ITC. See upload_sweep_profile and wait_for_sweep.
+        """
+        table = self.upload_sweep_profile(profile, verify)
+        self.start_temperature_sweep()
+        return table
+
+    def wait_for_sweep(self, poll_interval=10.0, timeout=None, progress=None):
+        """
+            Polls the sweep status field until the sweep on the ITC ended.
+            The bus is free between the polls.
+
+            Arguments:
+            poll_interval -- (float) seconds between two status words
+            timeout -- (float) seconds after which TimeoutError is raised,
+                       None waits forever
+            progress -- (callable) called with every ITCStatus
+
+            Return:
+            (ITCStatus) the status after the sweep
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            status = self.status()
+            if progress is not None:
+                progress(status)
+            if not status.sweep_status:
+                return status
+            if deadline is not None and time.monotonic() + poll_interval > deadline:
+                raise TimeoutError("Sweep still at step {} after {} s".format(status.sweep_step, timeout))
+            self.itc.sleep(poll_interval, 'sweep poll')
 
 
 
+    @bus_transaction('itc')
     def toggle_pid_auto(self, value):
         """
             Enables or disables the Auto-PID button according to user input
@@ -504,15 +737,16 @@ class ITC(object):
 
 
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.itc.write("@0C3")  # remote & unlocked 
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        self._unlock()  # remote & unlocked 
         if value:
-            self.itc.write("@0L1")  # Use Auto-PID
+            self._command("@0L1")  # Use Auto-PID
         else:
-            self.itc.write("@0L0")  # Disables use of Auto-PID
+            self._command("@0L0")  # Disables use of Auto-PID
 
-        self.itc.write("@0C0")  # local & locked
+        self._lock()  # local & locked
 
+    @bus_transaction('itc')
     def toggle_gas_flow_auto(self, value):
         """
             Enables or disables the Auto-Gas-Flow button according to user input
@@ -529,7 +763,7 @@ class ITC(object):
             raise ScriptSyntaxError("The Toggle Value must be 1, 0 or a Bool")
 
 
-        heater_auto_state = self.device_status["heater_auto"]
+        heater_auto_state = self.status().heater_auto
 
 
         # Control sequence for device according to system status, since heater and gas_flow auto are coupled
@@ -547,11 +781,12 @@ class ITC(object):
 
 
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.itc.write("@0C3")  # remote & unlocked 
-        self.itc.write("@0" + send_string) # Set Auto Gas-Flow according to users preference
-        self.itc.write("@0C0")  # local & locked
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        self._unlock()  # remote & unlocked 
+        self._command("@0" + send_string) # Set Auto Gas-Flow according to users preference
+        self._lock()  # local & locked
 
+    @bus_transaction('itc')
     def toggle_heater_auto(self, value):
         """
             Enables or disables the Auto-Heater button according to user input
@@ -568,17 +803,17 @@ class ITC(object):
             raise ScriptSyntaxError("The Toggle Value must be 1, 0 or a Bool")
 
 
-        gas_flow_auto_state = self.device_status["gas_flow_auto"]
+        gas_flow_auto_state = self.status().gas_flow_auto
 
 
         # Control sequence for device according to system status, since heater and gas_flow auto are coupled
         if value:
-            if gas_flow_state == 0:
+            if gas_flow_auto_state == 0:
                 send_string = "A1"
             else:
                 send_string = "A3"
         else:
-            if gas_flow_state == 0:
+            if gas_flow_auto_state == 0:
                 send_string = "A0"
             else:
                 send_string = "A2"
@@ -586,12 +821,13 @@ class ITC(object):
 
 
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.itc.write("@0C3")  # remote & unlocked 
-        self.itc.write("@0" + send_string) # Set Auto Heater according to users preference
-        self.itc.write("@0C0")  # local & locked
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        self._unlock()  # remote & unlocked 
+        self._command("@0" + send_string) # Set Auto Heater according to users preference
+        self._lock()  # local & locked
 
 
+    @bus_transaction('itc')
     def set_heater_sensor_used(self, identifier):
         """
             Sets the heater and temperature sensor used for temperature control.
@@ -615,22 +851,153 @@ class ITC(object):
             raise ScriptSyntaxError("The Heater Output value must be 1,2 or 3")
 
         # Communication with the instrument
-        self.clear() # Clears the GPIB Bus to prevent problems in communication.
-        self.itc.write("@0C3")  # remote & unlocked 
-        self.itc.write("@0H" + str(identifier)) # Set heater sensor used for temperature control
-        self.itc.write("@0C0")  # local & locked
+        self._sync() # Clears the GPIB Bus to prevent problems in communication.
+        self._unlock()  # remote & unlocked 
+        self._command("@0H" + str(identifier)) # Set heater sensor used for temperature control
+        self._lock()  # local & locked
+
+
+    @contextmanager
+    def remote(self):
+        """
+            Remote session: the ITC is set to remote & unlocked once, all
+            commands inside run without the bus clear and the remote/lock
+            toggling around every setter. The front panel state found on
+            entry is restored on exit, also after an exception.
+
+            Sessions of several threads share the remote state, the last
+            one to end restores the front panel. Setters of threads outside
+            a session still clear the bus, but leave the ITC remote &
+            unlocked while a session of another thread is open and read
+            their echoes, the session does not clear them away.
+
+            Example:
+            with itc.remote():
+                itc.pid_parameters = [5.0, 2.7, 0]
+                itc.temperature_set_point = 4.2
+        """
+        depth = getattr(self.__local, 'depth', 0)
+        if depth:
+            # nested sessions run inside the outermost one of the thread
+            self.__local.depth = depth + 1
+            try:
+                yield self
+            finally:
+                self.__local.depth = depth
+            return
+
+        with self.itc.transaction():
+            # claimed before the status is read, as a clear may free the bus
+            self.__sessions += 1
+            try:
+                if self.__sessions == 1:
+                    self.__control = self.status().control
+                    self._command("@0C3")  # remote & unlocked
+            except BaseException:
+                self.__sessions -= 1
+                raise
+        self.__local.depth = 1
+        try:
+            yield self
+        except BaseException:
+            # the communication may be out of step
+            self.clear()
+            raise
+        finally:
+            try:
+                with self.itc.transaction():
+                    try:
+                        if self.__sessions == 1:
+                            self._command("@0C" + str(self.__control))  # front panel state on entry
+                    finally:
+                        self.__sessions -= 1
+            finally:
+                self.__local.depth = 0
+
+    def _in_session(self):
+        """
+            True inside a remote session of the calling thread
+        """
+        return getattr(self.__local, 'depth', 0) > 0
 
-        return float(answer)
+    def _unlock(self):
+        """
+            Sets the ITC to remote & unlocked for a setter, a remote
+            session of any thread did already
+        """
+        if not self.__sessions:
+            self._command("@0C3")
+
+    def _lock(self):
+        """
+            Sets the ITC back to local & locked after a setter, the last
+            remote session of all threads does on exit
+        """
+        if not self.__sessions:
+            self._command("@0C0")
+
+    def _sync(self):
+        """
+            Clears the GPIB Bus before a command, the fast mode relies on
+            the recovery of _query and _command instead, a remote session
+            skips it as well.
+
+        """
+        if not self.fast and not self._in_session():
+            self.clear()
+
+    def _query(self, command, parse=float):
+        """
+            Sends command and returns the parsed answer without its leading
+            command letter. A missing, malformed or foreign answer clears
+            the bus and the command is sent once more.
 
+            Arguments:
+            command -- (str) e.g. '@0R1'
+            parse -- (callable) converts the rest of the answer
+        """
+        letter = command.lstrip('@0123456789')[0]
+        return recovering(lambda: parse(expect(self.itc.ask(command), letter)), self.clear)
+
+    def _command(self, command):
+        """
+            Sends a set command. The ITC echoes the command letter, the
+            fast mode and every thread while a remote session is open read
+            and check the echo, otherwise it is left to the next clear.
+
+            Arguments:
+            command -- (str) e.g. '@0T4.2'
+        """
+        self.__status = None
+        if not self.fast and not self.__sessions:
+            self.itc.write(command)
+            return
+        self._query(command, parse=str)
+
+    def _commands(self, commands):
+        """
+            Sends several commands as one pipeline and checks the echo of
+            every one of them.
+
+            Arguments:
+            commands -- (list) e.g. ['@0x001', '@0y001', '@0s4.2']
+
+            Return:
+            (list) the answers without their command letter
+        """
+        self.__status = None
+        answers = self.itc.pipeline(commands)
+        return [expect(answer, command.lstrip('@0123456789')[0])
+                for command, answer in zip(commands, answers)]
 
     def clear(self):
         """
             Clears the GPIB Bus to prevent problems in communication.
 
         """
-        time.sleep(0.1)
+        self.itc.sleep(0.1, 'settle before clear')
         self.itc.clear()
-        time.sleep(0.1)
+        self.itc.sleep(0.1, 'settle after clear')
 
 
 # Example
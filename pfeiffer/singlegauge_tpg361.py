@@ -13,6 +13,9 @@ __license__ = 'MIT'
 import serial
 from enum import Enum
 
+from ..transport.aioserial import AsyncSerialTransport
+from ..transport.base import TransportTimeout
+
 # special characters for communication
 ETC = chr(0x03)
 CR = chr(0x0D)
@@ -36,49 +39,58 @@ class PressureGaugeState(Enum):
 
 class SingleGaugeTPG361(object):
     """ Abstraction layer for the Pfeiffer Single Gauge TPG 361 controller """
-    def __init__(self, path):
+    def __init__(self, path, timeout=1.0):
         """ Initialize connection parameters for futher usage
 
             Arguments:
             path -- (string) path to device e.g. for windows 'COM1'
                              or linux '/dev/usbtty1'
+            timeout -- (float) seconds a request may take at most
         """
         #TODO: use visa for serial connection
         self.connection = serial.Serial(path,
                                         baudrate=115200,
                                         bytesize=serial.EIGHTBITS,
                                         parity=serial.PARITY_NONE)
+        self._transport = AsyncSerialTransport(self.connection,
+                                               timeout=timeout,
+                                               write_termination=CRLF,
+                                               read_termination=LF)
 
     def close(self):
         """ closes current connection to device """
-        self.connection.close()
+        self._transport.close()
 
-    def ask(self, message):
+    async def ask_async(self, message, timeout=None):
         """ ask for values
 
             Arguments:
             message -- (string) message to be sent
+            timeout -- (float) deadline of each step, defaults to the
+                               timeout given on construction
 
             Return:
             (string) -- Message from device
-            on fail: None
+            on fail or timeout: None
 
         """
-        conn = self.connection
-
-        conn.write((message + CRLF).encode())
-        result = conn.readline()
-        if result == MESSAGE_ACCEPTED.encode():
-            conn.write(ENQ.encode())
-            result = conn.readline().decode('utf-8')
-            return result
-
-        if result == MESSAGE_NOT_ACCEPTED:
+        transport = self._transport
+
+        try:
+            result = await transport.query_raw_async(message, timeout)
+            if result == MESSAGE_ACCEPTED.encode():
+                result = await transport.request_async(ENQ.encode(), timeout)
+                return result.decode('utf-8')
+        except TransportTimeout:
             return None
 
         return None
 
-    def get_pressure(self, identifier=0):
+    def ask(self, message):
+        """ blocking version of ask_async """
+        return self._transport.run(self.ask_async(message))
+
+    async def get_pressure_async(self, identifier=0, timeout=None):
         """ ask for pressure from gauge n
 
             Arguments:
@@ -90,7 +102,7 @@ class SingleGaugeTPG361(object):
         if identifier != 1 and  identifier != 2:
             return None, None
 
-        result = self.ask('PR' + str(identifier))
+        result = await self.ask_async('PR' + str(identifier), timeout)
 
         if isinstance(result, str):
             result_split = result.strip().split(',')
@@ -102,6 +114,10 @@ class SingleGaugeTPG361(object):
 
         return None, None
 
+    def get_pressure(self, identifier=0):
+        """ blocking version of get_pressure_async """
+        return self._transport.run(self.get_pressure_async(identifier))
+
 #example
 #shows the usage of the upper class
 if __name__ == '__main__':
@@ -8,6 +8,9 @@ __version__ = '0.1'
 import visa
 #import virtual_visa as visa
 
+from ..transport.base import as_transport
+from ..transport.visa_session import open_session
+
 assert visa.__version__ >= '1.5', 'visa should be 1.5 or newer'
 
 
@@ -17,17 +20,20 @@ class SMC(object):
     Operating Manual: http://www.twicksci.co.uk/manuals/pdf/smc552+.pdf
     """
 
-    def __init__(self, GPIBPort: str = 'GPIB0::4::INSTR'):
+    def __init__(self, GPIBPort = 'GPIB0::4::INSTR'):
         """
         Inititialisiert SMC
-        :param GPIBPort: Example: 'GPIB0::12::INSTR'
-        :type GPIBPort: str
+        :param GPIBPort: Example: 'GPIB0::12::INSTR', its session is taken
+                         from the pool, or an already opened session
+        :type GPIBPort: str or session
         """
-        rm = visa.ResourceManager('@py')
-        self.inst = rm.open_resource(GPIBPort,
+        if isinstance(GPIBPort, str):
+            self.inst = open_session(GPIBPort,
                                      write_termination='\r\n',
                                      read_termination='\r\n',
                                      delay = 0.1)
+        else:
+            self.inst = as_transport(GPIBPort)
 
         # Initial Valiues
         self._ampsPerTesla = 9.755555  # A/T
@@ -0,0 +1,108 @@
+""" Simulated Agilent instruments: 34401A, 34970A and 34420A """
+
+from .base import LatencyModel, ScpiInstrument, scpi_keyword
+
+LINE_FREQUENCY = 50.0
+
+
+class Multimeter34401ASimulation(ScpiInstrument):
+    """ Agilent 34401A measuring whatever source returns """
+
+    identification = 'HEWLETT-PACKARD,34401A,0,11-5-2 SIMULATED'
+
+    def __init__(self, source=lambda: 100.0, latency: LatencyModel = None):
+        """ Arguments:
+            source -- (callable) returns the measured value, e.g. the
+                      resistance behind a simulated multiplexer
+        """
+        self.source = source
+        super().__init__(latency if latency is not None else
+                         LatencyModel(default=0.002, per_command={'*RST': 0.1}))
+        self.commands_table = {'READ?': lambda argument: '{:+.8E}'.format(self.source())}
+
+    def defaults(self) -> dict:
+        settings = {'SENS:FUNC': '"VOLT:DC"'}
+        for function in ('VOLT:DC', 'VOLT:AC', 'CURR:DC', 'CURR:AC', 'RES', 'FRES'):
+            settings['SENS:{}:NPLC'.format(function)] = '10'
+        return settings
+
+    def busy_time_of(self, header, argument) -> float:
+        if header == 'READ?':
+            function = ':'.join(scpi_keyword(keyword) for keyword in
+                                self.settings['SENS:FUNC'].strip('"\'').split(':'))
+            nplc = float(self.settings.get('SENS:{}:NPLC'.format(function), 10))
+            # auto zero doubles the integration
+            return 2 * nplc / LINE_FREQUENCY
+        return 0.0
+
+
+class Multiplexer34970ASimulation(ScpiInstrument):
+    """ Agilent 34970A with a 34901A card, channel resistances are given
+        per route number
+    """
+
+    identification = 'HEWLETT-PACKARD,34970A,0,13-2-2 SIMULATED'
+
+    # relay settling of the 34901A armature relays
+    RELAY_TIME = 0.01
+
+    def __init__(self, resistances: dict = None, latency: LatencyModel = None):
+        """ Arguments:
+            resistances -- (dict) route -> resistance in Ohm
+        """
+        self.resistances = dict(resistances or {})
+        self.closed = set()
+        super().__init__(latency if latency is not None else
+                         LatencyModel(default=0.002, per_command={'*RST': 0.2}))
+        self.commands_table = {'ROUT:OPEN': lambda argument: self._route(argument, False),
+                               'ROUT:CLOS': lambda argument: self._route(argument, True),
+                               'ROUT:CLOS?': lambda argument: ','.join(
+                                   '1' if channel in self.closed else '0'
+                                   for channel in self._channels(argument))}
+
+    def reset(self):
+        super().reset()
+        self.closed = set()
+
+    @staticmethod
+    def _channels(argument: str) -> list:
+        # '(@112,113)' -> [112, 113]
+        return [int(channel) for channel in argument.strip('()@ ').split(',') if channel]
+
+    def _route(self, argument, close):
+        for channel in self._channels(argument):
+            if close:
+                self.closed.add(channel)
+            else:
+                self.closed.discard(channel)
+
+    def busy_time_of(self, header, argument) -> float:
+        if header in ('ROUT:OPEN', 'ROUT:CLOS'):
+            return self.RELAY_TIME * len(self._channels(argument))
+        return 0.0
+
+    def resistance(self) -> float:
+        """ Resistance seen through the closed channels, open circuit if none """
+        conductance = sum(1.0 / self.resistances.get(channel % 100, float('inf'))
+                          for channel in self.closed)
+        return 1.0 / conductance if conductance else 9.9e37
+
+
+class NanovoltMeter34420ASimulation(ScpiInstrument):
+    """ Agilent 34420A measuring whatever source returns """
+
+    identification = 'HEWLETT-PACKARD,34420A,0,2.0-1.0-1.0 SIMULATED'
+
+    def __init__(self, source=lambda: 1e-6, latency: LatencyModel = None):
+        self.source = source
+        super().__init__(latency if latency is not None else
+                         LatencyModel(default=0.002, per_command={'*RST': 0.1}))
+        self.commands_table = {'READ?': lambda argument: '{:+.8E}'.format(self.source())}
+
+    def defaults(self) -> dict:
+        return {'SENS:FUNC': '"VOLT"', 'SENS:VOLT:NPLC': '10'}
+
+    def busy_time_of(self, header, argument) -> float:
+        if header == 'READ?':
+            return 2 * float(self.settings['SENS:VOLT:NPLC']) / LINE_FREQUENCY
+        return 0.0
@@ -0,0 +1,45 @@
+""" Simulated Alicat mass flow controller """
+
+from .base import LatencyModel, SimulatedInstrument
+
+
+class FlowControllerSimulation(SimulatedInstrument):
+    """ Flow controller answering polls with a data frame ending in '\r'.
+        The set point is given in 1/64000 of the full scale of 100 sccm.
+    """
+
+    input_termination = '\r'
+    termination = '\r'
+
+    FULL_SCALE = 100.0
+
+    def __init__(self, unit_id: str = 'A', latency: LatencyModel = None):
+        super().__init__(latency if latency is not None else
+                         LatencyModel(default=0.01, baudrate=19200))
+        self.unit_id = unit_id
+        self.pressure = 14.70
+        self.temperature = 25.0
+        self.setpoint = 0.0
+        self.registers = {21: 0, 22: 0}
+
+    def frame(self) -> str:
+        return '{} {:+07.2f} {:+07.2f} {:+08.3f} {:+08.3f} {:+08.3f} Air'.format(
+            self.unit_id, self.pressure, self.temperature, self.setpoint, self.setpoint, self.setpoint)
+
+    def handle(self, command):
+        command = command.strip()
+        if not command.startswith(self.unit_id):
+            # another unit on the same line
+            return None
+        argument = command[len(self.unit_id):]
+        if not argument:
+            return self.frame()
+        if argument.startswith('$$R'):
+            number = int(argument[3:])
+            return '{} {:d} = {:d}'.format(self.unit_id, number, self.registers.get(number, 0))
+        if argument.startswith('$$W'):
+            number, _, value = argument[3:].partition('=')
+            self.registers[int(number)] = int(value)
+            return '{} {:d} = {}'.format(self.unit_id, int(number), value)
+        self.setpoint = int(argument) * self.FULL_SCALE / 64000
+        return self.frame()
@@ -0,0 +1,219 @@
+""" This module offers the base classes of the simulated instruments.
+
+    A simulated instrument is a python object speaking the command set of
+    the real device. It does not know how it is connected, the adapters in
+    visa.py, fake_gpib.py and pseudo_terminal.py put it under the drivers.
+"""
+
+import time
+
+
+class LatencyModel(object):
+    """ Time an instrument needs to process a command and to move bytes """
+
+    def __init__(self, default=0.0, per_command=None, baudrate=None, scale=1.0):
+        """ Arguments:
+            default -- (float) seconds every command takes
+            per_command -- (dict) command prefix -> seconds, replaces the
+                           default for matching commands, first match wins
+            baudrate -- (int) serial speed, None for parallel buses
+            scale -- (float) multiplies every delay, 0 disables waiting
+        """
+        self.default = default
+        self.per_command = dict(per_command or {})
+        self.baudrate = baudrate
+        self.scale = scale
+
+    def command_time(self, command) -> float:
+        if isinstance(command, str):
+            for prefix, seconds in self.per_command.items():
+                if command.startswith(prefix):
+                    return seconds
+        return self.default
+
+    def transfer_time(self, nbytes: int) -> float:
+        """ 8N1 framing, ten bits per byte """
+        if not self.baudrate:
+            return 0.0
+        return nbytes * 10.0 / self.baudrate
+
+    def wait(self, seconds: float):
+        if seconds > 0 and self.scale > 0:
+            time.sleep(seconds * self.scale)
+
+
+class SimulatedInstrument(object):
+    """ Base class of all simulated instruments.
+
+        Subclasses implement handle, which takes one command without
+        termination and returns the answer (str or bytes), a list of
+        answers sent as messages of their own or None.
+    """
+
+    # termination of incoming messages, used to split a serial stream
+    input_termination = '\n'
+    # termination the device appends to its answers
+    termination = '\n'
+
+    def __init__(self, latency: LatencyModel = None):
+        self.latency = latency if latency is not None else LatencyModel()
+        self.commands = 0
+
+    def handle(self, command):
+        raise NotImplementedError
+
+    def busy_time(self, command) -> float:
+        """ Seconds the device is busy beyond the command latency, e.g.
+            an integration over some power line cycles.
+        """
+        return 0.0
+
+    def respond(self, command):
+        """ Processes command in (scaled) real time and returns the answer """
+        self.commands += 1
+        answer = self.handle(command)
+        self.latency.wait(self.latency.command_time(command) + self.busy_time(command))
+        return answer
+
+    def clear(self):
+        """ Selected device clear """
+
+    def talk(self, size, timeout: float) -> bytes:
+        """ Data the device sends on its own when it is read without a
+            pending answer, at most size bytes within timeout seconds.
+            None if it has nothing to say.
+        """
+        return None
+
+    def encode(self, answer) -> bytes:
+        """ Answer as it appears on the wire """
+        if isinstance(answer, list):
+            return b''.join(self.encode(item) for item in answer)
+        if isinstance(answer, str):
+            return (answer + self.termination).encode('ascii')
+        return answer
+
+    def split(self, buffer: bytearray) -> list:
+        """ Removes all complete messages from buffer and returns them """
+        termination = self.input_termination.encode('ascii')
+        messages = []
+        while True:
+            index = buffer.find(termination)
+            if index < 0:
+                return messages
+            message = bytes(buffer[:index]).decode('ascii').strip('\r\n')
+            del buffer[:index + len(termination)]
+            messages.append(message)
+
+
+def scpi_keyword(keyword: str) -> str:
+    """ Short form of a SCPI keyword: four characters, three if the fourth
+        is a vowel, e.g. 'voltage' -> 'VOLT', 'level' -> 'LEV'
+    """
+    keyword = keyword.upper()
+    if len(keyword) <= 4:
+        return keyword
+    if keyword[3] in 'AEIOU':
+        return keyword[:3]
+    return keyword[:4]
+
+
+def scpi_header(header: str) -> str:
+    """ Normalised header, ':sense:current:nplcycles' -> 'SENS:CURR:NPLC' """
+    query = header.endswith('?')
+    keywords = header.rstrip('?').strip(':').split(':')
+    return ':'.join(scpi_keyword(keyword) for keyword in keywords) + ('?' if query else '')
+
+
+class ScpiInstrument(SimulatedInstrument):
+    """ Base of the SCPI instruments.
+
+        Messages may hold several commands separated by ';', their answers
+        are joined with ';' as well. Handlers answer binary blocks as
+        bytes. Subclasses map normalised headers to
+        handlers in the dict commands, a handler takes the argument string
+        and returns the answer or None. Settings without handler are
+        stored in settings and answered by their query.
+    """
+
+    identification = 'SIMULATED,INSTRUMENT,0,0'
+
+    def __init__(self, latency: LatencyModel = None):
+        super().__init__(latency)
+        self.commands_table = {}
+        self.settings = {}
+        self.errors = []
+        self.reset()
+
+    def reset(self):
+        self.settings = dict(self.defaults())
+        self.errors = []
+
+    def defaults(self) -> dict:
+        return {}
+
+    def busy_time(self, command) -> float:
+        return sum(self.busy_time_of(header, argument) for header, argument in self.split_commands(command))
+
+    def busy_time_of(self, header, argument) -> float:
+        return 0.0
+
+    @staticmethod
+    def split_commands(message: str) -> list:
+        """ Returns (normalised header, argument) of every command in
+            message. As on a real instrument a header without leading ':'
+            after a ';' continues the path of the command before.
+        """
+        commands = []
+        path = ''
+        for part in message.split(';'):
+            header, _, argument = part.strip().partition(' ')
+            if not header:
+                continue
+            if commands and not header.startswith((':', '*')):
+                header = path + header
+            header = scpi_header(header)
+            if not header.startswith('*'):
+                path = header.rpartition(':')[0] + ':' if ':' in header else ''
+            commands.append((header, argument.strip()))
+        return commands
+
+    def handle(self, command):
+        answers = []
+        for header, argument in self.split_commands(command):
+            answer = self.handle_header(header, argument)
+            if answer is not None:
+                answers.append(answer if isinstance(answer, bytes) else str(answer))
+        if not any(isinstance(answer, bytes) for answer in answers):
+            return ';'.join(answers) if answers else None
+        # binary blocks go out as they are, the message ends with a newline
+        return b';'.join(answer if isinstance(answer, bytes) else answer.encode('ascii')
+                         for answer in answers) + self.termination.encode('ascii')
+
+    def handle_header(self, header, argument):
+        if header == '*RST':
+            self.reset()
+            return None
+        if header == '*CLS':
+            self.errors = []
+            return None
+        if header == '*IDN?':
+            return self.identification
+        if header == '*WAI':
+            # commands run one after the other, nothing is pending
+            return None
+        if header == '*OPC?':
+            return '1'
+        if header in ('SYST:ERR?', 'SYST:ERR:NEXT?'):
+            return self.errors.pop(0) if self.errors else '+0,"No error"'
+
+        handler = self.commands_table.get(header)
+        if handler is not None:
+            return handler(argument)
+        if header.endswith('?'):
+            if header[:-1] in self.settings:
+                return self.settings[header[:-1]]
+            self.errors.append('-113,"Undefined header"')
+            return None
+        self.settings[header] = argument
+        return None
@@ -0,0 +1,105 @@
+""" Simulated Eurotherm Mini8 speaking Modbus RTU """
+
+import struct
+
+from .base import LatencyModel, SimulatedInstrument
+
+READ_REGISTERS = 3
+WRITE_REGISTER = 6
+WRITE_REGISTERS = 16
+
+ILLEGAL_FUNCTION = 1
+ILLEGAL_ADDRESS = 2
+
+TEMPERATURE_REGISTERS = [4228, 4229, 4230, 4231, 4236, 4237, 4238, 4239]
+
+
+def crc16(data: bytes) -> bytes:
+    """ Modbus RTU checksum, low byte first """
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+    return struct.pack('<H', crc)
+
+
+class Mini8Simulation(SimulatedInstrument):
+    """ Mini8 with eight loops at the register bases n*256.
+
+        Requests are framed by their length since RTU has no termination,
+        answers and requests are bytes including the checksum.
+    """
+
+    def __init__(self, slave_address: int = 1, latency: LatencyModel = None):
+        super().__init__(latency if latency is not None else
+                         LatencyModel(default=0.005, baudrate=19200))
+        self.slave_address = slave_address
+        self.registers = {}
+        for loop in range(8):
+            base = loop * 256
+            temperature = 200 + loop                    # tenths of a degree
+            self.registers.update({base + 1: temperature,       # process value
+                                   base + 2: temperature,       # target set point
+                                   base + 3: 0,
+                                   base + 4: 0,                 # active output
+                                   base + 5: temperature,       # working set point
+                                   base + 70: 0})               # set point rate
+            for offset in range(104, 113):
+                self.registers[base + offset] = 0               # autotune
+        for number, register in enumerate(TEMPERATURE_REGISTERS):
+            self.registers[register] = 2000 + number            # hundredths of a degree
+
+    @staticmethod
+    def frame_length(buffer: bytearray) -> int:
+        """ Length of the request at the start of buffer, 0 if unknown yet """
+        if len(buffer) < 2:
+            return 0
+        if buffer[1] == WRITE_REGISTERS:
+            return 9 + buffer[6] if len(buffer) >= 7 else 0
+        return 8
+
+    def split(self, buffer: bytearray) -> list:
+        messages = []
+        while True:
+            length = self.frame_length(buffer)
+            if not length or len(buffer) < length:
+                return messages
+            messages.append(bytes(buffer[:length]))
+            del buffer[:length]
+
+    def encode(self, answer) -> bytes:
+        return answer
+
+    def _exception(self, function, code) -> bytes:
+        return bytes([self.slave_address, function | 0x80, code])
+
+    def handle(self, command):
+        if len(command) < 4 or crc16(command[:-2]) != command[-2:]:
+            # corrupted requests are ignored by the slave
+            return None
+        if command[0] != self.slave_address:
+            return None
+        function = command[1]
+        register, value = struct.unpack('>HH', command[2:6])
+        if function == READ_REGISTERS:
+            if any(register + offset not in self.registers for offset in range(value)):
+                answer = self._exception(function, ILLEGAL_ADDRESS)
+            else:
+                data = b''.join(struct.pack('>H', self.registers[register + offset] & 0xFFFF)
+                                for offset in range(value))
+                answer = bytes([self.slave_address, function, len(data)]) + data
+        elif function == WRITE_REGISTER:
+            self.registers[register] = value
+            answer = command[:6]
+        elif function == WRITE_REGISTERS:
+            values = struct.unpack('>{}H'.format(value), command[7:7 + 2 * value])
+            for offset, item in enumerate(values):
+                self.registers[register + offset] = item
+            answer = command[:6]
+        else:
+            answer = self._exception(function, ILLEGAL_FUNCTION)
+        return answer + crc16(answer)
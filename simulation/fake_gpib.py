@@ -0,0 +1,123 @@
+""" Stand-in for the linux-gpib python bindings serving simulated
+    instruments. install() registers it as module 'gpib', so GpibTransport
+    and the drivers opening gpib.dev handles run unchanged, e.g.
+
+        fake_gpib.install()
+        fake_gpib.attach(0, 25, IPS120Simulation())
+        magnet = IPS120_10(25)
+"""
+
+import sys
+import threading
+
+# ibconfig options, the Iba names are aliases
+IbcPAD = IbaPAD = 0x1
+IbcTMO = IbaTMO = 0x3
+IbcEOSrd = IbaEOSrd = 0xc
+IbcEOSwrt = IbaEOSwrt = 0xd
+IbcEOScmp = IbaEOScmp = 0xe
+IbcEOSchar = IbaEOSchar = 0xf
+
+
+class GpibError(Exception):
+    pass
+
+
+class _Device(object):
+    def __init__(self, instrument):
+        self.instrument = instrument
+        self.options = {}
+        self.output = b''
+        self.lock = threading.Lock()
+
+
+_instruments = {}
+_handles = {}
+_lock = threading.Lock()
+
+
+def attach(board: int, address: int, instrument):
+    """ Puts instrument at the primary address on board """
+    _instruments[board, address] = instrument
+
+
+def detach_all():
+    with _lock:
+        _instruments.clear()
+        _handles.clear()
+
+
+def dev(board: int, address: int, *args) -> int:
+    instrument = _instruments.get((board, address))
+    if instrument is None:
+        raise GpibError('dev() failed: no listener at address {}'.format(address))
+    with _lock:
+        handle = len(_handles) + 1
+        _handles[handle] = _Device(instrument)
+    return handle
+
+
+def _device(handle) -> _Device:
+    try:
+        return _handles[handle]
+    except KeyError:
+        raise GpibError('invalid handle {}'.format(handle)) from None
+
+
+def config(handle, option, value):
+    _device(handle).options[option] = value
+
+
+def ask(handle, option) -> int:
+    return _device(handle).options.get(option, 0)
+
+
+def write(handle, data):
+    device = _device(handle)
+    if isinstance(data, str):
+        data = data.encode('ascii')
+    with device.lock:
+        device.output = b''
+        buffer = bytearray(data)
+        messages = device.instrument.split(buffer)
+        if buffer:
+            # the last message ends with EOI instead of a termination
+            messages.append(bytes(buffer).decode('ascii').strip('\r\n'))
+        for message in messages:
+            answer = device.instrument.respond(message)
+            if answer is not None:
+                device.output += device.instrument.encode(answer)
+
+
+def read(handle, length) -> bytes:
+    """ Returns at most length bytes, up to and including the EOS
+        character if EOS detection is enabled
+    """
+    device = _device(handle)
+    with device.lock:
+        if not device.output:
+            raise GpibError('read() failed: timeout')
+        end = min(length, len(device.output))
+        if device.options.get(IbcEOSrd) and IbcEOSchar in device.options:
+            index = device.output.find(bytes([device.options[IbcEOSchar]]), 0, end)
+            if index >= 0:
+                end = index + 1
+        data, device.output = device.output[:end], device.output[end:]
+        return data
+
+
+def clear(handle):
+    device = _device(handle)
+    with device.lock:
+        device.output = b''
+        device.instrument.clear()
+
+
+def close(handle):
+    with _lock:
+        _handles.pop(handle, None)
+
+
+def install():
+    """ Registers this module as 'gpib' """
+    sys.modules['gpib'] = sys.modules[__name__]
@@ -0,0 +1,229 @@
+""" Simulated HP instruments: 4284A precision LCR meter """
+
+import cmath
+import math
+import re
+import struct
+
+from ..transport.block import block
+from .base import LatencyModel, ScpiInstrument
+
+# measurement time of one point above 1kHz
+INTEGRATION_TIMES = {'SHOR': 0.03, 'MED': 0.19, 'LONG': 0.49}
+
+UNITS = {'': 1.0, 'V': 1.0, 'MV': 1e-3, 'UV': 1e-6, 'A': 1.0, 'MA': 1e-3, 'UA': 1e-6,
+         'HZ': 1.0, 'KHZ': 1e3, 'MHZ': 1e6}
+
+NUMBER = re.compile(r'^\s*([-+]?[0-9.]+(?:[eE][-+]?[0-9]+)?)\s*([A-Za-z]*)\s*$')
+
+
+def _number(argument: str) -> float:
+    match = NUMBER.match(argument)
+    if match is None:
+        raise ValueError(argument)
+    return float(match.group(1)) * UNITS[match.group(2).upper()]
+
+
+class LCRMeter4284ASimulation(ScpiInstrument):
+    """ HP 4284A measuring a resistor parallel to a capacitor """
+
+    identification = 'HEWLETT-PACKARD,4284A,0,01.20 SIMULATED'
+    termination = '\n'
+
+    NUMERIC = ('FREQ', 'VOLT', 'CURR', 'BIAS:VOLT', 'BIAS:CURR')
+    # points of the list sweep table and readings of the data buffer memory
+    LIST_POINTS = 10
+    BUFFER_POINTS = 128
+    SWITCHES = ('FUNC:IMP:RANG:AUTO', 'AMPL:ALC', 'OUTP:HPOW', 'BIAS:STAT', 'INIT:CONT')
+
+    def __init__(self, resistance: float = 1e6, capacitance: float = 1e-9,
+                 latency: LatencyModel = None):
+        """ Arguments:
+            resistance -- (float) parallel resistance of the device under test
+            capacitance -- (float) parallel capacitance of the device under test
+        """
+        self.resistance = resistance
+        self.capacitance = capacitance
+        super().__init__(latency if latency is not None else
+                         LatencyModel(default=0.003, per_command={'*RST': 0.5, 'FREQ ': 0.02}))
+        self.commands_table = {'*TRG': self._trigger, 'APER': self._aperture,
+                               'TRIG': self._trigger_to_buffer, 'TRIG:IMM': self._trigger_to_buffer,
+                               'MEM:DIM': self._dimension, 'MEM:FILL': self._fill,
+                               'MEM:READ?': self._read_buffer, 'MEM:CLE': self._clear_buffer}
+        for header in self.NUMERIC:
+            self.commands_table['LIST:' + header] = self._list_setter(header)
+            self.commands_table[header] = self._setter(header, _number)
+            self.commands_table[header + '?'] = self._getter(header, '{:+.6E}')
+        for header in self.SWITCHES:
+            self.commands_table[header] = self._setter(
+                header, lambda argument: int(argument.strip().upper() in ('1', 'ON')))
+            self.commands_table[header + '?'] = self._getter(header, '{:d}')
+
+    def defaults(self) -> dict:
+        return {'FREQ': 1e3, 'VOLT': 1.0, 'CURR': 0.0, 'BIAS:VOLT': 0.0, 'BIAS:CURR': 0.0,
+                'FUNC:IMP:RANG:AUTO': 1, 'AMPL:ALC': 0, 'OUTP:HPOW': 0, 'BIAS:STAT': 0,
+                'INIT:CONT': 0, 'FUNC:IMP': 'CPD', 'APER': 'MED,1',
+                'FORM': 'ASC', 'TRIG:SOUR': 'INT', 'DISP:PAGE': 'MEAS', 'LIST:MODE': 'SEQ'}
+
+    def reset(self):
+        super().reset()
+        # list sweep points as (parameter, values) and the data buffer
+        self.sweep_list = None
+        self.buffer_size = 0
+        self.buffer_filling = False
+        self.buffer = []
+
+    def _list_setter(self, header):
+        def handler(argument):
+            try:
+                values = [_number(value) for value in argument.split(',')]
+            except (ValueError, KeyError):
+                self.errors.append('-222,"Data out of range"')
+                return
+            if len(values) > self.LIST_POINTS:
+                self.errors.append('-223,"Too much data"')
+                return
+            self.sweep_list = (header, values)
+        return handler
+
+    def list_sweep_active(self) -> bool:
+        """ The 4284A sweeps the list on every trigger while the list sweep
+            page is displayed
+        """
+        return self.settings['DISP:PAGE'].upper().startswith('LIST') and self.sweep_list is not None
+
+    def _dimension(self, argument):
+        name, _, size = argument.partition(',')
+        if name.strip().upper() != 'DBUF' or not 1 <= int(size) <= self.BUFFER_POINTS:
+            self.errors.append('-224,"Illegal parameter value"')
+            return
+        self.buffer_size = int(size)
+        self.buffer = []
+
+    def _fill(self, argument):
+        self.buffer_filling = True
+
+    def _clear_buffer(self, argument):
+        self.buffer_size = 0
+        self.buffer_filling = False
+        self.buffer = []
+
+    def _read_buffer(self, argument):
+        if not self.buffer:
+            self.errors.append('-230,"Data corrupt or stale"')
+            return None
+        return self.data(self.buffer)
+
+    def _setter(self, header, convert):
+        def handler(argument):
+            try:
+                self.settings[header] = convert(argument)
+            except (ValueError, KeyError):
+                self.errors.append('-222,"Data out of range"')
+        return handler
+
+    def _getter(self, header, template):
+        return lambda argument: template.format(self.settings[header])
+
+    def _aperture(self, argument):
+        time, _, averages = argument.upper().partition(',')
+        time = time.strip()[:4] if time.strip() else 'MED'
+        if time == 'SHOR' or time.startswith('SHO'):
+            time = 'SHOR'
+        if time not in INTEGRATION_TIMES:
+            self.errors.append('-224,"Illegal parameter value"')
+            return
+        self.settings['APER'] = '{},{}'.format(time, int(averages or 1))
+
+    def busy_time_of(self, header, argument) -> float:
+        if header in ('*TRG', 'TRIG', 'TRIG:IMM'):
+            return sum(self.point_time() for _ in self.points())
+        return 0.0
+
+    def point_time(self) -> float:
+        time, averages = self.settings['APER'].split(',')
+        # below 1kHz the measurement spans whole signal periods
+        period = 1.0 / self.settings['FREQ']
+        return int(averages) * max(INTEGRATION_TIMES[time], 4 * period)
+
+    def points(self):
+        """ Yields once per measured point with the settings of the point
+            in place, the points of the list on the list sweep page
+        """
+        if not self.list_sweep_active():
+            yield
+            return
+        header, values = self.sweep_list
+        previous = self.settings[header]
+        try:
+            for value in values:
+                self.settings[header] = value
+                yield
+        finally:
+            self.settings[header] = previous
+
+    def impedance(self) -> complex:
+        omega = 2 * math.pi * self.settings['FREQ']
+        return 1.0 / (1.0 / self.resistance + 1j * omega * self.capacitance)
+
+    def parameters(self):
+        """ Primary and secondary parameter of the selected function """
+        omega = 2 * math.pi * self.settings['FREQ']
+        z = self.impedance()
+        y = 1.0 / z
+        function = self.settings['FUNC:IMP']
+        if function in ('ZTD', 'ZTR', 'YTD', 'YTR'):
+            value = z if function.startswith('Z') else y
+            angle = cmath.phase(value)
+            return abs(value), math.degrees(angle) if function.endswith('D') else angle
+        if function == 'RX':
+            return z.real, z.imag
+        if function == 'GB':
+            return y.real, y.imag
+        # capacitance and inductance functions, parallel or series model
+        if function.startswith(('CP', 'LP')):
+            primary = y.imag / omega if function.startswith('C') else -1.0 / (omega * y.imag)
+            loss = y.real / abs(y.imag) if y.imag else float('inf')
+            resistance = 1.0 / y.real if y.real else float('inf')
+            conductance = y.real
+        else:
+            primary = -1.0 / (omega * z.imag) if function.startswith('C') else z.imag / omega
+            loss = z.real / abs(z.imag) if z.imag else float('inf')
+            resistance = conductance = z.real
+        secondary = {'D': loss, 'Q': 1.0 / loss if loss else float('inf'),
+                     'G': conductance, 'RP': resistance, 'RS': resistance}[function[2:]]
+        return primary, secondary
+
+    def data(self, points):
+        """ Primary and secondary parameter and status of the measured
+            points in the format selected by FORM, list sweep data carry
+            the comparison result as fourth value
+        """
+        extra = (0, 0) if self.list_sweep_active() else (0,)
+        if self.settings['FORM'].upper().startswith('REAL'):
+            # 64 bit reals, big endian
+            values = [value for point in points for value in tuple(point) + extra]
+            return block(struct.pack('>{}d'.format(len(values)), *values))
+        return ','.join('{:+.5E},{:+.5E},'.format(*point) + ','.join('{:+d}'.format(value) for value in extra)
+                        for point in points)
+
+    def measure(self) -> list:
+        """ Measures all points of one trigger, the results also go to the
+            data buffer while it is filling
+        """
+        results = [self.parameters() for _ in self.points()]
+        if self.buffer_filling:
+            room = self.buffer_size - len(self.buffer)
+            self.buffer.extend(results[:room])
+        return results
+
+    def _trigger(self, argument):
+        if self.settings['TRIG:SOUR'] != 'BUS':
+            self.errors.append('-211,"Trigger ignored"')
+            return None
+        return self.data(self.measure())
+
+    def _trigger_to_buffer(self, argument):
+        # triggers regardless of the trigger source, nothing is answered
+        self.measure()
+        return None
@@ -0,0 +1,185 @@
+""" Simulated Keithley instruments: 2400 and 2000 (SCPI), 2602A (TSP) """
+
+import re
+import struct
+
+from .base import LatencyModel, ScpiInstrument, SimulatedInstrument, scpi_keyword
+
+LINE_FREQUENCY = 50.0
+
+
+def _on(value: str) -> bool:
+    return value.strip().upper() in ('1', 'ON')
+
+
+class Sourcemeter2400Simulation(ScpiInstrument):
+    """ Keithley 2400 sourcing into a resistor """
+
+    identification = 'KEITHLEY INSTRUMENTS INC.,MODEL 2400,0000000,C32 SIMULATED'
+
+    def __init__(self, resistance: float = 1e6, latency: LatencyModel = None):
+        """ Arguments:
+            resistance -- (float) load in Ohm
+        """
+        self.resistance = resistance
+        super().__init__(latency if latency is not None else
+                         LatencyModel(default=0.002, per_command={'*RST': 0.1}))
+        self.commands_table = {'READ?': self._read,
+                               'SYST:BEEP:IMM': lambda argument: None}
+
+    def defaults(self) -> dict:
+        return {'SOUR:FUNC': 'VOLT',
+                'SENS:FUNC': '"CURR:DC"',
+                'SOUR:VOLT:LEV': '0',
+                'SOUR:CURR:LEV': '0',
+                'SENS:CURR:PROT': '1.05e-4',
+                'SENS:VOLT:PROT': '21',
+                'SENS:CURR:NPLC': '1',
+                'SENS:VOLT:NPLC': '1',
+                'SENS:AVER': 'OFF',
+                'OUTP:STAT': '0',
+                'FORM:ELEM': 'VOLT,CURR,RES,TIME,STAT',
+                'FORM:DATA': 'ASC',
+                'FORM:BORD': 'NORM'}
+
+    def _sensed(self) -> str:
+        function = self.settings['SENS:FUNC'].strip('"\'').split(':')[0]
+        return scpi_keyword(function)
+
+    def busy_time_of(self, header, argument) -> float:
+        if header == 'READ?':
+            nplc = float(self.settings.get('SENS:{}:NPLC'.format(self._sensed()), 1))
+            # signal and auto zero reference
+            return 2 * nplc / LINE_FREQUENCY
+        return 0.0
+
+    def measure(self):
+        """ Returns voltage and current at the load """
+        if scpi_keyword(self.settings['SOUR:FUNC']) == 'VOLT':
+            voltage = float(self.settings['SOUR:VOLT:LEV'])
+            limit = float(self.settings['SENS:CURR:PROT'])
+            current = max(-limit, min(limit, voltage / self.resistance))
+        else:
+            current = float(self.settings['SOUR:CURR:LEV'])
+            limit = float(self.settings['SENS:VOLT:PROT'])
+            voltage = max(-limit, min(limit, current * self.resistance))
+        return voltage, current
+
+    def _read(self, argument):
+        if not _on(self.settings['OUTP:STAT']):
+            self.errors.append('+803,"Output disabled"')
+            return None
+        if self.settings['FORM:DATA'].upper().startswith(('SRE', 'REAL')):
+            # indefinite length block of 32 bit reals, swapped is little endian
+            order = '<' if self.settings['FORM:BORD'].upper().startswith('SWAP') else '>'
+            return b'#0' + struct.pack(order + '2f', *self.measure())
+        return '{:+.6E},{:+.6E}'.format(*self.measure())
+
+
+class Multimeter2000Simulation(ScpiInstrument):
+    """ Keithley 2000 measuring a resistor """
+
+    identification = 'KEITHLEY INSTRUMENTS INC.,MODEL 2000,0000000,A20 SIMULATED'
+
+    def __init__(self, source=lambda: 100.0, latency: LatencyModel = None):
+        """ Arguments:
+            source -- (callable) returns the measured value
+        """
+        self.source = source
+        super().__init__(latency if latency is not None else
+                         LatencyModel(default=0.002, per_command={'*RST': 0.1}))
+        self.commands_table = {'READ?': lambda argument: '{:+.8E}'.format(self.source())}
+
+    def defaults(self) -> dict:
+        return {'SENS:FUNC': '"VOLT:DC"', 'SENS:NPLC': '1'}
+
+    def busy_time_of(self, header, argument) -> float:
+        if header == 'READ?':
+            return float(self.settings.get('SENS:NPLC', 1)) / LINE_FREQUENCY
+        return 0.0
+
+
+class Sourcemeter2602ASimulation(SimulatedInstrument):
+    """ Keithley 2602A speaking the subset of TSP the driver uses.
+
+        Attribute assignments are stored per name, smuX.measure.iv()
+        assigns the reading of a resistive load and printnumber prints
+        variables. Several statements may be sent in one message
+        separated by ';' or line breaks.
+    """
+
+    ASSIGNMENT = re.compile(r'^\s*([\w.,\s]+?)\s*=\s*(.+?)\s*$')
+    CALL = re.compile(r'^\s*(smu[ab])\.(reset|measure\.iv)\(\)\s*$')
+    PRINT = re.compile(r'^\s*print(number)?\((.*)\)\s*$')
+
+    def __init__(self, resistance: float = 1e6, latency: LatencyModel = None):
+        super().__init__(latency if latency is not None else
+                         LatencyModel(default=0.002, per_command={'smua.reset': 0.05, 'smub.reset': 0.05}))
+        self.resistance = resistance
+        self.variables = {}
+        self.attributes = {'smua': {}, 'smub': {}}
+        self._busy = 0.0
+
+    def defaults(self) -> dict:
+        return {'source.func': 'OUTPUT_DCVOLTS', 'source.levelv': '0', 'source.leveli': '0',
+                'source.limiti': '1e-4', 'source.limitv': '20', 'measure.nplc': '1',
+                'source.output': 'OUTPUT_OFF'}
+
+    def _setting(self, smu, name) -> str:
+        return self.attributes[smu].get(name, self.defaults()[name])
+
+    def _measure(self, smu):
+        self._busy += 2 * float(self._setting(smu, 'measure.nplc')) / LINE_FREQUENCY
+        if self._setting(smu, 'source.func').endswith('OUTPUT_DCVOLTS'):
+            voltage = float(self._setting(smu, 'source.levelv'))
+            limit = float(self._setting(smu, 'source.limiti'))
+            current = max(-limit, min(limit, voltage / self.resistance))
+        else:
+            current = float(self._setting(smu, 'source.leveli'))
+            limit = float(self._setting(smu, 'source.limitv'))
+            voltage = max(-limit, min(limit, current * self.resistance))
+        return current, voltage
+
+    def busy_time(self, command) -> float:
+        busy, self._busy = self._busy, 0.0
+        return busy
+
+    def handle(self, command):
+        answers = []
+        for statement in re.split(r'[;\n]', command):
+            if not statement.strip():
+                continue
+            answer = self._execute(statement)
+            if answer is not None:
+                answers.append(answer)
+        return '\n'.join(answers) if answers else None
+
+    def _execute(self, statement):
+        call = self.CALL.match(statement)
+        if call is not None and call.group(2) == 'reset':
+            self.attributes[call.group(1)] = {}
+            return None
+
+        printing = self.PRINT.match(statement)
+        if printing is not None:
+            names = [name.strip() for name in printing.group(2).split(',')]
+            return ', '.join('{:.5e}'.format(float(self.variables.get(name, 0.0))) for name in names)
+
+        assignment = self.ASSIGNMENT.match(statement)
+        if assignment is None:
+            return None
+        target, value = assignment.groups()
+        measurement = self.CALL.match(value)
+        if measurement is not None and measurement.group(2) == 'measure.iv':
+            names = [name.strip() for name in target.split(',')]
+            for name, reading in zip(names, self._measure(measurement.group(1))):
+                self.variables[name] = reading
+            return None
+
+        smu, _, attribute = target.partition('.')
+        if smu in self.attributes:
+            # constants like smua.OUTPUT_DCVOLTS are stored by name
+            self.attributes[smu][attribute] = value.split('.', 1)[1] if value.startswith(smu + '.') else value
+        else:
+            self.variables[target] = value
+        return None
@@ -0,0 +1,47 @@
+""" Simulated Lake Shore instruments: Model 340 temperature controller """
+
+from .base import LatencyModel, SimulatedInstrument
+
+
+class Model340Simulation(SimulatedInstrument):
+    """ Model 340 with fixed sensor temperatures and two control loops """
+
+    identification = 'LSCI,MODEL340,000000,061407'
+    termination = '\r\n'
+
+    def __init__(self, temperatures=None, latency: LatencyModel = None):
+        """ Arguments:
+            temperatures -- (dict) sensor letter -> temperature in Kelvin
+        """
+        super().__init__(latency if latency is not None else LatencyModel(default=0.005))
+        self.temperatures = dict(temperatures or {'A': 300.0, 'B': 300.0, 'C': 300.0, 'D': 300.0})
+        self.set_points = {'1': 0.0, '2': 0.0}
+        self.ramps = {'1': (0, 0.0), '2': (0, 0.0)}
+
+    def handle(self, command):
+        answers = []
+        for part in command.split(';'):
+            header, _, argument = part.strip().partition(' ')
+            arguments = [item.strip() for item in argument.split(',')] if argument.strip() else []
+            answer = self.handle_command(header.upper(), arguments)
+            if answer is not None:
+                answers.append(answer)
+        return ';'.join(answers) if answers else None
+
+    def handle_command(self, header, arguments):
+        if header == '*IDN?':
+            return self.identification
+        if header == 'KRDG?':
+            return '{:+.3f}'.format(self.temperatures[arguments[0].upper()])
+        if header == 'SETP?':
+            return '{:+.3f}'.format(self.set_points[arguments[0]])
+        if header == 'SETP':
+            self.set_points[arguments[0]] = float(arguments[1])
+        elif header == 'RAMP?':
+            enabled, rate = self.ramps[arguments[0]]
+            return '{},{:+.1f}'.format(enabled, rate)
+        elif header == 'RAMP':
+            self.ramps[arguments[0]] = (int(arguments[1]), float(arguments[2]))
+        elif header == 'RAMPST?':
+            return '0'
+        return None
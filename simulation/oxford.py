@@ -0,0 +1,270 @@
+""" Simulated Oxford Instruments: ITC503, ILM and IPS120-10.
+
+    The instruments answer every command with a line ending in '\r', set
+    commands echo their command letter, invalid ones answer '?' followed by
+    the command. An ISOBUS prefix '@n' is accepted and ignored, the
+    IsobusGateway routes commands by that prefix to several instruments.
+"""
+
+import re
+import time
+
+from .base import LatencyModel, SimulatedInstrument
+
+ISOBUS_PREFIX = re.compile(r'^@(\d)')
+
+
+class OxfordInstrument(SimulatedInstrument):
+    """ Base class of the Oxford instruments """
+
+    input_termination = '\r'
+    termination = '\r'
+    version = 'SIMULATED Version 1.00 (c) OXFORD'
+
+    def __init__(self, latency: LatencyModel = None):
+        # the instruments speak ISOBUS internally at 9600 baud
+        super().__init__(latency if latency is not None else LatencyModel(default=0.02))
+        self.control = 0
+
+    def handle(self, command):
+        command = ISOBUS_PREFIX.sub('', command.strip())
+        if not command:
+            return None
+        letter, argument = command[0], command[1:]
+        if letter == 'V':
+            return self.version
+        if letter == 'Q':
+            # communication protocol, never answered
+            return None
+        try:
+            if letter == 'C':
+                self.control = int(argument)
+                return letter
+            answer = self.handle_command(letter, argument)
+        except (ValueError, KeyError, IndexError):
+            return '?' + command
+        if answer is None:
+            return '?' + command
+        return answer
+
+    def handle_command(self, letter, argument):
+        """ Returns the answer, None for an unknown command """
+        return None
+
+
+class ITC503Simulation(OxfordInstrument):
+    """ ITC503 temperature controller with a fixed set of sensor readings
+        and a sweep table of 16 steps.
+    """
+
+    # sweep table parameters selected by 'y'
+    STEP_TEMPERATURE, SWEEP_TIME, HOLD_TIME = 1, 2, 3
+
+    def __init__(self, temperatures=(4.2, 4.3, 4.25), latency: LatencyModel = None):
+        super().__init__(latency)
+        self.temperatures = list(temperatures)
+        self.set_point = 0.0
+        self.heater_percentage = 0.0
+        self.heater_volts = 0.0
+        self.gas_flow = 0.0
+        self.pid = [1.0, 1.0, 0.0]
+        self.auto = 0
+        self.heater_sensor = 1
+        self.auto_pid = 0
+        self.sweep_table = [[0.0, 0.0, 0.0] for _ in range(16)]
+        self.sweep_pointer = [0, 0]
+        self._sweep_start = None
+
+    def sweep_status(self) -> int:
+        """ 0 no sweep, 2n-1 sweeping to step n, 2n holding step n. Sweep
+            and hold times are in minutes.
+        """
+        if self._sweep_start is None:
+            return 0
+        elapsed = (time.monotonic() - self._sweep_start) / 60.0
+        for step, (_, sweep_time, hold_time) in enumerate(self.sweep_table, 1):
+            if elapsed < sweep_time:
+                return 2 * step - 1
+            elapsed -= sweep_time
+            if elapsed < hold_time:
+                return 2 * step
+            elapsed -= hold_time
+        self._sweep_start = None
+        return 0
+
+    def status(self) -> str:
+        return 'X0A{}C{}S{:02d}H{}L{}'.format(self.auto, self.control, self.sweep_status(),
+                                             self.heater_sensor, self.auto_pid)
+
+    def read_parameter(self, number: int) -> str:
+        if number == 0:
+            return 'R{:.3f}'.format(self.set_point)
+        if number in (1, 2, 3):
+            return 'R{:.3f}'.format(self.temperatures[number - 1])
+        if number == 4:
+            return 'R{:+.3f}'.format(self.set_point - self.temperatures[self.heater_sensor - 1])
+        if number == 5:
+            return 'R+{:05.1f}'.format(self.heater_percentage)
+        if number == 6:
+            return 'R+{:05.1f}'.format(self.heater_volts)
+        if number == 7:
+            return 'R+{:05.1f}'.format(self.gas_flow)
+        if number in (8, 9, 10):
+            return 'R{:.1f}'.format(self.pid[number - 8])
+        return None
+
+    def handle_command(self, letter, argument):
+        if letter == 'R':
+            return self.read_parameter(int(argument))
+        if letter == 'X':
+            return self.status()
+        if letter == 'T':
+            self.set_point = float(argument)
+        elif letter in 'PID':
+            self.pid['PID'.index(letter)] = float(argument)
+        elif letter == 'O':
+            # tenths of a percent
+            self.heater_percentage = float(argument) / 10.0
+            self.heater_volts = 40.0 * self.heater_percentage / 100.0
+        elif letter == 'G':
+            self.gas_flow = float(argument) / 10.0
+        elif letter == 'A':
+            self.auto = int(argument)
+        elif letter == 'H':
+            self.heater_sensor = int(argument)
+        elif letter == 'L':
+            self.auto_pid = int(argument)
+        elif letter == 'S':
+            self._sweep_start = time.monotonic() if int(argument) else None
+        elif letter == 'x':
+            self.sweep_pointer[0] = int(argument)
+        elif letter == 'y':
+            self.sweep_pointer[1] = int(argument)
+        elif letter == 's':
+            step, parameter = self.sweep_pointer
+            self.sweep_table[step - 1][parameter - 1] = float(argument)
+        elif letter == 'r':
+            step, parameter = self.sweep_pointer
+            return 'r{:.1f}'.format(self.sweep_table[step - 1][parameter - 1])
+        else:
+            return None
+        return letter
+
+
+class ILMSimulation(OxfordInstrument):
+    """ ILM helium level meter """
+
+    def __init__(self, levels=(73.5, 0.0, 0.0), latency: LatencyModel = None):
+        super().__init__(latency)
+        self.levels = list(levels)
+
+    def handle_command(self, letter, argument):
+        if letter == 'R':
+            number = int(argument)
+            if number not in (1, 2, 3):
+                return None
+            # tenths of a percent
+            return 'R{:03d}'.format(int(round(self.levels[number - 1] * 10)))
+        if letter in 'STU':
+            # fast/slow sampling of a channel
+            return letter
+        return None
+
+
+class IPS120Simulation(OxfordInstrument):
+    """ IPS120-10 magnet power supply ramping the field to its target """
+
+    # tesla per ampere of the simulated magnet
+    FIELD_CONSTANT = 0.1
+
+    def __init__(self, latency: LatencyModel = None):
+        super().__init__(latency)
+        self.field = 0.0
+        self.target = 0.0
+        self.rate = 0.1
+        self.mode = 0
+        self.heater = 0
+        self._updated = time.monotonic()
+
+    def _update(self):
+        now = time.monotonic()
+        elapsed_minutes = (now - self._updated) / 60.0
+        self._updated = now
+        goal = {0: self.field, 1: self.target, 2: 0.0, 4: self.field}[self.mode]
+        step = self.rate * elapsed_minutes
+        if abs(goal - self.field) <= step:
+            self.field = goal
+        else:
+            self.field += step if goal > self.field else -step
+
+    def handle_command(self, letter, argument):
+        self._update()
+        if letter == 'R':
+            number = int(argument)
+            if number in (0, 2):
+                return 'R{:+.4f}'.format(self.field / self.FIELD_CONSTANT)
+            if number == 7:
+                return 'R{:+.4f}'.format(self.field)
+            if number == 8:
+                return 'R{:+.4f}'.format(self.target)
+            if number == 9:
+                return 'R{:+.4f}'.format(self.rate)
+            return None
+        if letter == 'X':
+            return 'X00A{}C{}H{}M00P00'.format(self.mode, self.control, self.heater)
+        if letter == 'A':
+            self.mode = int(argument)
+        elif letter == 'H':
+            self.heater = int(argument)
+        elif letter == 'I':
+            self.target = float(argument) * self.FIELD_CONSTANT
+        elif letter == 'J':
+            self.target = float(argument)
+        elif letter == 'S':
+            self.rate = float(argument) * self.FIELD_CONSTANT
+        elif letter == 'T':
+            self.rate = float(argument)
+        else:
+            return None
+        return letter
+
+
+class IsobusGateway(SimulatedInstrument):
+    """ Several Oxford instruments daisy chained behind one GPIB or serial
+        interface, commands are routed by their '@n' prefix. Commands
+        without prefix go to the instrument at default_address.
+    """
+
+    input_termination = '\r'
+    termination = '\r'
+
+    def __init__(self, instruments: dict, default_address: int = 0):
+        """ Arguments:
+            instruments -- (dict) ISOBUS address -> OxfordInstrument
+        """
+        super().__init__(LatencyModel())
+        self.instruments = dict(instruments)
+        self.default_address = default_address
+
+    def _route(self, command) -> SimulatedInstrument:
+        match = ISOBUS_PREFIX.match(command)
+        address = int(match.group(1)) if match else self.default_address
+        return self.instruments.get(address)
+
+    def handle(self, command):
+        instrument = self._route(command)
+        if instrument is None:
+            return None
+        return instrument.handle(command)
+
+    def respond(self, command):
+        # the addressed instrument accounts for its own latency
+        self.commands += 1
+        instrument = self._route(command)
+        if instrument is None:
+            return None
+        return instrument.respond(command)
+
+    def clear(self):
+        for instrument in self.instruments.values():
+            instrument.clear()
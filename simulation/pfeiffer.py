@@ -0,0 +1,56 @@
+""" Simulated Pfeiffer TPG 361 single gauge controller """
+
+from .base import LatencyModel, SimulatedInstrument
+
+ACK = '\x06'
+NAK = '\x15'
+ENQ = '\x05'
+
+
+class SingleGaugeTPG361Simulation(SimulatedInstrument):
+    """ Acknowledges a mnemonic and sends its data on the following ENQ,
+        which arrives as a single byte without termination.
+    """
+
+    termination = '\r\n'
+
+    def __init__(self, pressure: float = 1.234e-3, latency: LatencyModel = None):
+        super().__init__(latency if latency is not None else
+                         LatencyModel(default=0.002, baudrate=115200))
+        self.pressure = pressure
+        self._pending = None
+
+    def split(self, buffer: bytearray) -> list:
+        messages = []
+        while buffer:
+            if buffer[0] == ord(ENQ):
+                del buffer[0]
+                messages.append(ENQ)
+                continue
+            index = buffer.find(b'\n')
+            if index < 0:
+                break
+            messages.append(bytes(buffer[:index]).decode('ascii').strip('\r\n'))
+            del buffer[:index + 1]
+        return messages
+
+    def data(self, mnemonic) -> str:
+        if mnemonic == 'PR1':
+            return '0,{:.4E}'.format(self.pressure)
+        if mnemonic == 'PR2':
+            # the single gauge controller has no second gauge
+            return '5,0.0000E+00'
+        if mnemonic == 'UNI':
+            return '0'
+        return None
+
+    def handle(self, command):
+        if command == ENQ:
+            if self._pending is None:
+                return None
+            return self.data(self._pending)
+        if self.data(command) is None:
+            self._pending = None
+            return NAK
+        self._pending = command
+        return ACK
@@ -0,0 +1,60 @@
+""" Puts a simulated instrument behind a pseudo terminal, so the serial
+    drivers open its port like a real one, e.g.
+
+        stand_in = PtyStandIn(SingleGaugeTPG361Simulation())
+        gauge = SingleGaugeTPG361(stand_in.port)
+"""
+
+import os
+import threading
+import tty
+
+from .base import SimulatedInstrument
+
+
+class PtyStandIn(object):
+    """ Serves instrument on the slave side of a pty from a daemon thread.
+        Requests and answers are delayed by the transfer time of the
+        latency model of the instrument.
+    """
+
+    def __init__(self, instrument: SimulatedInstrument):
+        self.instrument = instrument
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True,
+                                        name='pty-{}'.format(type(instrument).__name__))
+        self._thread.start()
+
+    def _serve(self):
+        buffer = bytearray()
+        latency = self.instrument.latency
+        while self._running:
+            try:
+                data = os.read(self._master, 4096)
+            except OSError:
+                return
+            if not data:
+                return
+            buffer.extend(data)
+            for message in self.instrument.split(buffer):
+                latency.wait(latency.transfer_time(len(message) + 1))
+                answer = self.instrument.respond(message)
+                if answer is None:
+                    continue
+                answer = self.instrument.encode(answer)
+                latency.wait(latency.transfer_time(len(answer)))
+                try:
+                    os.write(self._master, answer)
+                except OSError:
+                    return
+
+    def close(self):
+        self._running = False
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
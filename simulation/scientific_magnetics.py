@@ -0,0 +1,47 @@
+""" Simulated Scientific Magnetics SMC 5.52 magnet controller """
+
+from .base import LatencyModel, SimulatedInstrument
+
+
+class SMCSimulation(SimulatedInstrument):
+    """ SMC answering each single letter command, the output current
+        stays at the set point selected by the ramp target.
+    """
+
+    termination = '\r\n'
+
+    def __init__(self, latency: LatencyModel = None):
+        super().__init__(latency if latency is not None else LatencyModel(default=0.02))
+        self.unit = 0
+        self.pause = 0
+        self.direction = 0
+        self.rate = 0.0
+        self.upper = 0.0
+        self.lower = 0.0
+        self.ramp_target = 0
+
+    @property
+    def current(self) -> float:
+        return {0: 0.0, 1: self.lower, 2: self.upper}[self.ramp_target]
+
+    def handle(self, command):
+        command = command.strip()
+        if not command:
+            return None
+        letter, argument = command[0].upper(), command[1:]
+        if letter == 'G':
+            return 'I{:+08.3f}V+00.00R{:d}A'.format(self.current, self.ramp_target)
+        if letter == 'S':
+            return 'S{:d}U{:07.3f}L{:07.3f}'.format(self.unit, self.upper, self.lower)
+        attributes = {'T': 'unit', 'P': 'pause', 'D': 'direction', 'R': 'ramp_target'}
+        if letter in attributes:
+            setattr(self, attributes[letter], int(argument))
+        elif letter == 'A':
+            self.rate = float(argument)
+        elif letter == 'U':
+            self.upper = float(argument)
+        elif letter == 'L':
+            self.lower = float(argument)
+        else:
+            return '?'
+        return letter
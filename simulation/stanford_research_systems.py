@@ -0,0 +1,234 @@
+""" Simulated Stanford Research Systems lock-in amplifiers: SR830 and SR844
+
+    Both speak four letter mnemonics, a '?' directly after the mnemonic
+    makes a query, arguments follow with or without a space and are
+    separated by ','. Several commands may be sent separated by ';', every
+    query among them is answered by a message of its own. Set commands are
+    never answered.
+
+    The data storage buffer fills with the sample rate in simulated time,
+    the real time divided by the latency scale.
+"""
+
+import cmath
+import math
+import re
+import struct
+import time
+
+from .base import LatencyModel, SimulatedInstrument
+
+COMMAND = re.compile(r'^(\*?[A-Za-z]+)(\?)?\s*(.*)$')
+
+
+class LockInSimulation(SimulatedInstrument):
+    """ Base class of the lock-in amplifiers measuring a constant signal """
+
+    identification = 'Stanford_Research_Systems,SR8x0,s/n00000,ver1.00'
+
+    # parameters of SNAP? and OUTP?, overridden per model
+    OUTPUTS = {}
+
+    # seconds the auto functions keep the instrument busy
+    AUTO_TIMES = {'AGAN': 0.5, 'ARSV': 0.5, 'APHS': 0.1, 'AOFF': 0.1}
+
+    # points per channel of the data storage buffer, SRAT of triggered storage
+    BUFFER_POINTS = 16383
+    TRIGGERED = 14
+
+    def __init__(self, signal: complex = 1e-3 + 0.5e-3j, latency: LatencyModel = None):
+        """ Arguments:
+            signal -- (complex) input signal in V rms, phase relative to
+                      the reference
+        """
+        super().__init__(latency if latency is not None else
+                         LatencyModel(default=0.003, per_command=dict(self.AUTO_TIMES, **{'*RST': 0.2})))
+        self.signal = signal
+        self.settings = {}
+        self.auxiliary_inputs = [0.0, 0.0, 0.0, 0.0]
+        self.auxiliary_outputs = [0.0, 0.0, 0.0, 0.0]
+        self.reset()
+
+    def defaults(self) -> dict:
+        return {}
+
+    def reset(self):
+        self.settings = dict(self.defaults())
+        self.reset_storage()
+
+    def reset_storage(self):
+        # points stored before the running segment, real start time of it
+        self.stored = 0.0
+        self.started = None
+        # points sent in FAST mode
+        self.streamed = 0
+
+    def elapsed(self, since: float) -> float:
+        """ Simulated seconds since the real time since """
+        if self.latency.scale <= 0:
+            return math.inf
+        return (time.monotonic() - since) / self.latency.scale
+
+    def sample_rate(self) -> float:
+        index = int(self.settings.get('SRAT', 0))
+        return 0.0 if index == self.TRIGGERED else 0.0625 * 2 ** index
+
+    def measured_points(self) -> float:
+        """ Points measured since the storage was reset """
+        points = self.stored
+        if self.started is not None and self.sample_rate():
+            points += max(0.0, self.elapsed(self.started) * self.sample_rate())
+        return points
+
+    def stored_points(self) -> int:
+        # a full buffer stops in shot mode, in loop mode the oldest
+        # points are overwritten and the count stays at the size
+        return int(min(self.measured_points(), self.BUFFER_POINTS))
+
+    def trace(self, channel: int) -> float:
+        """ Value the displays of channel 1 (X) and 2 (Y) store """
+        return self.output(channel)
+
+    def handle_storage(self, mnemonic, query, arguments):
+        if mnemonic == 'STRT' and self.started is None:
+            self.started = time.monotonic()
+        elif mnemonic == 'STRD' and self.started is None:
+            # storage starts after a delay of 0.5 s
+            self.started = time.monotonic() + 0.5 * max(self.latency.scale, 0.0)
+        elif mnemonic == 'PAUS' and self.started is not None:
+            self.stored, self.started = self.stored_points(), None
+        elif mnemonic == 'REST':
+            self.reset_storage()
+        elif mnemonic == 'TRIG' and self.started is not None and not self.sample_rate():
+            self.stored += 1
+        elif mnemonic == 'SPTS' and query:
+            return str(self.stored_points())
+        elif mnemonic == 'TRCB' and query:
+            channel, start, count = (int(argument) for argument in arguments)
+            if start + count > self.stored_points():
+                return None
+            # IEEE floats, little endian, the last byte sent with EOI
+            return struct.pack('<{}f'.format(count), *[self.trace(channel)] * count)
+        return None
+
+    def measured(self) -> complex:
+        """ Signal after the reference phase shift """
+        return self.signal * cmath.exp(-1j * math.radians(float(self.settings.get('PHAS', 0.0))))
+
+    def output(self, number: int) -> float:
+        return self.OUTPUTS[number](self)
+
+    def handle(self, command):
+        answers = []
+        for part in command.split(';'):
+            match = COMMAND.match(part.strip())
+            if match is None:
+                continue
+            mnemonic, query, argument = match.groups()
+            arguments = [item.strip() for item in argument.split(',')] if argument.strip() else []
+            answer = self.handle_command(mnemonic.upper(), bool(query), arguments)
+            if answer is not None:
+                answers.append(answer if isinstance(answer, bytes) else str(answer))
+        return answers or None
+
+    def handle_command(self, mnemonic, query, arguments):
+        if mnemonic == '*IDN':
+            return self.identification
+        if mnemonic == '*RST':
+            self.reset()
+            return None
+        if mnemonic in ('STRT', 'STRD', 'PAUS', 'REST', 'TRIG', 'SPTS', 'TRCB'):
+            return self.handle_storage(mnemonic, query, arguments)
+        if mnemonic == '*CLS' or mnemonic in self.AUTO_TIMES:
+            return None
+        if mnemonic == 'OUTP' and query:
+            return '{:.6e}'.format(self.output(int(arguments[0])))
+        if mnemonic == 'SNAP' and query:
+            return ','.join('{:.6e}'.format(self.output(int(number))) for number in arguments)
+        if mnemonic == 'OAUX' and query:
+            return '{:.3f}'.format(self.auxiliary_inputs[int(arguments[0]) - 1])
+        if mnemonic in ('AUXV', 'AUXO'):
+            channel = int(arguments[0]) - 1
+            if query:
+                return '{:.3f}'.format(self.auxiliary_outputs[channel])
+            self.auxiliary_outputs[channel] = float(arguments[1])
+            return None
+        if query:
+            return self.settings.get(mnemonic, '0')
+        if arguments:
+            self.settings[mnemonic] = arguments[0]
+        return None
+
+
+class SR830Simulation(LockInSimulation):
+    """ SR830 DSP lock-in amplifier """
+
+    identification = 'Stanford_Research_Systems,SR830,s/n00000,ver1.07'
+
+    OUTPUTS = {1: lambda self: self.measured().real,
+               2: lambda self: self.measured().imag,
+               3: lambda self: abs(self.signal),
+               4: lambda self: math.degrees(cmath.phase(self.measured())),
+               5: lambda self: self.auxiliary_inputs[0],
+               6: lambda self: self.auxiliary_inputs[1],
+               7: lambda self: self.auxiliary_inputs[2],
+               8: lambda self: self.auxiliary_inputs[3],
+               9: lambda self: float(self.settings['FREQ']),
+               10: lambda self: self.measured().real,
+               11: lambda self: self.measured().imag}
+
+    SENSITIVITIES = [2e-9, 5e-9, 10e-9, 20e-9, 50e-9, 100e-9, 200e-9, 500e-9, 1e-6, 2e-6, 5e-6, 10e-6, 20e-6,
+                     50e-6, 100e-6, 200e-6, 500e-6, 1e-3, 2e-3, 5e-3, 10e-3, 20e-3, 50e-3, 100e-3, 200e-3,
+                     500e-3, 1.0]
+
+    # FAST mode integers of a full scale signal
+    FAST_FULL_SCALE = 30000
+
+    def talk(self, size, timeout: float) -> bytes:
+        """ In FAST mode every stored point goes out as X and Y, 16 bit
+            integers in little endian byte order
+        """
+        if self.settings['FAST'] == '0' or self.started is None or not self.sample_rate():
+            return None
+        deadline = time.monotonic() + timeout
+        while self.measured_points() - self.streamed < 1:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(remaining, self.latency.scale / self.sample_rate()))
+        available = self.measured_points() - self.streamed
+        count = int(min(available, size // 4 if size else available, self.BUFFER_POINTS))
+        self.streamed += count
+        full_scale = self.SENSITIVITIES[int(self.settings['SENS'])]
+        x, y = (max(-32768, min(32767, round(value / full_scale * self.FAST_FULL_SCALE)))
+                for value in (self.output(1), self.output(2)))
+        return struct.pack('<{}h'.format(2 * count), *[x, y] * count)
+
+    def defaults(self) -> dict:
+        return {'PHAS': '0.00', 'FMOD': '1', 'FREQ': '1000.0', 'RSLP': '0', 'HARM': '1',
+                'SLVL': '1.000', 'ISRC': '0', 'IGND': '0', 'ICPL': '0', 'ILIN': '0',
+                'SENS': '26', 'RMOD': '1', 'OFLT': '10', 'OFSL': '1', 'SYNC': '0',
+                'OUTX': '1', 'SRAT': '4', 'SEND': '1', 'TSTR': '0', 'FAST': '0'}
+
+
+class SR844Simulation(LockInSimulation):
+    """ SR844 RF lock-in amplifier """
+
+    identification = 'Stanford_Research_Systems,SR844,s/n00000,ver1.006'
+
+    OUTPUTS = {1: lambda self: self.measured().real,
+               2: lambda self: self.measured().imag,
+               3: lambda self: abs(self.signal),
+               # dBm into 50 Ohm
+               4: lambda self: 10 * math.log10(abs(self.signal) ** 2 / 50 / 1e-3) if self.signal else -999.0,
+               5: lambda self: math.degrees(cmath.phase(self.measured())),
+               6: lambda self: self.auxiliary_inputs[0],
+               7: lambda self: self.auxiliary_inputs[1],
+               8: lambda self: float(self.settings['FREQ']),
+               9: lambda self: self.measured().real,
+               10: lambda self: self.measured().imag}
+
+    def defaults(self) -> dict:
+        return {'PHAS': '0.000', 'FMOD': '1', 'FREQ': '100000.0', 'HARM': '0',
+                'SENS': '14', 'WRSV': '1', 'CRSV': '1', 'OFLT': '8', 'OFSL': '1',
+                'OUTX': '1', 'SRAT': '4', 'SEND': '1', 'TSTR': '0'}
@@ -0,0 +1,155 @@
+""" Puts simulated instruments behind the VISA interface.
+
+    A SimulatedResource behaves like a GPIB resource: every write replaces
+    the answers waiting in the output buffer, a read returns one answer,
+    which ends with END, and a read without pending answer times out. install() registers a SimulatedResourceManager in
+    the session pool and, if pyvisa is missing, a stand-in visa module so
+    the drivers import unchanged, e.g.
+
+        manager = install({'GPIB0::24::INSTR': Sourcemeter2400Simulation()})
+        smu = Sourcemeter2400(open_session('GPIB0::24::INSTR'))
+"""
+
+import sys
+import threading
+import types
+
+from ..transport.base import TransportTimeout
+from ..transport.visa_session import install_resource_manager
+
+
+class SimulatedResource(object):
+    """ VISA resource of a simulated instrument """
+
+    def __init__(self, resource_name, instrument, **kwargs):
+        """ Arguments:
+            resource_name -- (str) e.g. 'GPIB0::24::INSTR'
+            instrument -- (SimulatedInstrument) device behind the resource
+            kwargs -- resource attributes like read_termination
+        """
+        self.resource_name = resource_name
+        self.instrument = instrument
+        self.write_termination = ''
+        self.read_termination = None
+        self.term_chars = None
+        self.timeout = 2000
+        self.query_delay = 0.0
+        self.encoding = 'ascii'
+        for attribute, value in kwargs.items():
+            setattr(self, attribute, value)
+        # answers waiting to be read, one message each
+        self._output = []
+        self._lock = threading.Lock()
+
+    def write_raw(self, data: bytes) -> int:
+        with self._lock:
+            # a new command discards unread answers, as on GPIB
+            self._output = []
+            buffer = bytearray(data)
+            messages = self.instrument.split(buffer)
+            if buffer:
+                # the last message ends with EOI instead of a termination
+                messages.append(bytes(buffer).decode(self.encoding).strip('\r\n'))
+            for message in messages:
+                answer = self.instrument.respond(message)
+                if answer is not None:
+                    self._output.extend(self.instrument.encode(item)
+                                        for item in (answer if isinstance(answer, list) else [answer]))
+        return len(data)
+
+    def write(self, message: str) -> int:
+        return self.write_raw((message + (self.write_termination or '')).encode(self.encoding))
+
+    def read_raw(self, size=None) -> bytes:
+        with self._lock:
+            if not self._output:
+                # a device streaming data talks without being asked
+                data = self.instrument.talk(size, self.timeout / 1000.0)
+                if data:
+                    self._output.append(data)
+            if not self._output:
+                raise TransportTimeout('{} timed out reading'.format(self.resource_name))
+            data = self._output.pop(0)
+            if size is not None and len(data) > size:
+                data, rest = data[:size], data[size:]
+                self._output.insert(0, rest)
+            return data
+
+    def read(self) -> str:
+        text = self.read_raw().decode(self.encoding)
+        termination = self.read_termination or self.term_chars
+        if termination and text.endswith(termination):
+            text = text[:-len(termination)]
+        return text
+
+    def query(self, message: str) -> str:
+        self.write(message)
+        return self.read()
+
+    ask = query
+
+    def query_ascii_values(self, message: str, converter=float, separator=',') -> list:
+        return [converter(item) for item in self.query(message).split(separator)]
+
+    def clear(self):
+        with self._lock:
+            self._output = []
+            self.instrument.clear()
+
+    def close(self):
+        pass
+
+
+class SimulatedResourceManager(object):
+    """ ResourceManager handing out SimulatedResources """
+
+    def __init__(self, instruments: dict = None):
+        """ Arguments:
+            instruments -- (dict) resource name -> SimulatedInstrument
+        """
+        self.instruments = {}
+        for resource_name, instrument in (instruments or {}).items():
+            self.add(resource_name, instrument)
+
+    @staticmethod
+    def _key(resource_name: str) -> str:
+        # 'GPIB::4' and 'GPIB0::4::INSTR' name the same instrument
+        parts = resource_name.upper().split('::')
+        if parts[0] == 'GPIB':
+            parts[0] = 'GPIB0'
+        if parts[-1] != 'INSTR':
+            parts.append('INSTR')
+        return '::'.join(parts)
+
+    def add(self, resource_name: str, instrument):
+        self.instruments[self._key(resource_name)] = instrument
+
+    def list_resources(self, query='?*::INSTR') -> tuple:
+        return tuple(self.instruments)
+
+    def open_resource(self, resource_name: str, **kwargs) -> SimulatedResource:
+        instrument = self.instruments.get(self._key(resource_name))
+        if instrument is None:
+            raise IOError('no simulated instrument at {}'.format(resource_name))
+        return SimulatedResource(resource_name, instrument, **kwargs)
+
+    def close(self):
+        pass
+
+
+def install(instruments: dict = None, backend: str = '@py') -> SimulatedResourceManager:
+    """ Makes a SimulatedResourceManager the manager of backend in the
+        session pool and returns it. Without pyvisa a stand-in module
+        'visa' is registered which hands out the same manager.
+    """
+    manager = SimulatedResourceManager(instruments)
+    install_resource_manager(manager, backend)
+    try:
+        import visa
+    except ImportError:
+        visa = types.ModuleType('visa')
+        visa.__version__ = '1.8'
+        visa.ResourceManager = lambda *args: manager
+        visa.instrument = lambda resource_name, **kwargs: manager.open_resource(resource_name, **kwargs)
+        sys.modules['visa'] = visa
+    return manager
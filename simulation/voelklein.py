@@ -0,0 +1,19 @@
+""" Simulated Voelklein micro pressure sensor """
+
+from .base import LatencyModel, SimulatedInstrument
+
+
+class MicroPressureSensorSimulation(SimulatedInstrument):
+    """ Answers 'A' with the raw ADC value """
+
+    termination = '\r\n'
+
+    def __init__(self, value: int = 12345, latency: LatencyModel = None):
+        super().__init__(latency if latency is not None else
+                         LatencyModel(default=0.005, baudrate=9600))
+        self.value = value
+
+    def handle(self, command):
+        if command.strip() == 'A':
+            return '{:d}'.format(self.value)
+        return None
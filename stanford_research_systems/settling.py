@@ -0,0 +1,94 @@
+""" Settling of the output filters of the lock-in amplifiers.
+
+    The output filters are a cascade of RC low passes, one per 6 dB/oct of
+    slope. After a step of the input the output misses the final value by
+
+        exp(-x) * sum(x**k / k! for k < order)
+
+    of the step, x being the time in time constants. For 1 % this gives
+    the 4.6, 6.6, 8.4 and 10 time constants the manuals list for 6, 12,
+    18 and 24 dB/oct. The synchronous filter of the SR830 averages over
+    one period of the detection frequency in addition.
+
+    A SettleClock remembers the last change of the input or of the
+    filters, waiting for the settled output only waits for the time which
+    is left since then. The wait holds no bus, other threads and
+    coroutines talk to their instruments meanwhile.
+"""
+
+import asyncio
+import math
+import time
+from functools import lru_cache
+
+
+def _missed(order: int, x: float) -> float:
+    """ Fraction of a step the output misses after x time constants """
+    term = total = 1.0
+    for k in range(1, order):
+        term *= x / k
+        total += term
+    return math.exp(-x) * total
+
+
+@lru_cache(maxsize=None)
+def settle_periods(order: int, accuracy: float) -> float:
+    """ Time constants order RC low passes take to settle within accuracy
+
+        Arguments:
+        order -- (int) number of RC low passes
+        accuracy -- (float) fraction of a step the output may still miss
+    """
+    if not 0 < accuracy < 1:
+        raise ValueError('Settling accuracy should be between 0 and 1, got {}'.format(accuracy))
+    if order < 1:
+        return 0.0
+    low, high = 0.0, -math.log(accuracy)
+    while _missed(order, high) > accuracy:
+        low, high = high, 2 * high
+    while high - low > 1e-9 * high:
+        middle = (low + high) / 2
+        if _missed(order, middle) > accuracy:
+            low = middle
+        else:
+            high = middle
+    return high
+
+
+def settle_time(time_constant: float, slope: int, accuracy: float = 1e-3, sync_period: float = 0.0) -> float:
+    """ Seconds the output takes to settle within accuracy of a step
+
+        Arguments:
+        time_constant -- (float) of the output filters in s
+        slope -- (int) of the output filters in dB/oct, 6, 12, 18 or 24
+        accuracy -- (float) fraction of a step the output may still miss
+        sync_period -- (float) the synchronous filter averages over in s,
+                       0 if it is off
+    """
+    return settle_periods(slope // 6, accuracy) * time_constant + sync_period
+
+
+class SettleClock(object):
+    """ Time of the last change the output of one lock-in settles from """
+
+    def __init__(self):
+        self.changed = time.monotonic()
+
+    def change(self):
+        """ Restarts settling, e.g. after a new frequency """
+        self.changed = time.monotonic()
+
+    def remaining(self, seconds: float) -> float:
+        """ Seconds left of a settle time of seconds """
+        return max(0.0, self.changed + seconds - time.monotonic())
+
+    def wait(self, transport, seconds: float):
+        """ Waits for the rest of seconds with transport.sleep """
+        remaining = self.remaining(seconds)
+        if remaining > 0:
+            transport.sleep(remaining, 'settle')
+
+    async def wait_async(self, seconds: float):
+        remaining = self.remaining(seconds)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
@@ -0,0 +1,40 @@
+""" SNAP? reads of the Stanford Research Systems lock-in amplifiers.
+
+    SNAP? takes two to six parameters at the same instant and answers them
+    in one transaction, e.g. X, Y, an aux input and the reference
+    frequency. The values are returned as a numpy record with one field per
+    parameter:
+
+        values = lock_in.snap('x', 'y', 'frequency')
+        values.x, values['frequency']
+"""
+
+import numpy as np
+
+from ..transport.recovery import Desynchronised
+
+# parameters per SNAP? query
+SNAP_MIN = 2
+SNAP_MAX = 6
+
+
+def snap(transport, codes: dict, names) -> np.record:
+    """ Queries the parameters names at the same instant
+
+        Arguments:
+        transport -- (Transport) connection to the lock-in
+        codes -- (dict) parameter name -> SNAP? number of the model
+        names -- (tuple) parameter names, 2 to 6 of codes
+    """
+    if not SNAP_MIN <= len(names) <= SNAP_MAX:
+        raise ValueError('SNAP? takes {} to {} parameters, got {}'.format(SNAP_MIN, SNAP_MAX, len(names)))
+    unknown = [name for name in names if name not in codes]
+    if unknown:
+        raise ValueError('Unknown parameters {}, choose from {}'.format(unknown, list(codes)))
+
+    answer = transport.query('SNAP?' + ','.join(str(codes[name]) for name in names))
+    values = answer.split(',')
+    if len(values) != len(names):
+        raise Desynchronised('SNAP? answered {!r} for {} parameters'.format(answer, len(names)))
+    dtype = np.dtype([(name, float) for name in names])
+    return np.rec.array([tuple(float(value) for value in values)], dtype=dtype)[0]
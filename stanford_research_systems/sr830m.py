@@ -5,19 +5,82 @@
 __author__ = 'Marc Hanefeld, Alfons Schuck'
 __version__ = 0.1
 
+import asyncio
+import threading
+import time
 from typing import Tuple
 
+import numpy as np
 import visa
 
+from ..transport.aio import bus_lock
+from ..transport.base import as_transport
+from ..transport.recovery import Desynchronised
+from ..transport.visa_session import open_session
+from .settling import SettleClock, settle_time
+from .snapshot import snap
+
+# Sample rates of the data storage for SRAT 0 (62.5 mHz) to 13 (512 Hz), SRAT 14 stores on triggers
+SAMPLE_RATES = [0.0625 * 2 ** index for index in range(14)]
+SAMPLE_RATE_TRIGGERED = 14
+
+# Points per channel of the data storage buffer
+BUFFER_POINTS = 16383
+
+# TRCB? transfers IEEE floats in little endian byte order
+TRACE_FLOAT = np.dtype('<f4')
+
+# FAST mode sends X and Y of every point as 16 bit integers in little endian byte order,
+# 30000 is the full scale of the sensitivity
+FAST_POINT = np.dtype([('x', '<i2'), ('y', '<i2')])
+FAST_FULL_SCALE = 30000
+
+# STRD starts the storage after this delay in seconds
+STRD_DELAY = 0.5
+
+# Settings cached by the getters and read at once by refresh, with their types
+SETTINGS = {'PHAS': float, 'FMOD': int, 'FREQ': float, 'RSLP': int, 'HARM': int, 'SLVL': float,
+            'ISRC': int, 'IGND': int, 'ICPL': int, 'ILIN': int, 'SENS': int, 'RMOD': int,
+            'OFLT': int, 'OFSL': int, 'SYNC': int, 'SRAT': int, 'SEND': int}
+
+# Settings the auto functions change, the available reserve depends on the sensitivity
+AUTO_CHANGES = {'AGAN': ('SENS', 'RMOD'), 'ARSV': ('SENS', 'RMOD'), 'APHS': ('PHAS',)}
+
+# Settings after which the output has to settle, all but the data storage ones
+SETTLING = set(SETTINGS) - {'SRAT', 'SEND'}
+
+# Filter slopes of OFSL in dB/oct, the synchronous filter works below this detection frequency in Hz
+FILTER_SLOPES = [6, 12, 18, 24]
+SYNC_FREQUENCY_MAX = 200
+
+# Parameters of SNAP?
+SNAP_PARAMETERS = {'x': 1, 'y': 2, 'r': 3, 'theta': 4, 'aux1': 5, 'aux2': 6, 'aux3': 7, 'aux4': 8,
+                   'frequency': 9, 'ch1': 10, 'ch2': 11}
+
 
 class SR830m(object):
-    def __init__(self, GPIBPort: str = 'GPIB0::6::INSTR'):
-        rm = visa.ResourceManager('@py')
-        self.inst = rm.open_resource(GPIBPort,
+    def __init__(self, GPIBPort = 'GPIB0::6::INSTR'):
+        """
+        :param GPIBPort: resource name, its session is taken from the pool,
+                         or an already opened session
+        """
+        if isinstance(GPIBPort, str):
+            self.inst = open_session(GPIBPort,
                                      write_termination='\r\n',
                                      read_termination='\r\n',
                                      delay=0.1
                                      )
+        else:
+            self.inst = as_transport(GPIBPort)
+
+        # Points of the data storage buffer read by readStorage
+        self._storageRead = 0
+
+        # Known settings, mnemonic -> value, see _setting
+        self._settings = {}
+
+        # Last change the output settles from, see waitSettled
+        self.settling = SettleClock()
 
         # Defining the extremal values for the device
         self._vRmsAcMin = 0.004
@@ -48,141 +111,194 @@ class SR830m(object):
 
     # TODO copy docstrings from user manual
 
+    def _setting(self, mnemonic: str):
+        """
+        Value of a setting of SETTINGS, queried only when it is not known. The setters
+        and refresh make settings known, the auto functions and rst forget the ones
+        they change. Changes at the front panel are not seen before the next refresh.
+        """
+        value = self._settings.get(mnemonic)
+        if value is None:
+            value = self._settings[mnemonic] = SETTINGS[mnemonic](self.inst.query(mnemonic + '?'))
+        return value
+
+    def _set(self, mnemonic: str, argument: str):
+        self._settings.pop(mnemonic, None)
+        self.inst.write(mnemonic + argument)
+        self._settings[mnemonic] = SETTINGS[mnemonic](argument)
+        if mnemonic in SETTLING:
+            self.settling.change()
+
+    def _forget(self, *mnemonics):
+        """
+        Makes settings unknown, all of them without arguments
+        """
+        if not mnemonics:
+            self._settings = {}
+        for mnemonic in mnemonics:
+            self._settings.pop(mnemonic, None)
+
+    def refresh(self) -> dict:
+        """
+        Reads all settings of SETTINGS in one message and returns them. The lock-in
+        answers every query of the message on its own, one read per setting.
+        """
+        mnemonics = list(SETTINGS)
+        self._forget()
+        with self.inst.transaction():
+            self.inst.write(';'.join(mnemonic + '?' for mnemonic in mnemonics))
+            try:
+                settings = {mnemonic: SETTINGS[mnemonic](self.inst.read()) for mnemonic in mnemonics}
+            except Exception:
+                # drop the answers not read yet, they would shift later queries
+                self.inst.clear()
+                raise
+        self._settings = settings
+        return dict(self._settings)
+
     @property
     def phaseShift(self) -> float:
-        return float(self.inst.query('PHAS?'))
+        return self._setting('PHAS')
 
     @phaseShift.setter
     def phaseShift(self, value: float):
         assert (value >= -360) and (value <= 729.99), 'Phase shift should be between -360° and +729.99°!'
-        self.inst.query('PHAS{:.2f}'.format(value))
+        # the lock-in wraps the phase around at ±180°
+        self._set('PHAS', '{:.2f}'.format((value + 180) % 360 - 180))
 
     @property
     def fmod(self) -> int:
-        return int(self.inst.query('FMOD?'))
+        return self._setting('FMOD')
 
     @fmod.setter
     def fmod(self, value: int):
         assert (value == 0) or (value == 1), 'FMOD should be 0 (external) or 1 (internal)!'
-        self.inst.query('FMOD{:d}'.format(value))
+        self._set('FMOD', '{:d}'.format(value))
+        self._forget('FREQ')
 
     @property
     def freq(self) -> float:
-        return float(self.inst.query('FREQ?'))
+        if self.fmod == 0:
+            # an external reference changes the frequency by itself
+            return float(self.inst.query('FREQ?'))
+        return self._setting('FREQ')
 
     @freq.setter
     def freq(self, value: float):
         assert (value >= 0.001) and (value <= 10200), 'Frequency should be between 0.001 Hz and 10200 Hz!'
+        self._set('FREQ', '{:.4f}'.format(value))
 
     @property
     def rslp(self) -> int:
-        return int(self.inst.query('RSLP?'))
+        return self._setting('RSLP')
 
     @rslp.setter
     def rslp(self, value: int):
         assert (value >= 0) and (
                 value <= 2), 'Reference trigger should be 0 (zero crossing), 1 (rising edge) or 2 (falling edge)!'
-        self.inst.query('RSLP{:d}'.format(value))
+        self._set('RSLP', '{:d}'.format(value))
 
     @property
     def harm(self) -> int:
-        return int(self.inst.query('HARM?'))
+        return self._setting('HARM')
 
     @harm.setter
     def harm(self, value: int):
         assert (value >= 1) and (value <= 19999), 'Detection harmonic should be between 1 and 19999!'
-        self.inst.query('HARM{:d}'.format(value))
+        self._set('HARM', '{:d}'.format(value))
 
     @property
     def slvl(self) -> float:
-        return float(self.inst.query('SLVL?'))
+        return self._setting('SLVL')
 
     @slvl.setter
     def slvl(self, value: float):
         assert (value >= 0) and (value <= 5), 'Amplitude of sine-output should be between 0 (=0.004) V and 5 V'
         if value < 0.004:
             value = 0.004
-        self.inst.query('SLVL{.3f}'.format(value))
+        self._set('SLVL', '{:.3f}'.format(value))
 
     @property
     def isrc(self) -> int:
-        return int(self.inst.query('ISRC?'))
+        return self._setting('ISRC')
 
     @isrc.setter
     def isrc(self, value: int):
         assert (value >= 0) and (value <= 3), 'Input Configuration should be 0 (A), 1 (A-B), 2 (1 MΩ) or 3 (100 MΩ)!'
+        self._set('ISRC', '{:d}'.format(value))
 
     @property
     def ignd(self) -> int:
-        return int(self.inst.query('IGND?'))
+        return self._setting('IGND')
 
     @ignd.setter
     def ignd(self, value: int):
         assert (value == 0) or (value == 1), 'Shield grounding should be 0 (float) or 1 (ground)!'
-        self.inst.query('IGND{:d}'.format(value))
+        self._set('IGND', '{:d}'.format(value))
 
     @property
     def icpl(self) -> int:
-        return int(self.inst.query('ICPL?'))
+        return self._setting('ICPL')
 
     @icpl.setter
     def icpl(self, value: int):
         assert (value == 0) or (value == 1), 'Input coupling should be 0 (AC) or 1 (DC)!'
+        self._set('ICPL', '{:d}'.format(value))
 
     @property
     def ilin(self) -> int:
-        return int(self.inst.query('ILIN?'))
+        return self._setting('ILIN')
 
     @ilin.setter
     def ilin(self, value: int):
         assert (value >= 0) and (
                 value <= 3), 'Input line notch filter should be 0 (no filter), 1 (Line filter), 2 (2x line filter) or 3 (both filters)!'
-        self.inst.query('ILIN{:d}'.format(value))
+        self._set('ILIN', '{:d}'.format(value))
 
     @property
     def sens(self) -> int:
-        return self.inst.query('SENS?')
+        return self._setting('SENS')
 
     @sens.setter
     def sens(self, value: int):
         assert (value >= 0) and (value <= 26), 'Sensitivity should be integer between 0 and 26! Check user manual.'
-        self.inst.query('SENS{:d}'.format(value))
+        self._set('SENS', '{:d}'.format(value))
 
     @property
     def rmod(self) -> int:
-        return int(self.inst.query('RMOD?'))
+        return self._setting('RMOD')
 
     @rmod.setter
     def rmod(self, value: int):
         assert (value >= 0) and (value <= 2), ' Reserve Mode should be 0 (High Reserve), 1 (Normal) or 2 (Low Noise)!'
-        self.inst.query('RMOD{:d}'.format(value))
+        self._set('RMOD', '{:d}'.format(value))
 
     @property
     def oflt(self) -> int:
-        return int(self.inst.query('OFLT?'))
+        return self._setting('OFLT')
 
     @oflt.setter
     def oflt(self, value: int):
         assert (value >= 0) and (value <= 19), 'Time Constant should be integer between 0 and 19! Check user manual.'
-        self.inst.query('OFLT{:d}'.format(value))
+        self._set('OFLT', '{:d}'.format(value))
 
     @property
     def ofsl(self) -> int:
-        return int(self.inst.query('OFSL?'))
+        return self._setting('OFSL')
 
     @ofsl.setter
     def ofsl(self, value: int):
         assert (value >= 0) and (value <= 3), 'Low pass filter slope should be 0 (6dB), 1 (12dB), 2 (18dB) or 3 (24dB)!'
-        self.inst.query('OFSL{:d}'.format(value))
+        self._set('OFSL', '{:d}'.format(value))
 
     @property
     def sync(self) -> int:
-        return int(self.inst.query('SYNC?'))
+        return self._setting('SYNC')
 
     @sync.setter
     def sync(self, value: int):
         assert (value == 0) or (value == 1), 'Synchronous filter should be 0 (Off) or 1 (filtering below 200Hz)!'
-        self.inst.query('SYNC{:d}'.format(value))
+        self._set('SYNC', '{:d}'.format(value))
 
     # TODO DDEF
     # TODO FPOP
@@ -191,10 +307,8 @@ class SR830m(object):
 
     @property
     def oaux(self) -> dict:
-        return {1: self.inst.query('OAUX?1'),
-                2: self.inst.query('OAUX?2'),
-                3: self.inst.query('OAUX?3'),
-                4: self.inst.query('OAUX?4')}
+        values = self.snap('aux1', 'aux2', 'aux3', 'aux4')
+        return {1: values.aux1, 2: values.aux2, 3: values.aux3, 4: values.aux4}
 
     @property
     def auxv(self) -> dict:
@@ -209,7 +323,7 @@ class SR830m(object):
         auxVoltage = value[1]
         assert (auxChannel >= 1) and (auxChannel <= 4), 'Output Channel should be 1, 2, 3 or 4!'
         assert (abs(auxVoltage) <= 10.5), 'Output Voltage should be between -10.5V and 10.5V'
-        self.inst.query('AUXV{:d},{:.3f}'.format(auxChannel, auxVoltage))
+        self.inst.write('AUXV{:d},{:.3f}'.format(auxChannel, auxVoltage))
 
     # TODO OUTX
     # TODO OVRM
@@ -219,18 +333,110 @@ class SR830m(object):
     # TODO RSET
 
     def agan(self):
-        self.inst.query('AGAN')
+        self.inst.write('AGAN')
+        self._forget(*AUTO_CHANGES['AGAN'])
+        self.settling.change()
 
     def arsv(self):
-        self.inst.query('ARSV')
+        self.inst.write('ARSV')
+        self._forget(*AUTO_CHANGES['ARSV'])
+        self.settling.change()
 
     def aphs(self):
-        self.inst.query('APHS')
+        self.inst.write('APHS')
+        self._forget(*AUTO_CHANGES['APHS'])
+        self.settling.change()
 
     def aoff(self, value: int):
-        self.inst.query('AOFF {:d}'.format(value))
+        self.inst.write('AOFF {:d}'.format(value))
 
-    # TODO Datastorage Commands
+    # Datastorage Commands
+
+    @property
+    def srat(self) -> int:
+        return self._setting('SRAT')
+
+    @srat.setter
+    def srat(self, value: int):
+        assert (value >= 0) and (value <= 14), 'Sample rate should be integer between 0 (62.5 mHz) and 13 (512 Hz) or 14 (trigger)!'
+        self._set('SRAT', '{:d}'.format(value))
+
+    @property
+    def send(self) -> int:
+        return self._setting('SEND')
+
+    @send.setter
+    def send(self, value: int):
+        assert (value == 0) or (value == 1), 'End of buffer mode should be 0 (1 shot) or 1 (loop)!'
+        self._set('SEND', '{:d}'.format(value))
+
+    def strt(self):
+        """
+        Start or resume data storage
+        """
+        self.inst.write('STRT')
+
+    def paus(self):
+        """
+        Pause data storage
+        """
+        self.inst.write('PAUS')
+
+    def rest(self):
+        """
+        Reset data storage, all stored points are lost
+        """
+        self.inst.write('REST')
+        self._storageRead = 0
+
+    @property
+    def spts(self) -> int:
+        return int(self.inst.query('SPTS?'))
+
+    def trcb(self, channel: int, start: int, count: int) -> np.ndarray:
+        """
+        Reads count points of the buffer of channel from bin start on as binary floats
+        :param channel: 1 (display of CH1) or 2 (display of CH2)
+        """
+        assert (channel == 1) or (channel == 2), 'Buffer channel should be 1 or 2!'
+        data = np.frombuffer(self.inst.query_binary('TRCB?{:d},{:d},{:d}'.format(channel, start, count)), TRACE_FLOAT)
+        if data.size != count:
+            raise Desynchronised('TRCB? answered {} of {} points'.format(data.size, count))
+        return data.astype(float)
+
+    def startStorage(self, sampleRate: float = 512, loop: bool = False):
+        """
+        Resets the buffer and starts storing the displays of both channels
+        :param sampleRate: in Hz, 62.5 mHz * 2**n up to 512 Hz, None stores one point per trigger
+        :param loop: keep storing when the buffer is full, overwriting the oldest points,
+                     otherwise storage stops after 16383 points
+        """
+        if sampleRate is None:
+            index = SAMPLE_RATE_TRIGGERED
+        else:
+            assert sampleRate in SAMPLE_RATES, 'Sample rate should be one of {}!'.format(SAMPLE_RATES)
+            index = SAMPLE_RATES.index(sampleRate)
+        self.inst.write('REST;SRAT{:d};SEND{:d};STRT'.format(index, int(loop)))
+        self._settings.update(SRAT=index, SEND=int(loop))
+        self._storageRead = 0
+
+    def readStorage(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the points of both channels stored since the last read. Called during
+        a running acquisition it drains the buffer in chunks, in loop mode it has to be
+        called before the buffer is full: a full buffer overwrites its oldest points and
+        the indices shift, so it raises OverflowError, even if the last read reached the end.
+        """
+        with self.inst.transaction():
+            stored = self.spts
+            if stored == BUFFER_POINTS and self.send:
+                raise OverflowError('Data storage buffer is full, points may have been overwritten!')
+            start, count = self._storageRead, stored - self._storageRead
+            if count <= 0:
+                return np.empty(0), np.empty(0)
+            channels = self.trcb(1, start, count), self.trcb(2, start, count)
+        self._storageRead = stored
+        return channels
 
     @property
     def outpX(self) -> float:
@@ -248,13 +454,130 @@ class SR830m(object):
     def outpT(self) -> float:
         return float(self.inst.query('OUTP?4'))
 
-    # TODO SNAP
-    # TODO SPTS
+    async def outpX_async(self) -> float:
+        return float(await self.inst.query_async('OUTP?1'))
+
+    async def outpY_async(self) -> float:
+        return float(await self.inst.query_async('OUTP?2'))
+
+    async def outpR_async(self) -> float:
+        return float(await self.inst.query_async('OUTP?3'))
+
+    async def outpT_async(self) -> float:
+        return float(await self.inst.query_async('OUTP?4'))
+
+    def stream(self, sampleRate: float = 512, blockSize: int = 64, points: int = None, maxLag: float = 1.0):
+        """
+        Generator of X and Y in volts, blocks of blockSize points streamed in FAST mode as the
+        points are measured. The stream occupies the GPIB bus until the generator is closed,
+        it is not read ahead, so a consumer slower than the sample rate makes it lag.
+        :param sampleRate: in Hz, 62.5 mHz * 2**n up to 512 Hz
+        :param points: ends the stream after this many points, None streams until closed
+        :param maxLag: seconds the stream may lag behind the measurement before OverflowError is
+                       raised, the lock-in loses points it can not send
+        """
+        assert sampleRate in SAMPLE_RATES, 'Sample rate should be one of {}!'.format(SAMPLE_RATES)
+        scale = self._sensitivities[int(self.sens)] / FAST_FULL_SCALE
+        with self.inst.transaction():
+            self.inst.write('REST;SRAT{:d};SEND1;FAST2;STRD'.format(SAMPLE_RATES.index(sampleRate)))
+            self._settings.update(SRAT=SAMPLE_RATES.index(sampleRate), SEND=1)
+            self._storageRead = 0
+            started = time.monotonic() + STRD_DELAY
+            received = 0
+            try:
+                while points is None or received < points:
+                    count = blockSize if points is None else min(blockSize, points - received)
+                    data = np.frombuffer(self.inst.read_binary(count * FAST_POINT.itemsize), FAST_POINT)
+                    received += count
+                    lag = time.monotonic() - started - received / sampleRate
+                    if lag > maxLag:
+                        raise OverflowError('FAST stream lags {:.2f} s behind the measurement!'.format(lag))
+                    yield data['x'] * scale, data['y'] * scale
+            finally:
+                # untalk the lock-in before it can listen again
+                self.inst.clear()
+                self.inst.write('PAUS;FAST0')
+
+    async def streamAsync(self, *args, queueSize: int = 16, **kwargs):
+        """
+        Async iterator over the blocks of stream, which runs in a thread of its own. At most
+        queueSize blocks wait for the consumer, a slower consumer stalls the stream and its
+        lag raises OverflowError. The bus is free again once the iterator is exhausted or
+        closed, e.g. by contextlib.aclosing after a break.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(queueSize)
+        closed = threading.Event()
+
+        def produce():
+            blocks = self.stream(*args, **kwargs)
+            try:
+                for block in blocks:
+                    asyncio.run_coroutine_threadsafe(queue.put(block), loop).result()
+                    if closed.is_set():
+                        break
+                end = None
+            except Exception as error:
+                end = error
+            finally:
+                blocks.close()
+            asyncio.run_coroutine_threadsafe(queue.put(end), loop).result()
+
+        async with bus_lock(self.inst.bus):
+            producer = loop.run_in_executor(None, produce)
+            try:
+                while True:
+                    block = await queue.get()
+                    if block is None:
+                        break
+                    if isinstance(block, Exception):
+                        raise block
+                    yield block
+            finally:
+                closed.set()
+                # let the producer put its last block and end
+                while not producer.done():
+                    while not queue.empty():
+                        queue.get_nowait()
+                    await asyncio.sleep(0.01)
+
+    def settleTime(self, accuracy: float = 1e-3) -> float:
+        """
+        Seconds the output takes to settle within accuracy of a step, see settling.py. The
+        time constant, filter slope, synchronous filter and the detection frequency
+        (harmonic * reference frequency) come from the settings cache.
+        :param accuracy: fraction of the step the output may still miss
+        """
+        syncPeriod = 0.0
+        if self.sync:
+            detection = self.harm * self.freq
+            if detection < SYNC_FREQUENCY_MAX:
+                syncPeriod = 1 / detection
+        return settle_time(self._integrationTimes[self.oflt], FILTER_SLOPES[self.ofsl], accuracy, syncPeriod)
+
+    def waitSettled(self, accuracy: float = 1e-3):
+        """
+        Waits until the output settled within accuracy after the last change of a setting,
+        only for the time left since then. The bus is free for other instruments meanwhile.
+        Call settling.change() after changes outside of this driver, e.g. of the signal source.
+        """
+        self.settling.wait(self.inst, self.settleTime(accuracy))
+
+    async def waitSettledAsync(self, accuracy: float = 1e-3):
+        await self.settling.wait_async(await self.inst.run_async(self.settleTime, accuracy))
+
+    def snap(self, *names) -> np.record:
+        """
+        Takes 2 to 6 parameters at the same instant in one query, see snapshot.py
+        :param names: of SNAP_PARAMETERS, X, Y, R and theta by default
+        """
+        return snap(self.inst, SNAP_PARAMETERS, names or ('x', 'y', 'r', 'theta'))
+
+    async def snap_async(self, *names) -> np.record:
+        return await self.inst.run_async(self.snap, *names)
+
     # TODO TRCA
-    # TODO TRCB
     # TODO TRCL
-    # TODO FAST
-    # TODO STRD
 
     @property
     def idn(self) -> str:
@@ -264,7 +587,9 @@ class SR830m(object):
         """
         Reset Lock-In
         """
-        self.inst.query('*RST')
+        self.inst.write('*RST')
+        self._forget()
+        self.settling.change()
 
     # TODO LOCL
     # TODO TRIG
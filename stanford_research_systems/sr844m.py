@@ -4,13 +4,19 @@
 # Autor: Marc Hanefeld
 
 import visa
-import gpib
-import time
 import numpy as np
 
+from ..transport.base import as_transport
+from .settling import SettleClock, settle_time
+from .snapshot import snap
+
+# Parameters of SNAP?
+SNAP_PARAMETERS = {'x': 1, 'y': 2, 'r': 3, 'r_dbm': 4, 'theta': 5, 'aux1': 6, 'aux2': 7,
+                   'frequency': 8, 'ch1': 9, 'ch2': 10}
+
 class SR844m(object):
     def __init__(self, device):
-        self.LIA = device
+        self.LIA = as_transport(device)
         
         # Defining the extremal values for the device
         self.V_AUX_output_min = -10.5
@@ -21,6 +27,13 @@ class SR844m(object):
         # Possible integration times for the Lock-In amplifier
         self.integration_times = [100E-6,300E-6,1E-3,3E-3,10E-3,30E-3,100E-3,300E-3,1,3,10,30,100,300,1E3,3E3,10E3,30E3]
         self.sensitivities = np.array([100E-9, 300E-9, 1E-6, 3E-6, 10E-6, 30E-6, 100E-6, 300E-6, 1E-3, 3E-3, 10E-3, 30E-3, 100E-3, 300E-3, 1])
+        # Filter slopes in dB/oct, without filtering (0) the output settles at most like with 6 dB/oct
+        self.filter_slopes = [6, 6, 12, 18, 24]
+
+        # Filter settings known to settle_time and the last change the output settles from
+        self._time_constant = None
+        self._filter_slope = None
+        self.settling = SettleClock()
 
         #self.LIA.write('*RST') # Reset the unit to its default configurations. Careful V = 1V!
         self.LIA.clear() # Clear the local buffer for GPIB communications
@@ -30,12 +43,11 @@ class SR844m(object):
         self.LIA.write('HARM 0') # The HARM command sets or queries 2F detect mode. The parameter i selects OFF, (detect at F, i=0) or ON, (detect at 2F, i=1).
         self.set_sensitivity(1) # Set the Sensitivity 1 V rms full scale.
         self.set_integration_time(1) # Set (Query) the Time Constant to 1s.
-        self.LIA.clear()
-        time.sleep(1)
+        self.LIA.clear() # The output settles meanwhile, see wait_settled()
         
     def set_voltage(self, value):
         ''' Not allowed with SR844m. Ref Out is allways set to a 1Vpp square function. If you want another voltage or signal use the HP3325B Function Generator. '''
-        print "Method not implemented! See help."
+        print("Method not implemented! See help.")
         
     def set_frequency(self, value):
         ''' Set (Query) the Reference Frequency to f Hz.Set only in Internal reference mode. 10 kHz  <= x <= 200MHz. '''
@@ -43,13 +55,14 @@ class SR844m(object):
         if self.frequency_min <= value <= self.frequency_max:
             value_verified = True
         else:
-            print "Desired frequency is out of device range."
+            print("Desired frequency is out of device range.")
             value_verified = False
         
         if value_verified:
             signal_str = 'FREQ ' + str(value)
             #print signal_str
             self.LIA.write(signal_str)
+            self.settling.change()
             
     def get_frequency(self):
         ''' Method to get the output frequency set for the device '''
@@ -61,14 +74,16 @@ class SR844m(object):
         '''Set (Query) the Time Constant to 10 us through 30 ks, allowed values are: [10E-6,30E-6,100E-6,300E-6,1E-3,3E-3,10E-3,30E-3,100E-3,300E-3,1,3,10,30,100,300,1E3,3E3,10E3,30E3] 
         Caution: Time constants greater than 30s may NOT be set if theharmonic x ref. frequency (detection frequency) exceeds 200 Hz. Read manual for further information.'''
         if value in self.integration_times:
-			value_verified = True
+            value_verified = True
         else:
-            print "Desired integration time is not an allowed value for the device."
+            print("Desired integration time is not an allowed value for the device.")
             value_verified = False
         
         if value_verified == True:
-			entry_index = self.integration_times.index(value)
-			self.LIA.write('OFLT ' + str(entry_index))
+            entry_index = self.integration_times.index(value)
+            self.LIA.write('OFLT ' + str(entry_index))
+            self._time_constant = value
+            self.settling.change()
         
     def get_integration_time(self):
         ''' Method to get the integration time set for the device '''
@@ -79,18 +94,16 @@ class SR844m(object):
     def auto_adjust_sensitivity(self):
         ''' Method to use the internal sensitivity adjustment of the LIA. Careful this takes some time and may cause problems. Better use adjust_sensitivity() '''
         self.LIA.write('AGAN')
+        self.settling.change()
         
     def adjust_sensitivity(self):
         ''' Method to automatically adjust the sensitivity of the device to fit the measured value. Returns the new sensitivity set for the system. '''
-        integration_time = self.integration_times[int(self.LIA.ask('OFLT?'))]
-        
-        
         while True:
-            time.sleep(3*(integration_time)) # Wait for the system to be in a steady state before adjusting the sensitivity
+            self.wait_settled(0.01) # Wait for the system to be in a steady state before adjusting the sensitivity
             sensitivity = self.LIA.ask('SENS?')
-            values = self.LIA.ask("SNAP? 1,2").split(',') # Get the values for X and Y to set the sensitivity for the higher of both
-            x = abs(float(values[0]))
-            y = abs(float(values[1]))
+            values = self.snap('x', 'y') # Get the values for X and Y to set the sensitivity for the higher of both
+            x = abs(values.x)
+            y = abs(values.y)
             max_value = max(x, y) * 1.1 # Determine the necessary value for the sensitivity with a 10% margin for variation
             # Compare the measured value to the list of possible sensitivities and choose the lowest one possible
             result, = np.where(max_value < self.sensitivities)
@@ -102,9 +115,10 @@ class SR844m(object):
             # Set the new sensitivity if it differs from the old one
             if int(sensitivity) != int(new_sensitivity):
                 self.LIA.write('SENS ' + str(new_sensitivity))
+                self.settling.change()
             else:
                 break
-                print "here"
+                print("here")
             
         return self.sensitivities[new_sensitivity]
     
@@ -118,12 +132,13 @@ class SR844m(object):
         elif value in self.sensitivities:
             value_verified = True
         else:
-            print "Desired sensitivity is not an allowed value for the device."
+            print("Desired sensitivity is not an allowed value for the device.")
             value_verified = False
         
         if value_verified == True:
             entry_index = np.where(self.sensitivities == value)[0][0]
             self.LIA.write('SENS ' + str(entry_index))
+            self.settling.change()
                 
     def get_sensitivity(self):
         ''' Method to get the sensitivity set for the device '''
@@ -131,17 +146,35 @@ class SR844m(object):
         #print output_str + " Vrms"
         return output_str
     
+    def settle_time(self, accuracy=1e-3):
+        ''' Method to get the seconds the output takes to settle within accuracy (fraction of a step) from the time constant and the filter slope, see settling.py. The SR844 has no synchronous filter, the 2F detection does not change the settling. Both settings are queried once, changes at the front panel are not seen. '''
+        if self._time_constant is None:
+            self._time_constant = self.integration_times[int(self.LIA.ask('OFLT?'))]
+        if self._filter_slope is None:
+            self._filter_slope = self.filter_slopes[int(self.LIA.ask('OFSL?'))]
+        return settle_time(self._time_constant, self._filter_slope, accuracy)
+
+    def wait_settled(self, accuracy=1e-3):
+        ''' Method to wait until the output settled within accuracy after the last change of frequency, time constant or sensitivity. Only the time left since the change is waited and the GPIB bus stays free for other instruments meanwhile. Call settling.change() after changes outside of this driver, e.g. of the signal source. '''
+        self.settling.wait(self.LIA, self.settle_time(accuracy))
+
+    async def wait_settled_async(self, accuracy=1e-3):
+        ''' Method to wait like wait_settled() while other coroutines run. '''
+        await self.settling.wait_async(await self.LIA.run_async(self.settle_time, accuracy))
+
+    def snap(self, *names):
+        ''' Method to get 2 to 6 output values of the device taken at the same instant in one query. Names are keys of SNAP_PARAMETERS, X, Y, R and angle by default. Returns a numpy record with one field per name, see snapshot.py. '''
+        return snap(self.LIA, SNAP_PARAMETERS, names or ('x', 'y', 'r', 'theta'))
+
     def get_measured_values(self):
         ''' Method to get sevaral output values of the device: X, Y, R, angle, frequency. Returns dictionary with these values.'''
-        output_str = self.LIA.ask("SNAP? 1,2,3,5,8")
-        output_list = output_str.split(",")
-        print output_list
+        values = self.snap('x', 'y', 'r', 'theta', 'frequency')
         output_dict = {}
-        output_dict["X"] = float(output_list[0])
-        output_dict["Y"] = float(output_list[1])
-        output_dict["R"] = float(output_list[2])
-        output_dict["angle"] = float(output_list[3])
-        output_dict["frequency"] = float(output_list[4])
+        output_dict["X"] = values.x
+        output_dict["Y"] = values.y
+        output_dict["R"] = values.r
+        output_dict["angle"] = values.theta
+        output_dict["frequency"] = values.frequency
         
         return output_dict
     
@@ -168,7 +201,7 @@ class SR844m(object):
         ''' Method to get the measured angle value. '''
         output_str = float(self.LIA.ask("OUTP? 5"))
         #print output_str
-        return output_str	
+        return output_str
     
     def set_voltage_aux_output(self, value, i):
         ''' Set (Query) voltage of Aux Output i (1,2) to x Volts. -10.500 <= x <= 10.500. '''
@@ -176,13 +209,13 @@ class SR844m(object):
         if self.V_AUX_output_min <= value <= self.V_AUX_output_max:
             value_verified = True
         else:
-            print "Desired voltage is out of device range."
+            print("Desired voltage is out of device range.")
             value_verified = False
         
         if i in [1,2]:
             output_verified = True
         else:
-            print "Desired output is not allowed."
+            print("Desired output is not allowed.")
             output_verified = False
         
         
@@ -192,13 +225,13 @@ class SR844m(object):
             self.LIA.write(signal_str)  
              
     def clean_up(self):
-		'''Resets the Lock-In-Amplifier to a save state by putting the outputs to zero. '''
+        '''Resets the Lock-In-Amplifier to a save state by putting the outputs to zero. '''
                 
-		self.set_voltage_aux_output(0.0)
-		self.set_sensitivity("save")
+        self.set_voltage_aux_output(0.0)
+        self.set_sensitivity("save")
         
     
-		
+        
 # Beispielprogramm
 # Es werden immer das visa und das HP3325B Modul benoetigt
 if __name__ == '__main__':
@@ -0,0 +1,72 @@
+""" Asyncio support for the transports.
+
+    Blocking transport calls run in a thread pool shared by all loops.
+    Every bus gets one asyncio.Lock per loop, so instruments on different
+    boards or interfaces overlap their waits while calls to the same GPIB
+    board are still serialised.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from weakref import WeakKeyDictionary
+
+# bus calls only wait, so size the pool for instruments instead of cores
+MAX_WORKERS = 32
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='transport')
+_bus_locks = WeakKeyDictionary()
+
+
+def bus_lock(bus) -> asyncio.Lock:
+    """ Returns the lock of bus for the running event loop """
+    loop = asyncio.get_running_loop()
+    locks = _bus_locks.setdefault(loop, {})
+    lock = locks.get(bus)
+    if lock is None:
+        lock = locks[bus] = asyncio.Lock()
+    return lock
+
+
+async def run_on_bus(bus, function, *args, **kwargs):
+    """ Runs the blocking function in the thread pool while holding the
+        lock of bus and returns its result.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(function, *args, **kwargs)
+    async with bus_lock(bus):
+        return await loop.run_in_executor(_executor, call)
+
+
+# Example: polls simulated instruments one after the other and concurrently
+if __name__ == '__main__':
+    import time
+
+    from .memory import MemoryTransport
+
+    LATENCY = 0.1
+    N = 8
+
+    def make_transports(shared_bus):
+        return [MemoryTransport(lambda message: '1.0', latency=LATENCY,
+                                bus='GPIB0' if shared_bus else 'GPIB{}'.format(i))
+                for i in range(N)]
+
+    async def poll(transports):
+        return await asyncio.gather(*[transport.query_async('READ?')
+                                      for transport in transports])
+
+    transports = make_transports(shared_bus=False)
+    SPOT0 = time.perf_counter()
+    for transport in transports:
+        transport.query('READ?')
+    SPOT1 = time.perf_counter()
+    asyncio.run(poll(transports))
+    SPOT2 = time.perf_counter()
+    asyncio.run(poll(make_transports(shared_bus=True)))
+    SPOT3 = time.perf_counter()
+
+    print('latency per instrument:', LATENCY)
+    print('sequential, {} instruments:'.format(N), SPOT1 - SPOT0)
+    print('async, separate buses:', SPOT2 - SPOT1)
+    print('async, one shared bus:', SPOT3 - SPOT2)
@@ -0,0 +1,268 @@
+""" Event loop driven serial transport.
+
+    One SerialEngine runs an asyncio loop in a background thread and
+    watches the file descriptors of all serial ports registered with it,
+    so any number of serial instruments are served from that one thread.
+    Every request has a deadline and may be cancelled, the blocking
+    transport interface submits to the engine and waits.
+"""
+
+import asyncio
+import threading
+import time
+
+from .base import Transport, TransportTimeout
+
+# deadline of a request if the connection has no timeout of its own
+DEFAULT_TIMEOUT = 1.0
+
+
+class SerialEngine(object):
+    """ Event loop in a daemon thread serving all AsyncSerialTransports """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever,
+                                        name='serial-engine', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def default(cls) -> 'SerialEngine':
+        """ Returns the engine shared by the whole process """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def run(self, coroutine, timeout=None):
+        """ Runs coroutine on the engine and blocks until it is done.
+            Must not be called from the engine thread itself.
+        """
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError('blocking call from inside the serial engine')
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def run_all(self, coroutines, timeout=None) -> list:
+        """ Runs all coroutines concurrently and returns their results """
+        async def gather():
+            return await asyncio.gather(*coroutines)
+        return self.run(gather(), timeout)
+
+    async def submit(self, coroutine):
+        """ Awaits coroutine on the engine from any event loop """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            return await coroutine
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, self.loop))
+
+
+class AsyncSerialTransport(Transport):
+    """ Serial transport whose I/O runs on a SerialEngine.
+
+        The connection is switched to non-blocking reads, its former
+        timeout becomes the default deadline of every request. A request
+        which misses its deadline or is cancelled discards the partial
+        answer, so the next request starts in sync again.
+    """
+
+    supports_pipelining = True
+
+    def __init__(self, connection, engine: SerialEngine = None, timeout: float = None, **kwargs):
+        """ Arguments:
+            connection -- (serial.Serial) an opened serial port
+            engine -- (SerialEngine) defaults to the shared engine
+            timeout -- (float) default deadline of a request in seconds
+        """
+        kwargs.setdefault('bus', connection.port)
+        kwargs.setdefault('name', connection.port)
+        super().__init__(**kwargs)
+        self.connection = connection
+        self.engine = engine if engine is not None else SerialEngine.default()
+
+        if timeout is None:
+            timeout = connection.timeout or DEFAULT_TIMEOUT
+        self.timeout = timeout
+        connection.timeout = 0
+
+        self._incoming = bytearray()
+        self._waiter = None
+        self._lock = None
+        self._reading = False
+        self._error = None
+
+    # engine side
+
+    def _attach(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        if not self._reading:
+            # again after a failed read, the port may be back by now
+            self.engine.loop.add_reader(self.connection.fileno(), self._on_readable)
+            self._reading = True
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def _on_readable(self):
+        try:
+            data = self.connection.read(self.connection.in_waiting or 1)
+        except Exception as error:
+            self.engine.loop.remove_reader(self.connection.fileno())
+            self._reading = False
+            self._error = error
+        else:
+            self._incoming.extend(data)
+        self._wake()
+
+    def _raise_error(self):
+        # a failed read is raised by one request only
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    async def _read_until(self, terminator: bytes) -> bytes:
+        while True:
+            self._raise_error()
+            index = self._incoming.find(terminator)
+            if index >= 0:
+                end = index + len(terminator)
+                answer = bytes(self._incoming[:end])
+                del self._incoming[:end]
+                return answer
+            self._waiter = self.engine.loop.create_future()
+            await self._waiter
+
+    async def _transact(self, data, expect_answer, timeout):
+        # runs on the engine loop, data None means read only
+        self._attach()
+        terminator = self.read_termination.encode(self.encoding)[-1:] or b'\n'
+        async with self._lock:
+            self._raise_error()
+            if data is not None:
+                if expect_answer:
+                    # request/answer protocols never talk unasked
+                    self._incoming.clear()
+                self.connection.write(data)
+                if not expect_answer:
+                    return len(data)
+            try:
+                return await asyncio.wait_for(self._read_until(terminator),
+                                              self.timeout if timeout is None else timeout)
+            except asyncio.TimeoutError:
+                self._incoming.clear()
+                raise TransportTimeout('{} did not answer in time'.format(self.resource_name)) from None
+            except asyncio.CancelledError:
+                self._incoming.clear()
+                raise
+
+    async def _timed_async(self, kind, command, data, expect_answer, timeout):
+        # the engine must never block, so the async path bypasses the bus
+        # arbiter, the port lock serialises the requests instead
+        coroutine = self.engine.submit(self._transact(data, expect_answer, timeout))
+        if not self.hooks:
+            return await coroutine
+        start = time.perf_counter()
+        try:
+            result = await coroutine
+        except Exception as error:
+            self._notify(kind, command, 0, start, error)
+            raise
+        self._notify(kind, command, result if isinstance(result, int) else len(result), start, None)
+        return result
+
+    # asyncio interface
+
+    async def request_async(self, data: bytes, timeout: float = None) -> bytes:
+        """ Sends data as it is and returns the raw answer """
+        return await self._timed_async('query', data, data, True, timeout)
+
+    async def query_raw_async(self, message: str, timeout: float = None) -> bytes:
+        data = (message + self.write_termination).encode(self.encoding)
+        return await self._timed_async('query', message, data, True, timeout)
+
+    async def query_async(self, message: str, timeout: float = None) -> str:
+        answer = (await self.query_raw_async(message, timeout)).decode(self.encoding)
+        if self.read_termination and answer.endswith(self.read_termination):
+            answer = answer[:-len(self.read_termination)]
+        return answer
+
+    async def write_async(self, message: str) -> int:
+        data = (message + self.write_termination).encode(self.encoding)
+        return await self._timed_async('write', message, data, False, None)
+
+    async def read_raw_async(self, timeout: float = None) -> bytes:
+        return await self._timed_async('read', None, None, True, timeout)
+
+    def run(self, coroutine, timeout=None):
+        """ Blocking wrapper used by the sync driver methods """
+        return self.engine.run(coroutine, timeout)
+
+    # blocking backend interface
+
+    def _copy(self, answer: bytes) -> int:
+        while len(answer) > len(self._buffer):
+            self._grow()
+        self._view[:len(answer)] = answer
+        return len(answer)
+
+    def _write_raw(self, data: bytes) -> int:
+        return self.engine.run(self._transact(data, False, None))
+
+    def _receive(self) -> int:
+        return self._copy(self.engine.run(self._transact(None, True, None)))
+
+    def _exchange(self, message: str) -> int:
+        data = (message + self.write_termination).encode(self.encoding)
+        return self._copy(self.engine.run(self._transact(data, True, None)))
+
+    def _clear(self):
+        self.connection.reset_input_buffer()
+        self._incoming.clear()
+
+    def close(self):
+        if self._reading:
+            self._reading = False
+            self.engine.loop.call_soon_threadsafe(self.engine.loop.remove_reader,
+                                                  self.connection.fileno())
+        self.connection.close()
+
+
+# Example: twelve pty stand-ins answering after 0.1s, polled from one thread
+if __name__ == '__main__':
+    import os
+    import serial
+
+    N = 12
+    LATENCY = 0.1
+
+    def stand_in(master):
+        while True:
+            os.read(master, 64)
+            time.sleep(LATENCY)
+            os.write(master, b'+1.000E-03\r\n')
+
+    transports = []
+    for i in range(N):
+        master, slave = os.openpty()
+        threading.Thread(target=stand_in, args=(master,), daemon=True).start()
+        transports.append(AsyncSerialTransport(serial.Serial(os.ttyname(slave)), write_termination='\r'))
+
+    engine = SerialEngine.default()
+    SPOT0 = time.perf_counter()
+    for transport in transports:
+        transport.query('PR1')
+    SPOT1 = time.perf_counter()
+    engine.run_all([transport.query_async('PR1') for transport in transports])
+    SPOT2 = time.perf_counter()
+
+    print('latency per instrument:', LATENCY)
+    print('one after the other, {} ports:'.format(N), SPOT1 - SPOT0)
+    print('concurrently:', SPOT2 - SPOT1)
@@ -0,0 +1,162 @@
+""" Per-bus arbitration of blocking transactions.
+
+    All transports on one bus (e.g. every instrument on GPIB board 0) share
+    one BusArbiter. A thread owns the bus for a whole transaction, waiting
+    threads are served by priority and in order of arrival within one
+    priority. The owning thread may nest transactions.
+"""
+
+import functools
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from itertools import count
+
+
+class Priority(IntEnum):
+    """ Lower values are served first """
+    CRITICAL = 0     # safety relevant reads, e.g. the magnet field
+    INTERACTIVE = 1  # commands a user is waiting for
+    NORMAL = 2
+    BULK = 3         # logging
+
+
+class _Waiter(object):
+    __slots__ = ('thread', 'event')
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.event = threading.Event()
+
+
+class BusArbiter(object):
+    """ Serialises the transactions on one bus """
+
+    _arbiters = {}
+    _arbiters_lock = threading.Lock()
+
+    def __init__(self, bus):
+        self.bus = bus
+        self._lock = threading.Lock()
+        self._queue = []
+        self._sequence = count()
+        self._owner = None
+        self._depth = 0
+        self._wait = 0.0
+        self._statistics = {priority: [0, 0.0, 0.0] for priority in Priority}
+
+    @classmethod
+    def for_bus(cls, bus) -> 'BusArbiter':
+        """ Returns the arbiter of bus, there is exactly one per bus """
+        with cls._arbiters_lock:
+            arbiter = cls._arbiters.get(bus)
+            if arbiter is None:
+                arbiter = cls._arbiters[bus] = cls(bus)
+            return arbiter
+
+    def acquire(self, priority: Priority = Priority.NORMAL) -> float:
+        """ Blocks until the calling thread owns the bus and returns the
+            time in seconds it waited in the queue. Nested acquisitions
+            return the wait of the outermost one.
+        """
+        thread = threading.get_ident()
+        with self._lock:
+            if self._owner == thread:
+                self._depth += 1
+                return self._wait
+            if self._owner is None:
+                self._owner = thread
+                self._depth = 1
+                self._wait = 0.0
+                self._record(priority, 0.0)
+                return 0.0
+            waiter = _Waiter(thread)
+            heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+
+        start = time.perf_counter()
+        waiter.event.wait()
+        wait = time.perf_counter() - start
+        # release() handed the bus over to us
+        with self._lock:
+            self._wait = wait
+            self._record(priority, wait)
+        return wait
+
+    def release(self):
+        with self._lock:
+            if self._owner != threading.get_ident():
+                raise RuntimeError('bus {} released by a thread not owning it'.format(self.bus))
+            self._depth -= 1
+            if self._depth:
+                return
+            if self._queue:
+                _, _, waiter = heapq.heappop(self._queue)
+                self._owner = waiter.thread
+                self._depth = 1
+                waiter.event.set()
+            else:
+                self._owner = None
+
+    @contextmanager
+    def released(self, priority: Priority = Priority.NORMAL):
+        """ Lets waiting threads use the bus inside the with block, e.g.
+            while the owner sleeps, and takes it back with all nested
+            transactions afterwards. A thread not owning the bus just runs
+            the block.
+        """
+        with self._lock:
+            depth = self._depth if self._owner == threading.get_ident() else 0
+            if depth:
+                self._depth = 1
+        if not depth:
+            yield
+            return
+        self.release()
+        try:
+            yield
+        finally:
+            self.acquire(priority)
+            with self._lock:
+                self._depth = depth
+
+    @contextmanager
+    def transaction(self, priority: Priority = Priority.NORMAL):
+        """ Owns the bus inside the with block, yields the queue wait """
+        wait = self.acquire(priority)
+        try:
+            yield wait
+        finally:
+            self.release()
+
+    def _record(self, priority, wait):
+        entry = self._statistics[priority]
+        entry[0] += 1
+        entry[1] += wait
+        entry[2] = max(entry[2], wait)
+
+    @property
+    def queue_length(self) -> int:
+        return len(self._queue)
+
+    def statistics(self) -> dict:
+        """ Returns requests, total and maximum queue wait per priority """
+        with self._lock:
+            return {priority.name: {'requests': requests,
+                                    'total_wait': total_wait,
+                                    'max_wait': max_wait}
+                    for priority, (requests, total_wait, max_wait) in self._statistics.items()}
+
+
+def bus_transaction(attribute: str, priority: Priority = None):
+    """ Decorates a driver method so it runs as one transaction on the
+        transport stored in attribute, e.g. a clear followed by a query.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with getattr(self, attribute).transaction(priority):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
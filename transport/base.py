@@ -0,0 +1,346 @@
+""" This module offers the transport abstraction all drivers talk through.
+
+    A transport owns the connection to exactly one instrument and offers the
+    write/read/query surface the drivers already used on VISA objects. The
+    backends only have to move bytes, everything else (terminations,
+    receive buffer, timing hooks) lives here once.
+"""
+
+import time
+from collections import namedtuple
+from contextlib import nullcontext
+from itertools import count
+
+from .aio import run_on_bus
+from .arbiter import BusArbiter, Priority
+from .block import block_data
+
+# one finished bus operation as seen by the timing hooks
+# kind -- (str) 'write', 'read', 'query', 'clear' or 'sleep'
+# outcome -- None on success, otherwise the raised exception
+# wait -- (float) seconds the request waited for the bus before start
+Transaction = namedtuple('Transaction', ['transport', 'kind', 'command',
+                                         'nbytes', 'start', 'stop', 'outcome',
+                                         'wait'],
+                         defaults=(0.0,))
+
+
+# linux-gpib eos flags: REOS terminates reads, XEOS asserts EOI on write
+REOS = 0x400
+XEOS = 0x800
+
+
+class TransportTimeout(IOError):
+    """ Raised when an instrument did not answer in time """
+
+
+_anonymous_bus = count()
+
+
+class Transport(object):
+    """ Base class of all transports.
+
+        Backends implement _write_raw and _read_raw, optionally _clear and
+        close. Hooks are callables taking a Transaction, they are only
+        timed if at least one hook is installed. Every blocking call is
+        one transaction on the BusArbiter of the bus.
+    """
+
+    # backends which may have several requests in flight set this to True
+    supports_pipelining = False
+
+    def __init__(self, write_termination='\n', read_termination='\n',
+                 buffer_size=512, encoding='ascii', bus=None, name=None,
+                 priority=Priority.NORMAL):
+        """ Arguments:
+            write_termination -- (str) appended to every message
+            read_termination -- (str) stripped from every answer
+            buffer_size -- (int) initial size of the receive buffer
+            bus -- (hashable) identifies the physical bus, instruments on
+                   the same bus can not talk at the same time
+            name -- (str) resource name used in messages and reports
+            priority -- (Priority) default priority on the bus arbiter
+        """
+        self.write_termination = write_termination
+        self.read_termination = read_termination
+        self.encoding = encoding
+        self.bus = bus if bus is not None else 'anonymous{}'.format(next(_anonymous_bus))
+        self.resource_name = name if name is not None else str(self.bus)
+        self.hooks = []
+        self.priority = priority
+        self.arbiter = BusArbiter.for_bus(self.bus)
+
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+
+    def __repr__(self):
+        return '<{} {}>'.format(type(self).__name__, self.resource_name)
+
+    # backend interface
+
+    def _write_raw(self, data: bytes) -> int:
+        raise NotImplementedError
+
+    def _read_raw(self, view: memoryview) -> int:
+        """ Fill view with one answer and return the number of bytes.
+            Returning len(view) without a termination at the end means
+            the answer is longer than the buffer.
+        """
+        raise NotImplementedError
+
+    def _clear(self):
+        pass
+
+    def close(self):
+        pass
+
+    def configure_eos(self, character: str):
+        """ End reads on character, backends with hardware EOS detection
+            configure it as well.
+        """
+        self.read_termination = character
+
+    def _binary_reads(self):
+        """ Context in which reads end with END only, backends with
+            hardware EOS detection switch it off as binary data may
+            contain the EOS character
+        """
+        return nullcontext()
+
+    # receive buffer
+
+    def _grow(self):
+        # a fresh buffer, views handed out before stay valid
+        buffer = bytearray(2 * len(self._buffer))
+        buffer[:len(self._buffer)] = self._buffer
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+
+    def _terminated(self, nbytes: int) -> bool:
+        termination = self.read_termination.encode(self.encoding)
+        return (not termination or
+                self._buffer[nbytes - len(termination):nbytes] == termination)
+
+    def _receive(self) -> int:
+        nbytes = self._read_raw(self._view)
+        while nbytes == len(self._buffer) and not self._terminated(nbytes):
+            self._grow()
+            nbytes += self._read_raw(self._view[nbytes:])
+        return nbytes
+
+    def _ended(self) -> bool:
+        """ True if the last read ended with END, backends which can not
+            tell return False
+        """
+        return False
+
+    def _receive_binary(self) -> int:
+        """ Like _receive, but binary data may contain the termination,
+            so a full buffer is only ended by END. Without END a short read
+            ends the answer. If the device has nothing more after a full
+            buffer, the timeout of the next read ends it too.
+        """
+        nbytes = self._read_raw(self._view)
+        while nbytes == len(self._buffer) and not self._ended():
+            self._grow()
+            try:
+                nbytes += self._read_raw(self._view[nbytes:])
+            except TransportTimeout:
+                break
+        return nbytes
+
+    def _send(self, message: str) -> int:
+        return self._write_raw((message + self.write_termination).encode(self.encoding))
+
+    def _decode(self, nbytes: int) -> str:
+        text = bytes(self._view[:nbytes]).decode(self.encoding)
+        if self.read_termination and text.endswith(self.read_termination):
+            text = text[:-len(self.read_termination)]
+        return text
+
+    # timing hooks
+
+    def _notify(self, kind, command, nbytes, start, outcome, wait=0.0):
+        event = Transaction(self, kind, command, nbytes, start, time.perf_counter(), outcome, wait)
+        for hook in self.hooks:
+            hook(event)
+
+    def _timed(self, kind, command, wait, function, *args):
+        start = time.perf_counter()
+        try:
+            nbytes = function(*args)
+        except Exception as error:
+            self._notify(kind, command, 0, start, error, wait)
+            raise
+        self._notify(kind, command, nbytes, start, None, wait)
+        return nbytes
+
+    def _exchange(self, message: str) -> int:
+        self._send(message)
+        return self._receive()
+
+    def _exchange_binary(self, message: str) -> int:
+        with self._binary_reads():
+            self._send(message)
+            return self._receive_binary()
+
+    def _receive_exactly(self, nbytes: int) -> int:
+        with self._binary_reads():
+            while len(self._buffer) < nbytes:
+                self._grow()
+            received = 0
+            while received < nbytes:
+                received += self._read_raw(self._view[received:nbytes])
+            return nbytes
+
+    # public interface
+
+    def transaction(self, priority: Priority = None):
+        """ Context manager owning the bus, so several calls run as one
+            transaction. Yields the time waited for the bus.
+        """
+        return self.arbiter.transaction(self.priority if priority is None else priority)
+
+    def _call(self, kind, command, function, *args, result=None):
+        """ Runs function(*args) as one transaction. result converts the
+            number of bytes it returns while the bus is still owned, so no
+            other thread reads into the receive buffer before it is decoded.
+        """
+        with self.arbiter.transaction(self.priority) as wait:
+            if not self.hooks:
+                nbytes = function(*args)
+            else:
+                nbytes = self._timed(kind, command, wait, function, *args)
+            return nbytes if result is None else result(nbytes)
+
+    def _detached(self, nbytes: int) -> memoryview:
+        """ Hands the first nbytes of the receive buffer over as a view,
+            later reads go to a fresh buffer of the same size
+        """
+        view = self._view[:nbytes]
+        self._buffer = bytearray(len(self._buffer))
+        self._view = memoryview(self._buffer)
+        return view
+
+    def _copied(self, nbytes: int) -> bytes:
+        return bytes(self._view[:nbytes])
+
+    def write(self, message: str) -> int:
+        """ Sends message with the write termination appended """
+        return self._call('write', message, self._send, message)
+
+    def write_raw(self, data: bytes) -> int:
+        """ Sends data as it is """
+        return self._call('write', data, self._write_raw, data)
+
+    def read_view(self) -> memoryview:
+        """ Reads one answer into the receive buffer and returns a view
+            on it without copying, the buffer is handed over with it
+        """
+        return self._call('read', None, self._receive, result=self._detached)
+
+    def read_binary(self, nbytes: int) -> memoryview:
+        """ Reads exactly nbytes with EOS detection switched off, e.g. of
+            a stream the device talks on its own, see read_view
+        """
+        return self._call('read', None, self._receive_exactly, nbytes, result=self._detached)
+
+    def read_raw(self) -> bytes:
+        return self._call('read', None, self._receive, result=self._copied)
+
+    def read(self) -> str:
+        return self._call('read', None, self._receive, result=self._decode)
+
+    def query_raw(self, message: str) -> bytes:
+        """ Sends message and returns the undecoded answer """
+        return self._call('query', message, self._exchange, message, result=self._copied)
+
+    def query(self, message: str) -> str:
+        """ Sends message and returns the answer without termination """
+        return self._call('query', message, self._exchange, message, result=self._decode)
+
+    def query_binary(self, message: str) -> memoryview:
+        """ Sends message and returns a view on the undecoded answer, read
+            until END as binary data may contain the termination, see
+            read_view
+        """
+        return self._call('query', message, self._exchange_binary, message, result=self._detached)
+
+    def query_block(self, message: str) -> memoryview:
+        """ Sends message and returns a view on the data of the IEEE 488.2
+            block answered, see block.py and query_binary
+        """
+        return block_data(self.query_binary(message))
+
+    def ask(self, message: str) -> str:
+        """ Legacy visa.instrument name used by several drivers """
+        return self.query(message)
+
+    def query_ascii_values(self, message: str, converter=float, separator=','):
+        return [converter(value) for value in self.query(message).split(separator)]
+
+    def pipeline(self, messages) -> list:
+        """ Sends all messages and returns their answers in order.
+
+            Backends which support pipelining get all messages before the
+            first answer is read, all others fall back to one query after
+            the other.
+        """
+        with self.transaction():
+            if not self.supports_pipelining:
+                return [self.query(message) for message in messages]
+
+            for message in messages:
+                self.write(message)
+            return [self.read() for _ in messages]
+
+    def clear(self):
+        self._call('clear', None, self._clear)
+
+    def sleep(self, seconds: float, reason: str = 'sleep'):
+        """ Waits like time.sleep, the hooks see the wait as a transaction
+            of kind 'sleep' with reason as command. A bus owned by the
+            calling thread is free for others meanwhile, see
+            BusArbiter.released.
+        """
+        with self.arbiter.released(self.priority):
+            if not self.hooks:
+                time.sleep(seconds)
+                return
+            start = time.perf_counter()
+            time.sleep(seconds)
+            self._notify('sleep', reason, 0, start, None)
+
+    # asyncio interface, see aio.py
+
+    async def run_async(self, function, *args, **kwargs):
+        """ Runs a blocking function, e.g. a driver method, in the thread
+            pool while holding the bus of this transport.
+        """
+        return await run_on_bus(self.bus, function, *args, **kwargs)
+
+    async def write_async(self, message: str) -> int:
+        return await self.run_async(self.write, message)
+
+    async def read_async(self) -> str:
+        return await self.run_async(self.read)
+
+    async def query_async(self, message: str) -> str:
+        return await self.run_async(self.query, message)
+
+    async def query_ascii_values_async(self, message: str, converter=float, separator=','):
+        return await self.run_async(self.query_ascii_values, message, converter, separator)
+
+
+def as_transport(device) -> Transport:
+    """ Returns device if it is a transport already, the pooled session of
+        device if it is a VISA resource name and otherwise wraps the VISA
+        object into a VisaTransport.
+    """
+    if isinstance(device, Transport):
+        return device
+
+    from .visa_session import VisaTransport, open_session
+    if isinstance(device, str):
+        return open_session(device)
+    return VisaTransport(device)
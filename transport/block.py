@@ -0,0 +1,39 @@
+""" IEEE 488.2 arbitrary blocks, the binary answers of SCPI instruments.
+
+    A definite length block announces the number of data bytes:
+    '#' followed by one digit n, n digits giving the length and the data,
+    e.g. b'#216' + 16 bytes. An indefinite length block b'#0' + data runs
+    until the message ends with a newline and END. The data is handed out
+    as a memoryview on the receive buffer, numpy.frombuffer decodes it
+    without an intermediate string.
+"""
+
+
+def block_data(view: memoryview, termination: bytes = b'\n') -> memoryview:
+    """ Returns a view on the data of the block in view, the termination
+        after an indefinite length block is dropped
+
+        Arguments:
+        view -- (memoryview) one answer starting with the block
+        termination -- (bytes) ends an indefinite length block
+    """
+    view = memoryview(view).cast('B')
+    if len(view) < 2 or view[0] != ord('#') or not chr(view[1]).isdigit():
+        raise ValueError('no IEEE 488.2 block: {!r}'.format(bytes(view[:12])))
+    digits = view[1] - ord('0')
+    if digits == 0:
+        end = len(view)
+        if termination and bytes(view[end - len(termination):]) == termination:
+            end -= len(termination)
+        return view[2:end]
+    header = 2 + digits
+    length = int(bytes(view[2:header]))
+    if len(view) < header + length:
+        raise ValueError('IEEE 488.2 block of {} bytes ended after {}'.format(length, len(view) - header))
+    return view[header:header + length]
+
+
+def block(data: bytes) -> bytes:
+    """ data as definite length block """
+    length = str(len(data))
+    return '#{}{}'.format(len(length), length).encode('ascii') + bytes(data)
@@ -0,0 +1,207 @@
+""" Opt-in latency instrumentation of the driver write/query paths.
+
+    An Instrumentation is a transport hook. It keeps per instrument and per
+    command counters and latency histograms, and the most recent
+    transactions. Transports only take timestamps while a hook is
+    installed, so a disabled instrumentation costs one list check per call:
+
+        instrumentation = enable(itc, lcr)
+        itc.device_status
+        print(instrumentation.report())
+        disable(itc, lcr)
+"""
+
+import json
+import math
+import re
+import threading
+from collections import deque
+
+from .base import Transport
+
+# numbers with a decimal point or an exponent are arguments, not part of
+# the command, e.g. 'FREQ 1000.0' and '@0T4.2'
+_ARGUMENT = re.compile(r'[-+]?(?:\d+\.\d*|\.\d+|\d+(?=[eE]))(?:[eE][-+]?\d+)?')
+
+
+def command_key(command) -> str:
+    """ Groups commands which only differ in their arguments,
+        ':source:voltage:level 0.5' -> ':source:voltage:level' and
+        '@0T4.2' -> '@0T#', reads and clears have no command.
+    """
+    if command is None:
+        return ''
+    if isinstance(command, (bytes, bytearray)):
+        command = bytes(command).decode('ascii', 'backslashreplace')
+    return _ARGUMENT.sub('#', command.strip().split(' ', 1)[0])
+
+
+class LatencyHistogram(object):
+    """ Histogram with logarithmic bins, BINS_PER_DECADE per factor of 10 """
+
+    BINS_PER_DECADE = 10
+
+    def __init__(self):
+        self.bins = {}
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = 0.0
+
+    def add(self, seconds: float):
+        index = math.floor(math.log10(max(seconds, 1e-9)) * self.BINS_PER_DECADE)
+        self.bins[index] = self.bins.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.minimum = min(self.minimum, seconds)
+        self.maximum = max(self.maximum, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        """ Upper edge of the bin holding the given fraction of samples """
+        if not self.count:
+            return 0.0
+        needed = fraction * self.count
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen >= needed:
+                return min(10 ** ((index + 1) / self.BINS_PER_DECADE), self.maximum)
+        return self.maximum
+
+    def as_dict(self) -> dict:
+        return {'count': self.count,
+                'total': self.total,
+                'mean': self.mean,
+                'min': self.minimum if self.count else 0.0,
+                'max': self.maximum,
+                'p50': self.percentile(0.5),
+                'p90': self.percentile(0.9),
+                'p99': self.percentile(0.99),
+                # lower bin edge in seconds -> count
+                'bins': {'{:.3g}'.format(10 ** (index / self.BINS_PER_DECADE)): number
+                         for index, number in sorted(self.bins.items())}}
+
+
+class CommandStatistics(object):
+    """ Counters and latency histogram of one command on one instrument """
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.nbytes = 0
+        self.wait = 0.0
+
+    def add(self, transaction):
+        self.latency.add(transaction.stop - transaction.start)
+        self.nbytes += transaction.nbytes or 0
+        self.wait += transaction.wait
+        if transaction.outcome is not None:
+            self.errors += 1
+
+    def as_dict(self) -> dict:
+        return {'errors': self.errors,
+                'bytes': self.nbytes,
+                'bus_wait': self.wait,
+                'latency': self.latency.as_dict()}
+
+
+class Instrumentation(object):
+    """ Transport hook collecting command statistics """
+
+    def __init__(self, history: int = 1000, key=command_key):
+        """ Arguments:
+            history -- (int) number of recent transactions kept
+            key -- (callable) groups commands, see command_key
+        """
+        self.key = key
+        self.statistics = {}
+        self.history = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def __call__(self, transaction):
+        instrument = getattr(transaction.transport, 'resource_name', None) or repr(transaction.transport)
+        key = (transaction.kind, self.key(transaction.command))
+        with self._lock:
+            commands = self.statistics.setdefault(instrument, {})
+            statistics = commands.get(key)
+            if statistics is None:
+                statistics = commands[key] = CommandStatistics()
+            statistics.add(transaction)
+            self.history.append(transaction)
+
+    def reset(self):
+        with self._lock:
+            self.statistics = {}
+            self.history.clear()
+
+    def dump(self) -> dict:
+        """ Returns instrument -> 'kind command' -> statistics """
+        with self._lock:
+            return {instrument: {'{} {}'.format(kind, command).strip(): statistics.as_dict()
+                                 for (kind, command), statistics in sorted(commands.items())}
+                    for instrument, commands in self.statistics.items()}
+
+    def dump_json(self, path: str):
+        with open(path, 'w') as output:
+            json.dump(self.dump(), output, indent=2)
+
+    def report(self) -> str:
+        """ Returns a table of all commands, slowest total first """
+        rows = []
+        with self._lock:
+            for instrument, commands in self.statistics.items():
+                for (kind, command), statistics in commands.items():
+                    rows.append((instrument, kind, command, statistics))
+        rows.sort(key=lambda row: row[3].latency.total, reverse=True)
+
+        lines = ['{:<20} {:<6} {:<24} {:>6} {:>4} {:>9} {:>9} {:>9} {:>9}'.format(
+            'instrument', 'kind', 'command', 'count', 'err', 'total ms', 'mean ms', 'p90 ms', 'max ms')]
+        for instrument, kind, command, statistics in rows:
+            latency = statistics.latency
+            lines.append('{:<20} {:<6} {:<24} {:>6d} {:>4d} {:>9.2f} {:>9.3f} {:>9.3f} {:>9.3f}'.format(
+                instrument[:20], kind, command[:24], latency.count, statistics.errors,
+                1e3 * latency.total, 1e3 * latency.mean, 1e3 * latency.percentile(0.9),
+                1e3 * latency.maximum))
+        return '\n'.join(lines)
+
+
+_default = Instrumentation()
+
+
+def hooked_objects(target) -> list:
+    """ Returns the objects taking hooks behind target: a transport, an
+        object with its own hooks like the EurothermMini8 or all
+        transports among the attributes of a driver.
+    """
+    if isinstance(target, Transport) or isinstance(getattr(target, 'hooks', None), list):
+        return [target]
+    return [value for value in vars(target).values() if isinstance(value, Transport)]
+
+
+def enable(*targets, instrumentation: Instrumentation = None) -> Instrumentation:
+    """ Installs instrumentation, the process wide one by default, on the
+        transports of all targets and returns it
+    """
+    instrumentation = instrumentation if instrumentation is not None else _default
+    for target in targets:
+        for hooked in hooked_objects(target):
+            if instrumentation not in hooked.hooks:
+                hooked.hooks.append(instrumentation)
+    return instrumentation
+
+
+def disable(*targets, instrumentation: Instrumentation = None):
+    instrumentation = instrumentation if instrumentation is not None else _default
+    for target in targets:
+        for hooked in hooked_objects(target):
+            if instrumentation in hooked.hooks:
+                hooked.hooks.remove(instrumentation)
+
+
+def default() -> Instrumentation:
+    """ Returns the process wide instrumentation """
+    return _default
@@ -0,0 +1,87 @@
+""" Transport backend for the linux-gpib python bindings """
+
+from contextlib import contextmanager
+
+import gpib
+
+from .base import Transport, TransportTimeout, REOS, XEOS
+
+# ibsta bits of a timeout and of a read ended by END
+TIMO = 0x4000
+END = 0x2000
+
+
+def _timed_out(error) -> bool:
+    """ True if the GpibError error reports a timeout """
+    ibsta = getattr(gpib, 'ibsta', None)
+    if callable(ibsta):
+        return bool(ibsta() & TIMO)
+    message = str(error).lower()
+    return 'timeout' in message or 'timed out' in message
+
+
+class GpibTransport(Transport):
+    """ Talks to a device through a raw gpib.dev handle """
+
+    def __init__(self, address: int, board: int = 0, **kwargs):
+        """ Arguments:
+            address -- (int) primary GPIB address of the device
+            board -- (int) index of the GPIB board
+        """
+        kwargs.setdefault('bus', 'GPIB{}'.format(board))
+        kwargs.setdefault('name', 'GPIB{}::{}::INSTR'.format(board, address))
+        super().__init__(**kwargs)
+        self.board = board
+        self.address = address
+        self.handle = gpib.dev(board, address)
+
+    def configure(self, option: int, value: int):
+        """ Passes an ibconfig option to the device handle """
+        gpib.config(self.handle, option, value)
+
+    def configure_eos(self, character: str):
+        super().configure_eos(character)
+        self.configure(gpib.IbcEOSchar, ord(character))
+        self.configure(gpib.IbcEOSrd, XEOS | REOS)
+
+    @contextmanager
+    def _binary_reads(self):
+        # restores the EOS detection as it was, it may have been off
+        eos_reads = gpib.ask(self.handle, gpib.IbaEOSrd)
+        self.configure(gpib.IbcEOSrd, 0)
+        try:
+            yield
+        finally:
+            self.configure(gpib.IbcEOSrd, eos_reads)
+
+    @contextmanager
+    def _timeouts(self):
+        """ Raises the GpibError of a timeout as TransportTimeout """
+        try:
+            yield
+        except gpib.GpibError as error:
+            if not _timed_out(error):
+                raise
+            raise TransportTimeout('{} timed out'.format(self.resource_name)) from error
+
+    def _ended(self) -> bool:
+        ibsta = getattr(gpib, 'ibsta', None)
+        return callable(ibsta) and bool(ibsta() & END)
+
+    def _write_raw(self, data: bytes) -> int:
+        with self._timeouts():
+            gpib.write(self.handle, data)
+        return len(data)
+
+    def _read_raw(self, view: memoryview) -> int:
+        with self._timeouts():
+            data = gpib.read(self.handle, len(view))
+        nbytes = len(data)
+        view[:nbytes] = data
+        return nbytes
+
+    def _clear(self):
+        gpib.clear(self.handle)
+
+    def close(self):
+        gpib.close(self.handle)
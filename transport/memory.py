@@ -0,0 +1,62 @@
+""" In-memory transport backend, the device is a python callable.
+
+    Used to run the drivers without hardware, e.g.
+
+        transport = MemoryTransport(lambda message: '1.0' if message == 'READ?' else None)
+        Multimeter34401A(transport)
+"""
+
+import time
+from collections import deque
+
+from .base import Transport, TransportTimeout
+
+
+class MemoryTransport(Transport):
+    """ Transport which hands every message to a responder """
+
+    supports_pipelining = True
+
+    def __init__(self, responder, latency: float = 0.0, **kwargs):
+        """ Arguments:
+            responder -- (callable) takes the message without termination
+                         and returns the answer (str or bytes) or None
+            latency -- (float) seconds each answer takes to arrive
+        """
+        super().__init__(**kwargs)
+        self.responder = responder
+        self.latency = latency
+        self.written = []
+        self._answers = deque()
+        self._partial = False
+
+    def _write_raw(self, data: bytes) -> int:
+        message = data.decode(self.encoding)
+        if self.write_termination and message.endswith(self.write_termination):
+            message = message[:-len(self.write_termination)]
+        self.written.append(message)
+
+        answer = self.responder(message)
+        if answer is not None:
+            if isinstance(answer, str):
+                answer = (answer + self.read_termination).encode(self.encoding)
+            self._answers.append(answer)
+        return len(data)
+
+    def _read_raw(self, view: memoryview) -> int:
+        if not self._answers:
+            raise TransportTimeout('{} has nothing to read'.format(self.resource_name))
+        if self.latency and not self._partial:
+            time.sleep(self.latency)
+
+        answer = self._answers.popleft()
+        nbytes = min(len(answer), len(view))
+        view[:nbytes] = answer[:nbytes]
+        self._partial = nbytes < len(answer)
+        if self._partial:
+            self._answers.appendleft(answer[nbytes:])
+        return nbytes
+
+    def _clear(self):
+        self._answers.clear()
+        self._partial = False
@@ -0,0 +1,46 @@
+""" Detection of and recovery from desynchronised communication.
+
+    Several drivers clear the bus before every command, because an answer
+    left over from an earlier command shifts all answers after it. The
+    cheaper way is to check every answer: an answer which is missing,
+    malformed or starts with the wrong character shows the desynchronisation,
+    only then the bus is cleared and the command repeated.
+"""
+
+from .base import TransportTimeout
+
+
+class Desynchronised(IOError):
+    """ Raised when an answer does not belong to the command sent """
+
+
+# failures which show an answer out of step, parse errors of the answer
+# included
+DESYNCHRONISATION = (TransportTimeout, Desynchronised, ValueError, IndexError)
+
+
+def expect(answer: str, prefix: str) -> str:
+    """ Returns answer without prefix, raises Desynchronised if answer
+        starts otherwise
+    """
+    if not answer.startswith(prefix):
+        raise Desynchronised('expected an answer starting with {!r}, got {!r}'.format(prefix, answer))
+    return answer[len(prefix):]
+
+
+def recovering(exchange, recover, retries: int = 1):
+    """ Returns exchange(). If it fails with a desynchronisation recover()
+        is called and exchange tried again, at most retries times.
+
+        Arguments:
+        exchange -- (callable) sends a command and parses the answer
+        recover -- (callable) brings the communication back in step,
+                   e.g. a device clear
+    """
+    for attempt in range(retries + 1):
+        try:
+            return exchange()
+        except DESYNCHRONISATION:
+            if attempt == retries:
+                raise
+            recover()
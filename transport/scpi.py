@@ -0,0 +1,163 @@
+""" Write coalescing and compound queries for SCPI instruments.
+
+    Inside a ScpiBatch writes are collected and sent as one ';' separated
+    program message, every command gets a leading ':' so it starts at the
+    root of the command tree. Several queries, together with the writes
+    collected so far, go out as one compound query whose answers are
+    returned as a tuple. Messages longer than the input buffer of the
+    instrument are split between commands:
+
+        with ScpiBatch(transport) as batch:
+            batch.write('*RST')
+            batch.write(':sense:function "current"')
+            limit, elements = batch.query(':sense:current:protection?',
+                                          ':format:elements?')
+
+    Batches nest per thread, a driver method opening a batch inside an
+    open one on the same transport joins the outer batch.
+"""
+
+import threading
+
+# conservative input buffer size of instruments without a known limit
+DEFAULT_MAX_LENGTH = 256
+
+_active = threading.local()
+
+
+def active_batch(transport) -> 'ScpiBatch':
+    """ Returns the batch open on transport in this thread or None """
+    return getattr(_active, 'batches', {}).get(transport)
+
+
+def is_query(command: str) -> bool:
+    return command.strip().split(' ', 1)[0].endswith('?')
+
+
+def rooted(command: str) -> str:
+    """ After a ';' a header continues the path of the command before, a
+        leading ':' restarts at the root as every command expects
+    """
+    command = command.strip()
+    if command.startswith((':', '*')):
+        return command
+    return ':' + command
+
+
+class ScpiBatch(object):
+    """ Collects the writes to one SCPI transport and sends them in as few
+        messages as the input buffer of the instrument allows.
+    """
+
+    def __init__(self, transport, max_length: int = DEFAULT_MAX_LENGTH):
+        """ Arguments:
+            transport -- (Transport) connection to the instrument
+            max_length -- (int) bytes per message including the write
+                          termination the instrument accepts
+        """
+        self.transport = transport
+        self.max_length = max_length
+        self.pending = []
+        self._outer = None
+        # callbacks waiting for the pending writes to be sent
+        self._sent = []
+
+    def __enter__(self) -> 'ScpiBatch':
+        batches = _active.__dict__.setdefault('batches', {})
+        self._outer = batches.get(self.transport)
+        if self._outer is not None:
+            return self._outer
+        batches[self.transport] = self
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        if self._outer is not None:
+            self._outer = None
+            return
+        del _active.batches[self.transport]
+        if kind is None:
+            self.flush()
+        else:
+            # a half built configuration is not sent
+            self.pending = []
+            self._sent = []
+
+    def _messages(self, commands: list) -> list:
+        """ Joins commands into messages of at most max_length bytes, a
+            single longer command is sent on its own
+        """
+        room = self.max_length - len(self.transport.write_termination)
+        messages = []
+        for command in commands:
+            if messages and len(messages[-1][0]) + 1 + len(command) <= room:
+                messages[-1][0] += ';' + command
+                messages[-1][1] += is_query(command)
+            else:
+                messages.append([command, int(is_query(command))])
+        return messages
+
+    def _taken(self, commands: list) -> tuple:
+        """ Takes the pending writes followed by commands and the
+            callbacks waiting for them
+        """
+        commands, self.pending = self.pending + commands, []
+        sent, self._sent = self._sent, []
+        return commands, sent
+
+    def _send(self, commands: list, sent: list = ()) -> list:
+        answers = []
+        with self.transport.transaction():
+            for message, queries in self._messages(commands):
+                if not queries:
+                    self.transport.write(message)
+                    continue
+                parts = self.transport.query(message).split(';')
+                if len(parts) != queries:
+                    raise IOError('{} answered {} of {} queries to {!r}'.format(
+                        self.transport.resource_name, len(parts), queries, message))
+                answers.extend(part.strip() for part in parts)
+        for callback in sent:
+            callback()
+        return answers
+
+    def write(self, message: str) -> int:
+        """ Queues message until the batch is flushed """
+        self.pending.append(rooted(message))
+        return len(message)
+
+    def when_sent(self, callback):
+        """ Calls callback() once the writes queued so far are sent, never
+            if the batch is discarded or sending fails
+        """
+        self._sent.append(callback)
+
+    def query(self, *queries, converter=str) -> tuple:
+        """ Sends the queued writes and queries as one compound query and
+            returns the converted answers in order
+        """
+        commands, sent = self._taken([rooted(query) for query in queries])
+        return tuple(converter(answer) for answer in self._send(commands, sent))
+
+    def query_block(self, query: str) -> memoryview:
+        """ Sends the queued writes and one query answered with an IEEE
+            488.2 block as one message, returns the view on the block data
+            of Transport.query_block
+        """
+        commands, sent = self._taken([rooted(query)])
+        messages = self._messages(commands)
+        with self.transport.transaction():
+            for message, _ in messages[:-1]:
+                self.transport.write(message)
+            data = self.transport.query_block(messages[-1][0])
+        for callback in sent:
+            callback()
+        return data
+
+    def flush(self):
+        """ Sends the queued writes """
+        commands, sent = self._taken([])
+        if commands:
+            self._send(commands, sent)
+        else:
+            for callback in sent:
+                callback()
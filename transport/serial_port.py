@@ -0,0 +1,45 @@
+""" Transport backend for pyserial connections """
+
+from .base import Transport
+
+
+class SerialTransport(Transport):
+    """ Talks to a device through an opened serial.Serial. Reads end on
+        the last character of the read termination or on the timeout of
+        the connection, just like readline.
+    """
+
+    supports_pipelining = True
+
+    def __init__(self, connection, **kwargs):
+        """ Arguments:
+            connection -- (serial.Serial) an opened serial port
+        """
+        kwargs.setdefault('bus', connection.port)
+        kwargs.setdefault('name', connection.port)
+        super().__init__(**kwargs)
+        self.connection = connection
+
+    def _write_raw(self, data: bytes) -> int:
+        return self.connection.write(data)
+
+    def _read_raw(self, view: memoryview) -> int:
+        # byte by byte as readline does, so pipelined answers stay queued
+        end = self.read_termination.encode(self.encoding)[-1:] or b'\n'
+        readinto = self.connection.readinto
+        nbytes = 0
+        size = len(view)
+        while nbytes < size:
+            if not readinto(view[nbytes:nbytes + 1]):
+                break
+            nbytes += 1
+            if view[nbytes - 1:nbytes] == end:
+                break
+        return nbytes
+
+    def _clear(self):
+        self.connection.reset_input_buffer()
+        self.connection.reset_output_buffer()
+
+    def close(self):
+        self.connection.close()
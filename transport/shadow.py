@@ -0,0 +1,64 @@
+""" Shadow state of instrument settings.
+
+    A ShadowState remembers the command which last set every setting of an
+    instrument, a setting being named by the first word of its command,
+    e.g. ':source:voltage:level' or 'smua.source.levelv'. Applying a new
+    configuration only sends the commands which differ from the known
+    ones. Settings nobody has sent yet are unknown and always sent, after
+    a reset or an error the state is forgotten.
+"""
+
+
+def setting_of(command: str) -> str:
+    """ ':source:voltage:level 0.5' -> ':source:voltage:level',
+        'smua.source.levelv = 0.5' -> 'smua.source.levelv'
+    """
+    return command.strip().split(' ', 1)[0]
+
+
+class ShadowState(object):
+    """ Last known settings of one instrument """
+
+    def __init__(self, key=setting_of):
+        """ Arguments:
+            key -- (callable) returns the setting a command sets
+        """
+        self.key = key
+        self.settings = {}
+
+    def __bool__(self):
+        return bool(self.settings)
+
+    def __contains__(self, command: str) -> bool:
+        """ True if command would not change the known state """
+        return self.settings.get(self.key(command)) == command
+
+    def changed(self, commands) -> list:
+        """ Returns the commands which change the known state, in order """
+        return [command for command in commands if command not in self]
+
+    def record(self, command: str):
+        """ Remembers a command sent outside of apply """
+        self.settings[self.key(command)] = command
+
+    def apply(self, commands, write) -> int:
+        """ Sends the changed commands with write and returns their number.
+            If write fails the touched settings become unknown.
+        """
+        changed = self.changed(commands)
+        try:
+            for command in changed:
+                write(command)
+        except Exception:
+            self.forget(*changed)
+            raise
+        for command in changed:
+            self.record(command)
+        return len(changed)
+
+    def forget(self, *commands):
+        """ Makes the settings of commands unknown, all without arguments """
+        if not commands:
+            self.settings = {}
+        for command in commands:
+            self.settings.pop(self.key(command), None)
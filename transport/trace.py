@@ -0,0 +1,157 @@
+""" Timeline export of multi-instrument runs in the Chrome trace format.
+
+    A TraceRecorder is a transport hook collecting every transaction of
+    the drivers it is attached to. The export opens in chrome://tracing
+    or ui.perfetto.dev with one track per bus and one per instrument.
+    Sleeps and bus waits appear as spans of their own on the instrument
+    tracks. The summary gives the utilisation of each bus and its
+    longest idle gaps, i.e. host side dead time between transactions:
+
+        recorder = TraceRecorder()
+        recorder.attach(itc, magnet, mini8)
+        ...
+        recorder.export('run.json')
+"""
+
+import json
+import threading
+import time
+
+from .instrumentation import hooked_objects
+
+BUSES_PID = 1
+INSTRUMENTS_PID = 2
+
+# number of idle gaps listed per bus in the summary
+LONGEST_GAPS = 5
+
+
+class TraceRecorder(object):
+    """ Collects transactions and exports them as Chrome trace """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.transactions = []
+        self._lock = threading.Lock()
+
+    def __call__(self, transaction):
+        with self._lock:
+            self.transactions.append(transaction)
+
+    def attach(self, *targets):
+        """ Records the transactions of transports or whole drivers """
+        for target in targets:
+            for hooked in hooked_objects(target):
+                if self not in hooked.hooks:
+                    hooked.hooks.append(self)
+
+    def detach(self, *targets):
+        for target in targets:
+            for hooked in hooked_objects(target):
+                if self in hooked.hooks:
+                    hooked.hooks.remove(self)
+
+    @staticmethod
+    def instrument_of(transaction) -> str:
+        return getattr(transaction.transport, 'resource_name', None) or repr(transaction.transport)
+
+    @staticmethod
+    def bus_of(transaction) -> str:
+        return str(getattr(transaction.transport, 'bus', None) or TraceRecorder.instrument_of(transaction))
+
+    def _microseconds(self, seconds: float) -> float:
+        return round((seconds - self.origin) * 1e6, 3)
+
+    def events(self) -> list:
+        """ Returns the trace events of all recorded transactions """
+        with self._lock:
+            transactions = list(self.transactions)
+
+        buses, instruments = {}, {}
+        events = [{'ph': 'M', 'name': 'process_name', 'pid': BUSES_PID, 'args': {'name': 'buses'}},
+                  {'ph': 'M', 'name': 'process_name', 'pid': INSTRUMENTS_PID, 'args': {'name': 'instruments'}}]
+
+        def track(tracks, pid, name):
+            tid = tracks.get(name)
+            if tid is None:
+                tid = tracks[name] = len(tracks) + 1
+                events.append({'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': tid,
+                               'args': {'name': name}})
+            return tid
+
+        for transaction in transactions:
+            instrument = self.instrument_of(transaction)
+            command = transaction.command
+            if isinstance(command, (bytes, bytearray)):
+                command = bytes(command).decode('ascii', 'backslashreplace')
+            name = '{} {}'.format(transaction.kind, command) if command else transaction.kind
+            args = {'bytes': transaction.nbytes or 0}
+            if transaction.outcome is not None:
+                args['error'] = repr(transaction.outcome)
+
+            tid = track(instruments, INSTRUMENTS_PID, instrument)
+            span = {'ph': 'X', 'name': name, 'cat': transaction.kind,
+                    'ts': self._microseconds(transaction.start),
+                    'dur': round((transaction.stop - transaction.start) * 1e6, 3),
+                    'args': args}
+            events.append(dict(span, pid=INSTRUMENTS_PID, tid=tid))
+            if transaction.wait:
+                events.append({'ph': 'X', 'name': 'bus wait', 'cat': 'wait',
+                               'ts': self._microseconds(transaction.start - transaction.wait),
+                               'dur': round(transaction.wait * 1e6, 3),
+                               'pid': INSTRUMENTS_PID, 'tid': tid})
+            if transaction.kind != 'sleep':
+                events.append(dict(span, name='{}: {}'.format(instrument, name),
+                                   pid=BUSES_PID, tid=track(buses, BUSES_PID, self.bus_of(transaction))))
+        return events
+
+    def summary(self) -> dict:
+        """ Returns per bus the recorded span, busy time, utilisation and
+            the longest idle gaps between transactions
+        """
+        with self._lock:
+            transactions = [transaction for transaction in self.transactions
+                            if transaction.kind != 'sleep']
+
+        per_bus = {}
+        for transaction in transactions:
+            per_bus.setdefault(self.bus_of(transaction), []).append(transaction)
+
+        summary = {}
+        for bus, items in per_bus.items():
+            items.sort(key=lambda transaction: transaction.start)
+            busy = 0.0
+            gaps = []
+            end = items[0].start
+            previous = None
+            for transaction in items:
+                if transaction.start > end:
+                    gaps.append((transaction.start - end, previous, transaction))
+                # overlapping spans, e.g. nested calls, count once
+                busy += max(0.0, transaction.stop - max(transaction.start, end))
+                if transaction.stop > end:
+                    end, previous = transaction.stop, transaction
+            span = end - items[0].start
+            gaps.sort(key=lambda gap: gap[0], reverse=True)
+            summary[bus] = {
+                'transactions': len(items),
+                'span': span,
+                'busy': busy,
+                'idle': span - busy,
+                'utilisation': busy / span if span else 1.0,
+                'longest_gaps': [{'duration': duration,
+                                  'at': before.stop - self.origin,
+                                  'after': '{} {}'.format(self.instrument_of(before), before.command),
+                                  'before': '{} {}'.format(self.instrument_of(after), after.command)}
+                                 for duration, before, after in gaps[:LONGEST_GAPS]]}
+        return summary
+
+    def export(self, path: str):
+        """ Writes the Chrome trace JSON, the bus summary is stored under
+            otherData
+        """
+        trace = {'traceEvents': self.events(),
+                 'displayTimeUnit': 'ms',
+                 'otherData': {'bus_summary': self.summary()}}
+        with open(path, 'w') as output:
+            json.dump(trace, output, default=str)
@@ -0,0 +1,234 @@
+""" Transport backend wrapping VISA resources and the process wide pool
+    of resource managers and sessions.
+
+    Opening a ResourceManager starts the VISA backend and opening a
+    resource costs a session set-up on the bus, so both are done once per
+    process and handed out again on every later request, e.g.
+
+        smu = Sourcemeter2400(open_session('GPIB0::24::INSTR'))
+"""
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from .base import Transport, TransportTimeout, REOS, XEOS
+
+# VISA status code of a timeout, VI_ERROR_TMO
+VISA_TIMEOUT = -1073807339
+
+
+def bus_of(resource_name: str) -> str:
+    """ Returns the interface part of a VISA resource name, instruments
+        with the same interface share one bus.
+
+        'GPIB0::6::INSTR' -> 'GPIB0', 'GPIB::4' -> 'GPIB0',
+        'ASRL/dev/ttyUSB0::INSTR' -> 'ASRL/dev/ttyUSB0'
+    """
+    interface = resource_name.split('::', 1)[0].upper()
+    match = re.match(r'^(GPIB|VXI|GPIB-VXI)(\d*)$', interface)
+    if match is not None:
+        return match.group(1) + (match.group(2) or '0')
+    return resource_name.split('::', 1)[0]
+
+
+class VisaTransport(Transport):
+    """ Talks to a device through a pyvisa resource or a legacy
+        visa.instrument, the resource keeps doing its own terminations.
+    """
+
+    def __init__(self, resource, **kwargs):
+        """ Arguments:
+            resource -- (visa resource) an opened VISA instrument
+        """
+        name = getattr(resource, 'resource_name', None) or str(resource)
+        kwargs.setdefault('bus', bus_of(name))
+        kwargs.setdefault('name', name)
+        kwargs.setdefault('write_termination', '')
+        kwargs.setdefault('read_termination', self._read_termination_of(resource))
+        super().__init__(**kwargs)
+        self.resource = resource
+        self.query_delay = getattr(resource, 'query_delay', 0.0) or 0.0
+        # key in the session pool and number of open_session calls not
+        # closed yet, see open_session
+        self._pool_key = None
+        self._users = 0
+
+    @staticmethod
+    def _read_termination_of(resource) -> str:
+        termination = getattr(resource, 'read_termination', None)
+        if termination is None:
+            termination = getattr(resource, 'term_chars', None)
+        return termination or ''
+
+    def configure_eos(self, character: str):
+        """ Sets the termination on the resource and, for linux-gpib
+            backed instruments, the hardware EOS detection.
+        """
+        super().configure_eos(character)
+        self.resource.term_chars = character
+        handle = getattr(self.resource, 'device', None)
+        if handle is not None:
+            import gpib
+            gpib.config(handle, gpib.IbcEOSchar, ord(character))
+            gpib.config(handle, gpib.IbcEOSrd, XEOS | REOS)
+
+    @contextmanager
+    def _binary_reads(self):
+        # terminations of pyvisa resources and of legacy instruments
+        saved = {attribute: getattr(self.resource, attribute)
+                 for attribute in ('read_termination', 'term_chars') if hasattr(self.resource, attribute)}
+        handle = getattr(self.resource, 'device', None)
+        for attribute in saved:
+            setattr(self.resource, attribute, None)
+        if handle is not None:
+            import gpib
+            eos_reads = gpib.ask(handle, gpib.IbaEOSrd)
+            gpib.config(handle, gpib.IbcEOSrd, 0)
+        try:
+            yield
+        finally:
+            for attribute, value in saved.items():
+                setattr(self.resource, attribute, value)
+            if handle is not None:
+                gpib.config(handle, gpib.IbcEOSrd, eos_reads)
+
+    @contextmanager
+    def _timeouts(self):
+        """ Raises the VisaIOError of a timeout as TransportTimeout """
+        try:
+            yield
+        except TransportTimeout:
+            raise
+        except Exception as error:
+            if getattr(error, 'error_code', None) != VISA_TIMEOUT:
+                raise
+            raise TransportTimeout('{} timed out'.format(self.resource_name)) from error
+
+    def _send(self, message: str) -> int:
+        # the resource appends its own write termination
+        with self._timeouts():
+            self.resource.write(message)
+        return len(message)
+
+    def _write_raw(self, data: bytes) -> int:
+        with self._timeouts():
+            self.resource.write_raw(data)
+        return len(data)
+
+    def _read_raw(self, view: memoryview) -> int:
+        # pyvisa reads exactly, legacy instruments at most len(view) bytes
+        read_bytes = getattr(self.resource, 'read_bytes', None)
+        with self._timeouts():
+            data = read_bytes(len(view)) if read_bytes is not None else self.resource.read_raw(len(view))
+        nbytes = len(data)
+        view[:nbytes] = data
+        return nbytes
+
+    def _receive(self) -> int:
+        with self._timeouts():
+            data = self.resource.read_raw()
+        nbytes = len(data)
+        while nbytes > len(self._buffer):
+            self._grow()
+        self._view[:nbytes] = data
+        return nbytes
+
+    def _exchange(self, message: str) -> int:
+        self._send(message)
+        if self.query_delay:
+            time.sleep(self.query_delay)
+        return self._receive()
+
+    def _exchange_binary(self, message: str) -> int:
+        # without read termination the resource reads until END
+        with self._binary_reads():
+            return self._exchange(message)
+
+    def _clear(self):
+        self.resource.clear()
+
+    def close(self):
+        """ Closes the resource, a pooled session only when the last
+            driver which opened it closes it
+        """
+        if self._pool_key is not None and not _release(self):
+            return
+        self.resource.close()
+
+
+_pool_lock = threading.Lock()
+_resource_managers = {}
+_sessions = {}
+
+
+def resource_manager(backend: str = '@py'):
+    """ Returns the ResourceManager of backend, it is created only once """
+    with _pool_lock:
+        manager = _resource_managers.get(backend)
+        if manager is None:
+            import visa
+            manager = _resource_managers[backend] = visa.ResourceManager(backend)
+        return manager
+
+
+def install_resource_manager(manager, backend: str = '@py'):
+    """ Makes manager the ResourceManager of backend, e.g. a simulated one """
+    with _pool_lock:
+        _resource_managers[backend] = manager
+
+
+def open_session(resource_name: str, backend: str = '@py', **kwargs) -> VisaTransport:
+    """ Returns the cached session of resource_name, it is opened on the
+        first request only. Every request has to be matched by a close(),
+        the resource is closed and leaves the pool with the last one.
+
+        Arguments:
+        resource_name -- (str) VISA resource name, e.g. 'GPIB0::6::INSTR'
+        backend -- (str) backend of the ResourceManager
+        kwargs -- resource attributes like write_termination, a warm
+                  session is shared with other drivers, so they have to
+                  match the ones it was opened with
+    """
+    manager = resource_manager(backend)
+    with _pool_lock:
+        key = (backend, resource_name)
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = VisaTransport(manager.open_resource(resource_name, **kwargs))
+            session._pool_key = key
+        else:
+            conflicts = {attribute: getattr(session.resource, attribute, None)
+                         for attribute, value in kwargs.items()
+                         if getattr(session.resource, attribute, None) != value}
+            if conflicts:
+                raise ValueError('{} is shared with the settings {}, not {}'.format(
+                    resource_name, conflicts, {attribute: kwargs[attribute] for attribute in conflicts}))
+        session._users += 1
+        return session
+
+
+def _release(session) -> bool:
+    """ Ends one use of a pooled session, True if it was the last one and
+        the session left the pool
+    """
+    with _pool_lock:
+        session._users -= 1
+        if session._users > 0:
+            return False
+        if _sessions.get(session._pool_key) is session:
+            del _sessions[session._pool_key]
+        session._pool_key = None
+        return True
+
+
+def close_sessions():
+    """ Closes all cached sessions, whoever still uses them """
+    with _pool_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+        for session in sessions:
+            session._pool_key = None
+    for session in sessions:
+        session.close()
@@ -2,6 +2,8 @@ from serial import Serial, EIGHTBITS, PARITY_NONE, STOPBITS_ONE
 
 from typing import Tuple
 
+from ..transport.aioserial import AsyncSerialTransport
+
 class MicroPressureSensor:
     BAUD_RATE = 9600
     TIMEOUT = 1
@@ -9,7 +11,7 @@ class MicroPressureSensor:
     MAX_VALUE = 51150
     MIN_VALUE = 0
 
-    MESSAGE = 'A\n'.encode()
+    MESSAGE = 'A'
 
     #sensor parameter
     P0 = 7.77571e-3
@@ -24,9 +26,14 @@ class MicroPressureSensor:
                               xonxoff=0,
                               rtscts=0)
         #reset device and serial buffer
-        self._serial.setDTR(False)
-        self._serial.flushInput()
-        self._serial.setDTR(True)
+        try:
+            self._serial.setDTR(False)
+            self._serial.flushInput()
+            self._serial.setDTR(True)
+        except OSError:
+            #ports without modem lines, e.g. a pty
+            self._serial.flushInput()
+        self._transport = AsyncSerialTransport(self._serial, read_termination='\n')
 
         self._lower_bound = MicroPressureSensor.MIN_VALUE #lowest possible value
         self._upper_bound = MicroPressureSensor.MAX_VALUE #highest possible value
@@ -41,9 +48,8 @@ class MicroPressureSensor:
         else:
             return float('inf')
 
-    def _get_raw_value(self):
-        self._serial.write(MicroPressureSensor.MESSAGE)
-        answer = self._serial.readline()
+    async def _get_raw_value_async(self, timeout=None):
+        answer = await self._transport.query_raw_async(MicroPressureSensor.MESSAGE, timeout)
         text = answer.decode('utf-8')
 
         if len(text) > 0:
@@ -53,15 +59,21 @@ class MicroPressureSensor:
         else:
             raise IOError('no answer from device')
 
-    @property
-    def pressure(self) -> Tuple[float, int]:
+    def _get_raw_value(self):
+        return self._transport.run(self._get_raw_value_async())
+
+    async def pressure_async(self, timeout=None) -> Tuple[float, int]:
         try:
-            value = self._get_raw_value()
+            value = await self._get_raw_value_async(timeout)
         except IOError:
             return float('nan'), -1
         else:
             return value
 
+    @property
+    def pressure(self) -> Tuple[float, int]:
+        return self._transport.run(self.pressure_async())
+
     def calibrate_lower_bound(self):
         try:
             _, self._lower_bound = self._get_raw_value()